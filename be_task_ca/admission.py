@@ -0,0 +1,128 @@
+import asyncio
+from collections import deque
+from typing import Collection, Deque, Dict
+
+from starlette.responses import JSONResponse
+
+from .read_your_writes import SAFE_METHODS
+
+
+class AdmissionLimiter:
+    """
+    Caps the requests of a class running at once. Further requests wait in a
+    short queue for a slot, and are turned away when the queue is full or
+    when no slot frees up before their deadline.
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.shed = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """
+        Take a slot, waiting up to `queue_timeout` for one. Returns whether
+        the request was admitted.
+        """
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return True
+        if self.queued >= self.max_queued or self.queue_timeout <= 0:
+            self.shed += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await waiter
+            return True
+        except TimeoutError:
+            # the slot may have been handed over just as the deadline passed
+            if waiter.done() and not waiter.cancelled():
+                return True
+            self.shed += 1
+            return False
+        except asyncio.CancelledError:
+            # the request went away, with the slot it was just handed
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self):
+        # hand the slot straight to the longest waiting request
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": self.in_flight, "queued": self.queued, "shed": self.shed}
+
+
+def route_class(scope) -> str:
+    """
+    Reads and writes are limited separately, so that a burst of cart writes
+    holding rows locked cannot starve the catalog pages, and the other way
+    around.
+    """
+    return "read" if scope["method"] in SAFE_METHODS else "write"
+
+
+class AdmissionMiddleware:
+    """
+    Admit requests through the limiter of their route class, answering the
+    ones turned away with a 503 right away instead of letting them wait for a
+    database connection until they time out. Admitted requests run to the end
+    and hold their slot until then, even if their caller stops waiting.
+    """
+
+    def __init__(
+        self,
+        app,
+        limiters: Dict[str, AdmissionLimiter],
+        retry_after: int,
+        exempt_paths: Collection[str] = (),
+    ):
+        self.app = app
+        self.limiters = limiters
+        self.retry_after = retry_after
+        self.exempt_paths = set(exempt_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters.get(route_class(scope))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            response = JSONResponse(
+                {"detail": "The server is overloaded, try again later"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        # the slot is given back once the request is done with it, not when
+        # whoever awaits the request is cancelled, on a deadline or a client
+        # disconnect, while its work carries on past the limit
+        request = asyncio.ensure_future(self.app(scope, receive, send))
+        request.add_done_callback(lambda _: limiter.release())
+        await asyncio.shield(request)
@@ -1,10 +1,46 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from datetime import timedelta
+
+from fastapi import FastAPI, Request, Response
 
 from .logging_config import initialise_logging
-from .config import LoggingSettings
+from . import database
+from .admission import AdmissionLimiter, AdmissionMiddleware
+from .config import (
+    AdmissionSettings,
+    CartSettings,
+    CartStoreSettings,
+    ItemEventSettings,
+    LoggingSettings,
+    MetricsSettings,
+)
+from .database import PoolStats, get_pool_stats, warm_up_pool
+from .dependencies import (
+    get_cart_store,
+    get_database_settings,
+    get_item_cache,
+    get_item_event_broker,
+    get_password_hasher,
+    get_repository_settings,
+)
+from .metrics import (
+    MetricsMiddleware,
+    gauges,
+    instrument_sqlalchemy,
+    render_request_metrics,
+)
+from .read_your_writes import ReadYourWritesMiddleware
 
 from .user.api import user_router
+from .user.tasks import (
+    flush_carts,
+    flush_carts_periodically,
+    load_carts,
+    sweep_expired_reservations,
+)
 from .item.api import item_router
+from .item.tasks import relay_item_events_periodically
 
 
 async def root():
@@ -13,6 +49,91 @@ async def root():
     }  # the Nile is 250km longer than the Amazon
 
 
+async def pool_stats() -> PoolStats:
+    return get_pool_stats()
+
+
+async def metrics(request: Request) -> Response:
+    lines = render_request_metrics()
+
+    for route_class, limiter in request.app.state.admission_limiters.items():
+        lines.extend(
+            gauges(f"admission_{route_class}", "Admission control.", limiter.stats())
+        )
+
+    if database.engine is not None:
+        lines.extend(
+            gauges(
+                "db_pool", "Database connection pool.", get_pool_stats().model_dump()
+            )
+        )
+
+    cache = get_item_cache()
+    if cache is not None:
+        lines.extend(gauges("item_cache", "Item cache.", cache.stats().model_dump()))
+
+    return Response("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+
+async def _stop(task: asyncio.Task | None):
+    if task is not None:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    cart_store = None
+    if get_repository_settings().BACKEND == "sqlalchemy":
+        database_settings = get_database_settings()
+        if database_settings.POOL_WARMUP_CONNECTIONS > 0:
+            await warm_up_pool(database_settings.POOL_WARMUP_CONNECTIONS)
+        cart_store = get_cart_store()
+
+    cart_store_settings = CartStoreSettings()
+    flusher = None
+    if cart_store is not None:
+        await load_carts(cart_store)
+        flusher = asyncio.create_task(
+            flush_carts_periodically(
+                cart_store,
+                cart_store_settings.FLUSH_INTERVAL_SECONDS,
+                cart_store_settings.FLUSH_BATCH_SIZE,
+            )
+        )
+
+    cart_settings = CartSettings()
+
+    sweeper = None
+    if cart_settings.RESERVATION_SWEEP_INTERVAL_SECONDS > 0:
+        sweeper = asyncio.create_task(
+            sweep_expired_reservations(cart_settings.RESERVATION_SWEEP_INTERVAL_SECONDS)
+        )
+
+    item_event_settings = ItemEventSettings()
+    relay = asyncio.create_task(
+        relay_item_events_periodically(
+            get_item_event_broker(),
+            item_event_settings.RELAY_INTERVAL_SECONDS,
+            item_event_settings.BATCH_SIZE,
+            timedelta(seconds=item_event_settings.RETENTION_SECONDS),
+        )
+    )
+
+    yield
+
+    await _stop(relay)
+    await _stop(sweeper)
+    if cart_store is not None:
+        await _stop(flusher)
+        # nothing is left for the journal to recover after a clean shutdown
+        await flush_carts(cart_store, cart_store_settings.FLUSH_BATCH_SIZE)
+        cart_store.close()
+
+    get_password_hasher().shutdown()
+
+
 def create_app():
     logging_settings = LoggingSettings()
 
@@ -21,10 +142,44 @@ def create_app():
         sqlalchemy_level=logging_settings.LEVEL_SQLALCHEMY,
     )
 
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    admission_settings = AdmissionSettings()
+    app.state.admission_limiters = {}
+    if admission_settings.ENABLED:
+        app.state.admission_limiters = {
+            "read": AdmissionLimiter(
+                admission_settings.READ_MAX_IN_FLIGHT,
+                admission_settings.READ_MAX_QUEUED,
+                admission_settings.QUEUE_TIMEOUT_SECONDS,
+            ),
+            "write": AdmissionLimiter(
+                admission_settings.WRITE_MAX_IN_FLIGHT,
+                admission_settings.WRITE_MAX_QUEUED,
+                admission_settings.QUEUE_TIMEOUT_SECONDS,
+            ),
+        }
+        # inside the metrics middleware, which also counts the requests shed
+        app.add_middleware(
+            AdmissionMiddleware,
+            limiters=app.state.admission_limiters,
+            retry_after=admission_settings.RETRY_AFTER_SECONDS,
+            exempt_paths=admission_settings.EXEMPT_PATHS,
+        )
+
+    metrics_settings = MetricsSettings()
+    if metrics_settings.ENABLED:
+        instrument_sqlalchemy()
+        app.add_middleware(
+            MetricsMiddleware, server_timing=metrics_settings.SERVER_TIMING
+        )
+        app.add_api_route("/metrics", metrics, include_in_schema=False)
+
     app.include_router(user_router)
     app.include_router(item_router)
     app.add_api_route("/", root)
+    app.add_api_route("/pool-stats", pool_stats)
     return app
 
 
@@ -0,0 +1,118 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List
+
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    size: int = 0
+
+
+class CacheBackend(ABC):
+    """
+    Key-value store used by the caching repositories. Methods are async so a
+    shared cache living in another process can be slotted in.
+    """
+
+    @abstractmethod
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Return the cached values of the given keys, omitting missing ones.
+        """
+        pass
+
+    @abstractmethod
+    async def set_many(self, values: Dict[str, Any]) -> None:
+        """
+        Cache the given values.
+        """
+        pass
+
+    @abstractmethod
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """
+        Drop the given keys from the cache.
+        """
+        pass
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """
+        Drop everything from the cache.
+        """
+        pass
+
+    @abstractmethod
+    def stats(self) -> CacheStats:
+        """
+        Return the cache counters.
+        """
+        pass
+
+
+class LRUCache(CacheBackend):
+    """
+    In-process cache bounded in size, evicting the least recently used entry,
+    and in age, expiring entries after `ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        found = {}
+        now = self.clock()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    self._stats.misses += 1
+                elif entry[0] <= now:
+                    del self._entries[key]
+                    self._stats.expirations += 1
+                    self._stats.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._stats.hits += 1
+                    found[key] = entry[1]
+        return found
+
+    async def set_many(self, values: Dict[str, Any]) -> None:
+        expires_at = self.clock() + self.ttl
+        with self._lock:
+            for key, value in values.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return self._stats.model_copy(update={"size": len(self._entries)})
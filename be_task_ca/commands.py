@@ -1,10 +1,20 @@
+import asyncio
+
 from .database import get_db_engine, Base
 
 # just importing all the models is enough to have them created
 # flake8: noqa
 from .user.model import User, CartItem
-from .item.model import Item
+from .item.model import Item, ItemOutbox
+from .revisions import Revision
+
+
+async def _create_all():
+    engine = get_db_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
 
 
 def create_db_schema():
-    Base.metadata.create_all(bind=get_db_engine())
+    asyncio.run(_create_all())
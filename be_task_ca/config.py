@@ -1,3 +1,7 @@
+import os
+from typing import List, Literal
+
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,9 +12,133 @@ class LoggingSettings(BaseSettings):
     LEVEL_SQLALCHEMY: str = "WARNING"
 
 
+class ServerSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="SERVER_")
+
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    # each with its own event loop and database pool of DATABASE_POOL_SIZE
+    WORKERS: int = os.cpu_count() or 1
+    # connections the OS queues while every worker is busy accepting
+    BACKLOG: int = 2048
+    KEEP_ALIVE_SECONDS: int = 5
+    # how long in-flight requests get to finish on SIGTERM
+    GRACEFUL_SHUTDOWN_SECONDS: int = 30
+    # trust X-Forwarded-* from these addresses, comma separated
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+    ACCESS_LOG: bool = False
+
+
 class DatabaseSettings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="DATABASE_")
 
     CONNECTION_STRING: str
     AUTOCOMMIT: bool = False
     AUTOFLUSH: bool = False
+
+    POOL_SIZE: int = 5
+    POOL_MAX_OVERFLOW: int = 10
+    POOL_TIMEOUT_SECONDS: float = 30.0
+    POOL_RECYCLE_SECONDS: int = -1
+    POOL_PRE_PING: bool = False
+    POOL_WARMUP_CONNECTIONS: int = 0
+
+    # read-only requests run on these, as a JSON list, when set
+    REPLICA_CONNECTION_STRINGS: List[str] = []
+    # how long a client's reads stay on the primary after it wrote something
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+
+class RepositorySettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="REPOSITORY_")
+
+    # "memory" keeps everything in the process, for tests and load simulations
+    BACKEND: Literal["sqlalchemy", "memory"] = "sqlalchemy"
+
+
+class PasswordHasherSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="PASSWORD_HASHER_")
+
+    WORKERS: int = os.cpu_count() or 1
+    # hashes queued or running at once, further signups wait for a slot
+    MAX_PENDING: int = 64
+    QUEUE_TIMEOUT_SECONDS: float = 2.0
+    # processes for hashes that hold the GIL, threads are enough otherwise
+    USE_PROCESSES: bool = False
+
+
+class CartSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="CART_")
+
+    RESERVATION_TTL_SECONDS: int = 900
+    RESERVATION_SWEEP_INTERVAL_SECONDS: float = 60.0
+
+
+class CartStoreSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="CART_STORE_")
+
+    # "write_behind" keeps carts in a key-value store and writes them to the
+    # database in batches, instead of in the transaction of each request
+    BACKEND: Literal["database", "write_behind"] = "database"
+    FLUSH_INTERVAL_SECONDS: float = 0.5
+    FLUSH_BATCH_SIZE: int = 500
+    # journal to recover unwritten carts after a crash, none to keep them in
+    # memory only; anything but "always" may leak reserved stock on a crash
+    JOURNAL_PATH: str | None = None
+    JOURNAL_FSYNC: Literal["always", "everysec", "no"] = "always"
+
+
+class ItemCacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="ITEM_CACHE_")
+
+    ENABLED: bool = True
+    MAX_SIZE: int = 10_000
+    # also how long other worker processes may serve an item after it changed
+    TTL_SECONDS: float = 30.0
+
+
+class ItemEventSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="ITEM_EVENTS_")
+
+    # how often the relay looks for new changes in the outbox
+    RELAY_INTERVAL_SECONDS: float = 0.25
+    BATCH_SIZE: int = 500
+    # how long changes stay in the outbox for clients to resume from
+    RETENTION_SECONDS: float = 86400.0
+    # comment lines sent on idle streams, so that proxies keep them open
+    KEEPALIVE_SECONDS: float = 15.0
+    # events queued per client, a slower client catches up from the outbox
+    MAX_PENDING: int = 1000
+
+
+class HttpCacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="HTTP_CACHE_")
+
+    # how long clients and CDNs may reuse a catalog page without revalidating
+    CATALOG_MAX_AGE_SECONDS: int = 0
+    # how old the stock levels of a revalidated catalog page may be, stock
+    # changes not being versioned (see get_catalog_version)
+    CATALOG_STOCK_STALENESS_SECONDS: int = Field(10, gt=0)
+
+
+class AdmissionSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="ADMISSION_")
+
+    ENABLED: bool = True
+    # requests running at once per worker, best kept close to the pool size
+    READ_MAX_IN_FLIGHT: int = 15
+    WRITE_MAX_IN_FLIGHT: int = 10
+    # requests waiting for a slot, any more are turned away at once
+    READ_MAX_QUEUED: int = 30
+    WRITE_MAX_QUEUED: int = 20
+    QUEUE_TIMEOUT_SECONDS: float = 0.5
+    RETRY_AFTER_SECONDS: int = 1
+    # never limited: probes, metrics, and event streams, which stay open
+    EXEMPT_PATHS: List[str] = ["/", "/metrics", "/pool-stats", "/items/events"]
+
+
+class MetricsSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="METRICS_")
+
+    ENABLED: bool = True
+    SERVER_TIMING: bool = False
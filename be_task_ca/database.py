@@ -1,40 +1,237 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import asyncio
+import itertools
+import os
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncContextManager, Awaitable, Callable, List
+
+from pydantic import BaseModel
+from sqlalchemy import make_url, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 
 from .config import DatabaseSettings
 
 engine = None
 SessionLocal = None
+# one per replica, see replica_session_scope
+ReplicaSessions = None
+_replica_turns = itertools.count()
+
+# actions finishing or undoing writes made outside of a session's transaction
+_ON_COMMIT = "on_commit"
+_UNDO = "undo"
 
 Base = declarative_base()
 
 
+class PoolStats(BaseModel):
+    size: int = 0
+    checked_in: int = 0
+    checked_out: int = 0
+    overflow: int = 0
+    acquisitions: int = 0
+    acquire_seconds_total: float = 0.0
+    acquire_seconds_max: float = 0.0
+
+
+# time spent by requests waiting for a pooled connection
+pool_waits = PoolStats()
+
+
+def _pool_options(
+    database_config: DatabaseSettings, connection_string: str | None = None
+) -> dict:
+    options = {"pool_pre_ping": database_config.POOL_PRE_PING}
+
+    url = make_url(connection_string or database_config.CONNECTION_STRING)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # in-memory SQLite lives in a single shared connection
+        return options
+
+    return {
+        **options,
+        "pool_size": database_config.POOL_SIZE,
+        "max_overflow": database_config.POOL_MAX_OVERFLOW,
+        "pool_timeout": database_config.POOL_TIMEOUT_SECONDS,
+        "pool_recycle": database_config.POOL_RECYCLE_SECONDS,
+    }
+
+
 def get_db_engine():
     global engine
     if not engine:
         database_config = DatabaseSettings()
-        engine = create_engine(database_config.CONNECTION_STRING)
+        engine = create_async_engine(
+            database_config.CONNECTION_STRING, **_pool_options(database_config)
+        )
 
     return engine
 
 
-def get_db_session():
-    database_config = DatabaseSettings()
+def _forget_engines():
+    """
+    In a forked process, drop the engines inherited from the parent without
+    closing the parent's connections, so that the child opens its own.
+    """
+    global engine, SessionLocal, ReplicaSessions
+    inherited = [engine] + [
+        sessionmaker.kw["bind"] for sessionmaker in ReplicaSessions or []
+    ]
+    for inherited_engine in inherited:
+        if inherited_engine is not None:
+            inherited_engine.sync_engine.dispose(close=False)
+    engine = SessionLocal = ReplicaSessions = None
 
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_engines)
+
+
+def get_db_sessionmaker():
     global SessionLocal
     if not SessionLocal:
-        SessionLocal = sessionmaker(
+        database_config = DatabaseSettings()
+        SessionLocal = async_sessionmaker(
             autocommit=database_config.AUTOCOMMIT,
             autoflush=database_config.AUTOFLUSH,
+            expire_on_commit=False,
             bind=get_db_engine(),
         )
 
-    session = SessionLocal()
+    return SessionLocal
+
+
+def get_replica_sessionmakers() -> List[async_sessionmaker]:
+    global ReplicaSessions
+    if ReplicaSessions is None:
+        # CONNECTION_STRING is read from the environment, not passed in
+        database_config = DatabaseSettings()  # type: ignore[call-arg]
+        ReplicaSessions = [
+            async_sessionmaker(
+                autoflush=database_config.AUTOFLUSH,
+                expire_on_commit=False,
+                bind=create_async_engine(
+                    connection_string,
+                    **_pool_options(database_config, connection_string),
+                ),
+            )
+            for connection_string in database_config.REPLICA_CONNECTION_STRINGS
+        ]
+
+    return ReplicaSessions
+
+
+@asynccontextmanager
+async def _session_scope(sessionmaker: async_sessionmaker):
+    session = sessionmaker()
     try:
+        # check out the connection up front to measure the wait for it
+        started = time.perf_counter()
+        await session.connection()
+        waited = time.perf_counter() - started
+        pool_waits.acquisitions += 1
+        pool_waits.acquire_seconds_total += waited
+        pool_waits.acquire_seconds_max = max(pool_waits.acquire_seconds_max, waited)
+
+        # committing is up to the usecases, see unit_of_work.py
         yield session
-        session.commit()
     except Exception:
-        session.rollback()
+        await session.rollback()
         raise
     finally:
-        session.close()
+        await session.close()
+        # whatever was left uncommitted is gone
+        await undo_uncommitted(session)
+
+
+async def get_db_session():
+    async with _session_scope(get_db_sessionmaker()) as session:
+        yield session
+
+
+def replica_session_scope() -> AsyncContextManager:
+    """
+    A session for reads that may lag behind the primary, on each replica in
+    turn. On the primary when no replica is configured.
+    """
+    sessionmakers = get_replica_sessionmakers()
+    if not sessionmakers:
+        return db_session_scope()
+    return _session_scope(sessionmakers[next(_replica_turns) % len(sessionmakers)])
+
+
+async def warm_up_pool(connections: int):
+    """
+    Open `connections` pooled connections at once so that the first requests
+    do not pay for connecting.
+    """
+    async with AsyncExitStack() as stack:
+        opened = await asyncio.gather(
+            *(
+                stack.enter_async_context(get_db_engine().connect())
+                for _ in range(connections)
+            )
+        )
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in opened))
+
+
+def get_pool_stats() -> PoolStats:
+    pool = get_db_engine().pool
+    gauges = {}
+    if hasattr(pool, "checkedout"):
+        gauges = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
+    return pool_waits.model_copy(update=gauges)
+
+
+def upsert_insert(session, table):
+    """
+    An INSERT construct supporting ON CONFLICT for the session's dialect.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def on_commit(session, action: Callable[[], Awaitable[None]]):
+    """
+    Register how to finish a write made outside of the session's transaction,
+    such as in a key-value store, once the transaction is committed.
+    """
+    session.info.setdefault(_ON_COMMIT, []).append(action)
+
+
+def on_rollback(session, undo: Callable[[], Awaitable[None]]):
+    """
+    Register how to undo a write made outside of the session's transaction
+    should the transaction not be committed.
+    """
+    session.info.setdefault(_UNDO, []).append(undo)
+
+
+async def finish_committed(session):
+    """
+    Run the actions registered for a transaction that was just committed.
+    """
+    session.info.pop(_UNDO, None)
+    for action in session.info.pop(_ON_COMMIT, []):
+        await action()
+
+
+async def undo_uncommitted(session):
+    """
+    Run the undo actions of a transaction that was rolled back, latest first.
+    """
+    session.info.pop(_ON_COMMIT, None)
+    for undo in reversed(session.info.pop(_UNDO, [])):
+        await undo()
+
+
+# the same session handling for code running outside of a request
+db_session_scope = asynccontextmanager(get_db_session)
@@ -1,15 +1,200 @@
-from fastapi import Depends
-from sqlalchemy.orm import Session
-from .database import get_db_session
-from .item.repository import ItemRepoSA
-from .user.repository import UserRepoSA
+import os
+from contextlib import asynccontextmanager
+from functools import lru_cache
 
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from .cache import LRUCache
+from .config import (
+    CartSettings,
+    CartStoreSettings,
+    DatabaseSettings,
+    HttpCacheSettings,
+    ItemCacheSettings,
+    ItemEventSettings,
+    PasswordHasherSettings,
+    RepositorySettings,
+)
+from .database import db_session_scope, replica_session_scope
+from .item.events import ItemEventBroker, ItemEventRepoMemory, ItemEventRepoSA
+from .item.repository import ItemRepoCached, ItemRepoMemory, ItemRepoSA
+from .memory import MemoryStore
+from .read_your_writes import SAFE_METHODS, wrote_recently
+from .revisions import RevisionRepoMemory, RevisionRepoSA
+from .unit_of_work import UnitOfWorkMemory, UnitOfWorkSA
+from .user.cart_store import CartStoreMemory
+from .user.passwords import PasswordHasher
+from .user.repository import UserRepoMemory, UserRepoSA, UserRepoWriteBehind
 
-def get_user_repo(db: Session = Depends(get_db_session)):  # noqa: B008
+
+async def get_db(request: Request):
+    """
+    Dependency to provide a database session, None for the memory backend.
+    Requests that cannot write run on a replica, unless the client wrote
+    something recently and the replicas may not have caught up yet.
+    """
+    if get_repository_settings().BACKEND == "memory":
+        yield None
+        return
+
+    settings = get_database_settings()
+    if request.method in SAFE_METHODS and not wrote_recently(
+        request.cookies, settings.READ_YOUR_WRITES_SECONDS
+    ):
+        scope = replica_session_scope()
+    else:
+        scope = db_session_scope()
+
+    async with scope as db:
+        yield db
+
+
+def get_unit_of_work(db: AsyncSession | None = Depends(get_db)):  # noqa: B008
+    """Dependency to provide the UnitOfWork shared by the request's repositories."""
+    if db is None:
+        return UnitOfWorkMemory()
+    return UnitOfWorkSA(db)
+
+
+def get_user_repo(db: AsyncSession | None = Depends(get_db)):  # noqa: B008
     """Dependency to provide UserRepo."""
-    return UserRepoSA(db)
+    if db is None:
+        return UserRepoMemory(get_memory_store())
+
+    repo = UserRepoSA(db)
+    store = get_cart_store()
+    if store is None:
+        return repo
+    return UserRepoWriteBehind(repo, store)
 
 
-def get_item_repo(db: Session = Depends(get_db_session)):  # noqa: B008
+def get_item_repo(db: AsyncSession | None = Depends(get_db)):  # noqa: B008
     """Dependency to provide ItemRepo."""
-    return ItemRepoSA(db)
+    if db is None:
+        return ItemRepoMemory(get_memory_store())
+
+    repo = ItemRepoSA(db)
+    cache = get_item_cache()
+    if cache is None:
+        return repo
+    return ItemRepoCached(repo, cache)
+
+
+def get_item_event_repo(db: AsyncSession | None = Depends(get_db)):  # noqa: B008
+    """Dependency to provide ItemEventRepo."""
+    if db is None:
+        return ItemEventRepoMemory(get_memory_store())
+    return ItemEventRepoSA(db)
+
+
+def get_revision_repo(db: AsyncSession | None = Depends(get_db)):  # noqa: B008
+    """Dependency to provide RevisionRepo."""
+    if db is None:
+        return RevisionRepoMemory(get_memory_store())
+    return RevisionRepoSA(db)
+
+
+@lru_cache
+def get_database_settings():
+    """Dependency to provide DatabaseSettings."""
+    return DatabaseSettings()
+
+
+@lru_cache
+def get_repository_settings():
+    """Dependency to provide RepositorySettings."""
+    return RepositorySettings()
+
+
+@lru_cache
+def get_memory_store():
+    """Process-wide state of the in-memory repositories."""
+    return MemoryStore()
+
+
+@lru_cache
+def get_cart_store():
+    """Process-wide write-behind cart store, None when carts go to the database."""
+    settings = CartStoreSettings()
+    if settings.BACKEND != "write_behind":
+        return None
+    return CartStoreMemory(settings.JOURNAL_PATH, settings.JOURNAL_FSYNC)
+
+
+@lru_cache
+def get_item_cache():
+    """Process-wide item cache, None when caching is disabled."""
+    settings = ItemCacheSettings()
+    if not settings.ENABLED:
+        return None
+    return LRUCache(max_size=settings.MAX_SIZE, ttl=settings.TTL_SECONDS)
+
+
+@lru_cache
+def get_item_event_settings():
+    """Dependency to provide ItemEventSettings."""
+    return ItemEventSettings()
+
+
+@lru_cache
+def get_item_event_broker():
+    """Process-wide broker handing the relayed item events to their followers."""
+    return ItemEventBroker(get_item_event_settings().MAX_PENDING)
+
+
+@lru_cache
+def get_password_hasher():
+    """Process-wide pool hashing the passwords of new users."""
+    settings = PasswordHasherSettings()
+    return PasswordHasher(
+        workers=settings.WORKERS,
+        max_pending=settings.MAX_PENDING,
+        queue_timeout=settings.QUEUE_TIMEOUT_SECONDS,
+        use_processes=settings.USE_PROCESSES,
+    )
+
+
+@lru_cache
+def get_cart_settings():
+    """Dependency to provide CartSettings."""
+    return CartSettings()
+
+
+@lru_cache
+def get_http_cache_settings():
+    """Dependency to provide HttpCacheSettings."""
+    return HttpCacheSettings()
+
+
+@asynccontextmanager
+async def db_scope():
+    """
+    The same database session for code running outside of a request, always
+    on the primary. None for the memory backend.
+    """
+    if get_repository_settings().BACKEND == "memory":
+        yield None
+        return
+
+    async with db_session_scope() as db:
+        yield db
+
+
+@asynccontextmanager
+async def item_event_repo_scope():
+    """
+    An ItemEventRepo on the primary, for code running outside of a request
+    or for longer than a session should be held, such as event streams.
+    """
+    async with db_scope() as db:
+        yield get_item_event_repo(db)
+
+
+def _forget_process_state():
+    # the threads of the parent's pools do not survive a fork
+    get_password_hasher.cache_clear()
+    get_item_event_broker.cache_clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_process_state)
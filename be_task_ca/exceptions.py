@@ -20,3 +20,23 @@ class ItemQuantityError(Exception):
 
 class ItemAlreadyInCartError(Exception):
     pass
+
+
+class CartEmptyError(Exception):
+    pass
+
+
+class PasswordHasherBusyError(Exception):
+    pass
+
+
+class InvalidCursorError(Exception):
+    pass
+
+
+class InvalidItemImportError(Exception):
+    pass
+
+
+class ItemEventsGoneError(Exception):
+    pass
@@ -1,12 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
 
-from ..dependencies import get_item_repo
-from ..exceptions import ItemAlreadyExistsError
+from ..cache import CacheStats
+from ..config import HttpCacheSettings, ItemEventSettings
+from ..dependencies import (
+    get_http_cache_settings,
+    get_item_cache,
+    get_item_event_broker,
+    get_item_event_settings,
+    get_item_repo,
+    get_revision_repo,
+    get_unit_of_work,
+    item_event_repo_scope,
+)
+from ..exceptions import (
+    InvalidCursorError,
+    InvalidItemImportError,
+    ItemAlreadyExistsError,
+    ItemEventsGoneError,
+)
 from ..item.repository import ItemRepo
+from ..responses import ModelResponse, cache_control, etag_matches
+from ..revisions import RevisionRepo
+from ..unit_of_work import UnitOfWork
 
-from .usecases import create_item, get_all
+from .events import ItemEventBroker
+from .export import to_csv, to_ndjson, to_sse
+from .imports import parse_json_array, parse_ndjson
+from .usecases import (
+    DEFAULT_PAGE_SIZE,
+    IMPORT_BATCH_SIZE,
+    MAX_IMPORT_BATCH_SIZE,
+    MAX_PAGE_SIZE,
+    MAX_SEARCH_OFFSET,
+    create_item,
+    export_all,
+    follow_item_events,
+    get_catalog_version,
+    get_page,
+    import_items,
+    search,
+)
 
-from .schema import AllItemsRepsonse, ItemBase, Item
+from .schema import (
+    AllItemsRepsonse,
+    ExportFormat,
+    ItemBase,
+    ItemFilter,
+    ItemImportReport,
+    Item,
+    SearchResponse,
+)
 
 
 item_router = APIRouter(
@@ -17,10 +70,12 @@ item_router = APIRouter(
 
 @item_router.post("/")
 async def post_item(
-    item: ItemBase, item_repo: ItemRepo = Depends(get_item_repo)
+    item: ItemBase,
+    uow: UnitOfWork = Depends(get_unit_of_work),
+    item_repo: ItemRepo = Depends(get_item_repo),
 ) -> Item:
     try:
-        return create_item(item_repo, item)
+        return await create_item(uow, item_repo, item)
     except ItemAlreadyExistsError as e:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -28,7 +83,139 @@ async def post_item(
         )
 
 
-@item_router.get("/")
-async def get_items(item_repo: ItemRepo = Depends(get_item_repo)) -> AllItemsRepsonse:
-    items = get_all(item_repo)
-    return AllItemsRepsonse(items=items)
+@item_router.post("/bulk")
+async def post_items_bulk(
+    request: Request,
+    upsert: bool = False,
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=MAX_IMPORT_BATCH_SIZE),
+    uow: UnitOfWork = Depends(get_unit_of_work),
+    item_repo: ItemRepo = Depends(get_item_repo),
+) -> ItemImportReport:
+    """
+    Import a JSON array of items, or newline delimited JSON when sent as
+    application/x-ndjson.
+    """
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        rows = parse_ndjson(request.stream())
+    else:
+        rows = parse_json_array(await request.body())
+
+    try:
+        return await import_items(uow, item_repo, rows, upsert, batch_size)
+    except InvalidItemImportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+@item_router.get("/", response_model=AllItemsRepsonse)
+async def get_items(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    min_price: float | None = Query(None, ge=0),
+    max_price: float | None = Query(None, ge=0),
+    in_stock: bool | None = None,
+    if_none_match: str | None = Header(None),
+    item_repo: ItemRepo = Depends(get_item_repo),
+    revision_repo: RevisionRepo = Depends(get_revision_repo),
+    http_cache_settings: HttpCacheSettings = Depends(get_http_cache_settings),
+) -> Response:
+    # read before the page, so that the page is never older than its ETag
+    version = await get_catalog_version(
+        revision_repo, http_cache_settings.CATALOG_STOCK_STALENESS_SECONDS
+    )
+    etag = f'"catalog-{version}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control(
+            public=True, max_age=http_cache_settings.CATALOG_MAX_AGE_SECONDS
+        ),
+    }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    filters = ItemFilter(min_price=min_price, max_price=max_price, in_stock=in_stock)
+    try:
+        items, next_cursor = await get_page(item_repo, limit, cursor, filters)
+        return ModelResponse(
+            AllItemsRepsonse.model_construct(items=items, next_cursor=next_cursor),
+            headers=headers,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+@item_router.get("/search", response_model=SearchResponse)
+async def search_items(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+    item_repo: ItemRepo = Depends(get_item_repo),
+) -> ModelResponse:
+    items, next_offset = await search(item_repo, q, limit, offset)
+    return ModelResponse(
+        SearchResponse.model_construct(items=items, next_offset=next_offset)
+    )
+
+
+@item_router.get("/export")
+async def export_items(
+    format: ExportFormat = ExportFormat.NDJSON,
+    item_repo: ItemRepo = Depends(get_item_repo),
+) -> StreamingResponse:
+    items = export_all(item_repo)
+    if format == ExportFormat.CSV:
+        return StreamingResponse(to_csv(items), media_type="text/csv")
+    return StreamingResponse(to_ndjson(items), media_type="application/x-ndjson")
+
+
+@item_router.get("/events")
+async def get_item_events(
+    after: int | None = Query(None, ge=0),
+    last_event_id: str | None = Header(None),
+    broker: ItemEventBroker = Depends(get_item_event_broker),
+    settings: ItemEventSettings = Depends(get_item_event_settings),
+) -> StreamingResponse:
+    """
+    Server-Sent Events with the new state of every item changed from now on,
+    or since offset `after`. An EventSource reconnecting resends the ID of
+    the last event it got as Last-Event-ID, which takes precedence.
+    """
+    if last_event_id is not None:
+        if not last_event_id.isdigit():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Last-Event-ID must be an offset",
+            )
+        after = int(last_event_id)
+
+    try:
+        events = await follow_item_events(
+            item_event_repo_scope,
+            broker,
+            after,
+            settings.BATCH_SIZE,
+            settings.KEEPALIVE_SECONDS,
+        )
+    except ItemEventsGoneError as e:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=str(e),
+        )
+    return StreamingResponse(
+        to_sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
+@item_router.get("/cache-stats")
+async def get_cache_stats() -> CacheStats:
+    cache = get_item_cache()
+    if cache is None:
+        return CacheStats()
+    return cache.stats()
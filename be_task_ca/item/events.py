@@ -0,0 +1,245 @@
+import asyncio
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Iterable, List, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import (
+    DateTime,
+    bindparam,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    update,
+)
+
+from ..memory import MemoryStore
+from .model import Item, ItemOutbox
+from .schema import Item as ItemSchema, ItemEvent
+
+# items changed by the writes of a session, written to the outbox when it commits
+_CHANGED_IDS = "changed_item_ids"
+_CHANGED_NAMES = "changed_item_names"
+
+OUTBOX_COLUMNS = ["item_id", "name", "description", "price", "quantity", "created_at"]
+
+# taken by the transaction numbering events, on Postgres
+_NUMBERING_LOCK = 0x17E3_0E7E
+
+
+def record_item_changes(db, ids: Iterable[UUID] = (), names: Iterable[str] = ()):
+    """
+    Note that the session's transaction changed the given items, by ID or by
+    name. UnitOfWorkSA writes their new state to the outbox when committing.
+    """
+    db.info.setdefault(_CHANGED_IDS, set()).update(ids)
+    db.info.setdefault(_CHANGED_NAMES, set()).update(names)
+
+
+def pop_item_changes(db) -> Tuple[Set[UUID], Set[str]]:
+    return db.info.pop(_CHANGED_IDS, set()), db.info.pop(_CHANGED_NAMES, set())
+
+
+async def write_outbox(db, ids: Set[UUID], names: Set[str]) -> None:
+    """
+    Append the current state of the given items to the outbox, in the
+    session's transaction. The events get their offsets once committed.
+    """
+    now = literal(datetime.now(timezone.utc), DateTime(timezone=True))
+    await db.execute(
+        insert(ItemOutbox.__table__).from_select(
+            OUTBOX_COLUMNS,
+            select(Item.id, Item.name, Item.description, Item.price, Item.quantity, now)
+            .where(or_(Item.id.in_(ids), Item.name.in_(names)))
+            .order_by(Item.id),
+        )
+    )
+
+
+class ItemEventRepo(ABC):
+    """
+    The outbox of item changes, read as a stream of events numbered by
+    increasing offsets.
+    """
+
+    @abstractmethod
+    async def number_events(self, limit: int) -> int:
+        """
+        Give the oldest `limit` committed events without an offset the next
+        offsets. Transactions commit in any order, so events only get their
+        offset, and are only read, once committed: a reader that has seen an
+        offset can never miss a lower one. Returns the number of events
+        numbered.
+        """
+        pass
+
+    @abstractmethod
+    async def get_events(self, after: int, limit: int) -> List[ItemEvent]:
+        """
+        The oldest `limit` events whose offset is above `after`.
+        """
+        pass
+
+    @abstractmethod
+    async def get_offsets(self) -> Tuple[int, int]:
+        """
+        The offsets of the oldest and of the latest event kept, (0, 0) when
+        there was never any.
+        """
+        pass
+
+    @abstractmethod
+    async def prune(self, before: datetime) -> int:
+        """
+        Drop the events older than `before`, always keeping the latest one so
+        that offsets carry on from it. Returns the number of events dropped.
+        """
+        pass
+
+
+class ItemEventRepoSA(ItemEventRepo):
+    def __init__(self, db):
+        self.db = db
+
+    async def number_events(self, limit: int) -> int:
+        if self.db.get_bind().dialect.name == "postgresql":
+            # one numbering at a time across processes, until the commit
+            # (SQLite has a single writer anyway)
+            await self.db.execute(select(func.pg_advisory_xact_lock(_NUMBERING_LOCK)))
+        last = await self.db.scalar(select(func.max(ItemOutbox.position)))
+        ids = list(
+            await self.db.scalars(
+                select(ItemOutbox.id)
+                .where(ItemOutbox.position.is_(None))
+                .order_by(ItemOutbox.id)
+                .limit(limit)
+            )
+        )
+        if ids:
+            await self.db.execute(
+                update(ItemOutbox.__table__)
+                .where(ItemOutbox.id == bindparam("row_id"))
+                .values(position=bindparam("new_position")),
+                [
+                    {"row_id": id, "new_position": (last or 0) + number}
+                    for number, id in enumerate(ids, 1)
+                ],
+            )
+        return len(ids)
+
+    async def get_events(self, after: int, limit: int) -> List[ItemEvent]:
+        rows = await self.db.execute(
+            select(ItemOutbox.__table__)
+            .where(ItemOutbox.position > after)
+            .order_by(ItemOutbox.position)
+            .limit(limit)
+        )
+        return [
+            ItemEvent(
+                offset=row.position,
+                item=ItemSchema(
+                    id=row.item_id,
+                    name=row.name,
+                    description=row.description,
+                    price=row.price,
+                    quantity=row.quantity,
+                ),
+            )
+            for row in rows
+        ]
+
+    async def get_offsets(self) -> Tuple[int, int]:
+        offsets = select(func.min(ItemOutbox.position), func.max(ItemOutbox.position))
+        first, last = (await self.db.execute(offsets)).one()
+        return first or 0, last or 0
+
+    async def prune(self, before: datetime) -> int:
+        latest = select(func.max(ItemOutbox.position)).scalar_subquery()
+        # events yet to be numbered are never dropped
+        result = await self.db.execute(
+            delete(ItemOutbox).where(
+                ItemOutbox.created_at < before, ItemOutbox.position < latest
+            )
+        )
+        return result.rowcount
+
+
+class ItemEventRepoMemory(ItemEventRepo):
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    async def number_events(self, limit: int) -> int:
+        # numbered as they are appended, there being no transactions
+        return 0
+
+    async def get_events(self, after: int, limit: int) -> List[ItemEvent]:
+        with self.store.lock:
+            events = self.store.item_events
+            if not events:
+                return []
+            # offsets follow each other without gaps
+            start = max(0, after + 1 - events[0][1].offset)
+            return [event for _, event in islice(events, start, start + limit)]
+
+    async def get_offsets(self) -> Tuple[int, int]:
+        with self.store.lock:
+            events = self.store.item_events
+            if not events:
+                return 0, 0
+            return events[0][1].offset, events[-1][1].offset
+
+    async def prune(self, before: datetime) -> int:
+        pruned = 0
+        with self.store.lock:
+            events = self.store.item_events
+            while len(events) > 1 and events[0][0] < before:
+                events.popleft()
+                pruned += 1
+        return pruned
+
+
+class Subscription:
+    """
+    The events published since subscribing, waiting to be sent to a client.
+    """
+
+    def __init__(self, max_pending: int):
+        self.events: asyncio.Queue[ItemEvent] = asyncio.Queue(max_pending)
+        # events were dropped for lack of room, the client has to catch up
+        # from the outbox
+        self.overflowed = False
+
+
+class ItemEventBroker:
+    """
+    Hands the events read from the outbox by the relay of this process to
+    every client following them. A client too slow to keep up is not waited
+    for: it misses events and catches up from the outbox instead.
+    """
+
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self.subscriptions: Set[Subscription] = set()
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.max_pending)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+
+    def publish(self, events: List[ItemEvent]):
+        for subscription in self.subscriptions:
+            if subscription.overflowed:
+                continue
+            for event in events:
+                try:
+                    subscription.events.put_nowait(event)
+                except asyncio.QueueFull:
+                    subscription.overflowed = True
+                    break
@@ -0,0 +1,67 @@
+import csv
+import io
+from typing import AsyncIterator, List
+
+from .schema import Item, ItemEvent
+
+CSV_FIELDS = ["id", "name", "description", "price", "quantity"]
+
+
+async def to_ndjson(
+    items: AsyncIterator[Item], chunk_size: int = 500
+) -> AsyncIterator[str]:
+    """
+    Serialise items as newline delimited JSON, one object per line.
+    """
+    lines: List[str] = []
+    async for item in items:
+        lines.append(item.model_dump_json() + "\n")
+        if len(lines) >= chunk_size:
+            yield "".join(lines)
+            lines = []
+
+    if lines:
+        yield "".join(lines)
+
+
+async def to_csv(
+    items: AsyncIterator[Item], chunk_size: int = 500
+) -> AsyncIterator[str]:
+    """
+    Serialise items as CSV with a header row.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(CSV_FIELDS)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    rows = 0
+    async for item in items:
+        writer.writerow(
+            [item.id, item.name, item.description, item.price, item.quantity]
+        )
+        rows += 1
+        if rows >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+
+    if rows:
+        yield buffer.getvalue()
+
+
+async def to_sse(events: AsyncIterator[ItemEvent | None]) -> AsyncIterator[str]:
+    """
+    Serialise item events as Server-Sent Events, with their offset as ID.
+    None becomes a comment, keeping idle connections open.
+    """
+    async for event in events:
+        if event is None:
+            yield ": keepalive\n\n"
+        else:
+            data = event.item.model_dump_json()
+            yield f"id: {event.offset}\nevent: item\ndata: {data}\n\n"
@@ -0,0 +1,46 @@
+import json
+from typing import Any, AsyncIterator, Tuple
+
+from ..exceptions import InvalidItemImportError
+
+
+def _loads(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError:
+        # reported as an invalid row rather than failing the whole import
+        return None
+
+
+async def parse_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Parse newline delimited JSON as it arrives, yielding (row number, value)
+    for every non-blank line.
+    """
+    row = 0
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                row += 1
+                yield row, _loads(line)
+
+    if buffer.strip():
+        yield row + 1, _loads(buffer)
+
+
+async def parse_json_array(body: bytes) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Parse a JSON array, yielding (row number, value) for each element.
+    """
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise InvalidItemImportError("Request body is not valid JSON") from e
+    if not isinstance(payload, list):
+        raise InvalidItemImportError("Request body must be a JSON array of items")
+
+    for row, value in enumerate(payload, start=1):
+        yield row, value
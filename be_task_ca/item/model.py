@@ -1,10 +1,18 @@
 from dataclasses import dataclass
+from datetime import datetime
 from uuid import UUID, uuid4
 
+from sqlalchemy import DDL, DateTime, Index, event, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from ..database import Base
 
+# the words searched on Postgres, the query has to use the very same
+# expression for the planner to pick the index built on it
+SEARCH_DOCUMENT = (
+    "to_tsvector('simple'::regconfig, name || ' ' || coalesce(description, ''))"
+)
+
 
 @dataclass
 class Item(Base):
@@ -19,3 +27,67 @@ class Item(Base):
     description: Mapped[str | None] = mapped_column(default=None, nullable=True)
     price: Mapped[float] = mapped_column()
     quantity: Mapped[int] = mapped_column()
+
+    __table_args__ = (
+        # keyset pagination walks the catalog ordered by (name, id)
+        Index("ix_items_name_id", "name", "id"),
+        Index("ix_items_price", "price"),
+        Index(
+            "ix_items_in_stock_name_id",
+            "name",
+            "id",
+            postgresql_where=quantity > 0,
+            sqlite_where=quantity > 0,
+        ),
+        # full-text and typo tolerant search, the other backends keep an
+        # in-process index instead (see search.py)
+        Index("ix_items_search", text(SEARCH_DOCUMENT), postgresql_using="gin").ddl_if(
+            dialect="postgresql"
+        ),
+        Index(
+            "ix_items_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+@dataclass
+class ItemOutbox(Base):
+    """
+    The state of an item after each committed transaction that changed it,
+    written in that transaction. The position, given once the row is
+    committed (see ItemEventRepo.number_events), is the offset clients
+    resume from.
+    """
+
+    __tablename__ = "item_outbox"
+
+    # in the order rows were written, which is not the order of the commits
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    position: Mapped[int | None] = mapped_column(nullable=True, unique=True)
+    item_id: Mapped[UUID] = mapped_column()
+    name: Mapped[str] = mapped_column()
+    description: Mapped[str | None] = mapped_column(nullable=True)
+    price: Mapped[float] = mapped_column()
+    quantity: Mapped[int] = mapped_column()
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+
+    __table_args__ = (
+        # the rows still to be numbered
+        Index(
+            "ix_item_outbox_unnumbered",
+            "id",
+            postgresql_where=position.is_(None),
+            sqlite_where=position.is_(None),
+        ),
+        {"sqlite_autoincrement": True},
+    )
+
+
+event.listen(
+    Item.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -1,46 +1,190 @@
 from abc import ABC, abstractmethod
-from typing import List
-from uuid import UUID
+from bisect import bisect_right
+from functools import partial
+from itertools import islice
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Set, Tuple
+from uuid import UUID, uuid4
+from weakref import WeakKeyDictionary
 
-from .schema import ItemBase, Item as ItemSchema
-from .model import Item
+from pydantic import TypeAdapter
+from sqlalchemy import (
+    bindparam,
+    case,
+    func,
+    literal,
+    literal_column,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.exc import IntegrityError
+
+from ..cache import CacheBackend
+from ..database import on_commit, on_rollback, upsert_insert
+from ..exceptions import ItemAlreadyExistsError
+from ..memory import MemoryStore
+from ..revisions import CATALOG, RevisionRepoSA, bumped_version, record_change
+from .schema import ItemBase, ItemFilter, Item as ItemSchema
+from .events import record_item_changes
+from .model import SEARCH_DOCUMENT, Item
+from .search import SearchIndex, tokenize
+
+
+# validates plain rows in one call, without ORM instances in between
+_item_list = TypeAdapter(List[ItemSchema])
+
+# the in-process search index of each database without one of its own
+_search_indexes: "WeakKeyDictionary[object, SearchIndex]" = WeakKeyDictionary()
 
 
 class ItemRepo(ABC):
     @abstractmethod
-    def save_item(self, item: ItemBase) -> ItemSchema:
+    async def save_item(self, item: ItemBase) -> ItemSchema:
         """
         Save an item to the database.
         """
         pass
 
     @abstractmethod
-    def get_all_items(self) -> List[ItemSchema]:
+    async def save_items(self, items: List[ItemBase]) -> Set[str]:
+        """
+        Insert many items at once, skipping those whose name is already
+        taken. Returns the names of the items that were inserted.
+        """
+        pass
+
+    @abstractmethod
+    async def update_items(self, items: List[ItemBase]) -> None:
+        """
+        Overwrite the existing items with the same names as the given ones.
+        """
+        pass
+
+    @abstractmethod
+    async def find_existing_names(self, names: List[str]) -> Set[str]:
+        """
+        Return which of the given names are already used by an item.
+        """
+        pass
+
+    @abstractmethod
+    async def get_all_items(self) -> List[ItemSchema]:
         """
         Retrieve all items from the database.
         """
         pass
 
     @abstractmethod
-    def find_item_by_name(self, name: str) -> ItemSchema | None:
+    def stream_items(self, batch_size: int) -> AsyncIterator[ItemSchema]:
+        """
+        Iterate over every item ordered by (name, id), fetching rows from the
+        database in batches of `batch_size` instead of loading them all.
+        """
+        pass
+
+    @abstractmethod
+    async def get_items_page(
+        self,
+        limit: int,
+        after: Tuple[str, UUID] | None = None,
+        filters: ItemFilter | None = None,
+    ) -> List[ItemSchema]:
+        """
+        Retrieve at most `limit` items ordered by (name, id), starting after
+        the given (name, id) key and matching the given filters.
+        """
+        pass
+
+    @abstractmethod
+    async def find_item_by_name(self, name: str) -> ItemSchema | None:
         """
         Find an item by its name.
         """
         pass
 
     @abstractmethod
-    def find_item_by_id(self, id: UUID) -> ItemSchema | None:
+    async def find_item_by_id(self, id: UUID) -> ItemSchema | None:
         """
         Find an item by its ID.
         """
         pass
 
+    @abstractmethod
+    async def find_items_by_ids(self, ids: List[UUID]) -> List[ItemSchema]:
+        """
+        Find all the items with the given IDs.
+        """
+        pass
+
+    @abstractmethod
+    async def search_items(
+        self, query: str, limit: int, offset: int = 0
+    ) -> List[ItemSchema]:
+        """
+        Retrieve at most `limit` items, skipping the first `offset`, whose name
+        or description has every word of the query, as typed, as the start of
+        a word or with a typo. Best matches come first, then by name.
+        """
+        pass
+
+    @abstractmethod
+    async def reserve_stock(self, id: UUID, quantity: int) -> bool:
+        """
+        Atomically take `quantity` units of an item out of stock. Returns False,
+        leaving the stock untouched, if the item does not exist or has fewer
+        units left. Raises ValueError unless `quantity` is positive.
+        """
+        pass
+
+    @abstractmethod
+    async def reserve_stock_batch(self, quantities: Dict[UUID, int]) -> Set[UUID]:
+        """
+        Atomically take units of several items out of stock, keyed by item ID.
+        Each item is reserved only if it has enough units left; returns the IDs
+        of the items that were reserved. Raises ValueError unless every
+        quantity is positive.
+        """
+        pass
+
+    @abstractmethod
+    async def release_stock(self, quantities: Dict[UUID, int]) -> None:
+        """
+        Put previously reserved units back in stock, keyed by item ID. Raises
+        ValueError unless every quantity is positive.
+        """
+        pass
+
 
 class ItemRepoSA(ItemRepo):
     def __init__(self, db):
         self.db = db
 
-    def save_item(self, item: ItemBase) -> ItemSchema:
+    def _search_index(self) -> SearchIndex | None:
+        bind = self.db.get_bind()
+        if bind.dialect.name == "postgresql":
+            return None
+        return _search_indexes.setdefault(bind, SearchIndex())
+
+    def _index_on_commit(self, change: Callable[[SearchIndex], None]):
+        if self._search_index() is None:
+            return
+
+        async def apply():
+            index = self._search_index()
+            version = bumped_version(self.db, CATALOG)
+            if index is None or version is None:
+                return
+            with index.lock:
+                # only onto the revision it follows, or the one it made, an
+                # index that missed a change is rebuilt by the next search
+                if index.version in (version - 1, version):
+                    change(index)
+                    index.version = version
+
+        on_commit(self.db, apply)
+
+    async def save_item(self, item: ItemBase) -> ItemSchema:
         new_item = Item(
             name=item.name,
             description=item.description,
@@ -48,23 +192,497 @@ class ItemRepoSA(ItemRepo):
             quantity=item.quantity,
         )
 
-        self.db.add(new_item)
-        self.db.commit()
+        try:
+            # lets a concurrent insert with the same name fail on its own
+            async with self.db.begin_nested():
+                self.db.add(new_item)
+        except IntegrityError as e:
+            raise ItemAlreadyExistsError("An item with this name already exists") from e
 
+        record_change(self.db, CATALOG)
+        record_item_changes(self.db, ids=[new_item.id])
+        row = (new_item.id, new_item.name, new_item.description)
+        self._index_on_commit(lambda index: index.add(*row))
         return ItemSchema.model_validate(new_item)
 
-    def get_all_items(self) -> List[ItemSchema]:
-        items = self.db.query(Item).all()
-        return [ItemSchema.model_validate(item) for item in items]
+    async def save_items(self, items: List[ItemBase]) -> Set[str]:
+        if not items:
+            return set()
+
+        result = await self.db.execute(
+            upsert_insert(self.db, Item.__table__)
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(Item.id, Item.name, Item.description),
+            [item.model_dump() for item in items],
+        )
+        rows = result.all()
+        if rows:
+            record_change(self.db, CATALOG)
+            record_item_changes(self.db, ids=[row.id for row in rows])
+            self._index_on_commit(lambda index: index.add_many(rows))
+        return {row.name for row in rows}
+
+    async def update_items(self, items: List[ItemBase]) -> None:
+        if not items:
+            return
+
+        await self.db.execute(
+            update(Item.__table__)
+            .where(Item.name == bindparam("item_name"))
+            .values(
+                description=bindparam("new_description"),
+                price=bindparam("new_price"),
+                quantity=bindparam("new_quantity"),
+            ),
+            [
+                {
+                    "item_name": item.name,
+                    "new_description": item.description,
+                    "new_price": item.price,
+                    "new_quantity": item.quantity,
+                }
+                for item in sorted(items, key=lambda item: item.name)
+            ],
+        )
+        record_change(self.db, CATALOG)
+        record_item_changes(self.db, names=[item.name for item in items])
+
+        def update_index(index: SearchIndex):
+            for item in items:
+                index.update_description(item.name, item.description)
+
+        self._index_on_commit(update_index)
+
+    async def find_existing_names(self, names: List[str]) -> Set[str]:
+        if not names:
+            return set()
+
+        result = await self.db.scalars(select(Item.name).where(Item.name.in_(names)))
+        return set(result)
+
+    async def get_all_items(self) -> List[ItemSchema]:
+        rows = await self.db.execute(select(Item.__table__))
+        return _item_list.validate_python(rows, from_attributes=True)
+
+    async def stream_items(self, batch_size: int) -> AsyncIterator[ItemSchema]:
+        # plain rows rather than ORM entities: nothing is kept in the session
+        query = (
+            select(Item.__table__)
+            .order_by(Item.name, Item.id)
+            .execution_options(yield_per=batch_size)
+        )
+        rows = await self.db.stream(query)
+        async for row in rows:
+            yield ItemSchema.model_validate(row)
 
-    def find_item_by_name(self, name: str) -> ItemSchema | None:
-        item = self.db.query(Item).filter(Item.name == name).first()
+    async def get_items_page(
+        self,
+        limit: int,
+        after: Tuple[str, UUID] | None = None,
+        filters: ItemFilter | None = None,
+    ) -> List[ItemSchema]:
+        query = select(Item.__table__).order_by(Item.name, Item.id).limit(limit)
+
+        if after is not None:
+            query = query.where(tuple_(Item.name, Item.id) > tuple(after))
+
+        if filters is not None:
+            if filters.min_price is not None:
+                query = query.where(Item.price >= filters.min_price)
+            if filters.max_price is not None:
+                query = query.where(Item.price <= filters.max_price)
+            if filters.in_stock is True:
+                query = query.where(Item.quantity > 0)
+            elif filters.in_stock is False:
+                query = query.where(Item.quantity <= 0)
+
+        rows = await self.db.execute(query)
+        return _item_list.validate_python(rows, from_attributes=True)
+
+    async def find_item_by_name(self, name: str) -> ItemSchema | None:
+        # stock is changed with plain UPDATEs, so refresh any loaded instance
+        item = await self.db.scalar(
+            select(Item)
+            .where(Item.name == name)
+            .execution_options(populate_existing=True)
+        )
         if not item:
             return None
         return ItemSchema.model_validate(item)
 
-    def find_item_by_id(self, id: UUID) -> ItemSchema | None:
-        item = self.db.query(Item).filter(Item.id == id).first()
+    async def find_item_by_id(self, id: UUID) -> ItemSchema | None:
+        item = await self.db.scalar(
+            select(Item).where(Item.id == id).execution_options(populate_existing=True)
+        )
         if not item:
             return None
         return ItemSchema.model_validate(item)
+
+    async def find_items_by_ids(self, ids: List[UUID]) -> List[ItemSchema]:
+        if not ids:
+            return []
+
+        items = await self.db.scalars(
+            select(Item)
+            .where(Item.id.in_(ids))
+            .execution_options(populate_existing=True)
+        )
+        return [ItemSchema.model_validate(item) for item in items]
+
+    async def search_items(
+        self, query: str, limit: int, offset: int = 0
+    ) -> List[ItemSchema]:
+        index = self._search_index()
+        if index is None:
+            return await self._search_postgres(query, limit, offset)
+
+        # kept up to date by the writes of this process, see _index_on_commit,
+        # and rebuilt once the catalog changed otherwise: written by another
+        # process, or seen through another bind, such as a read replica
+        version = int(await RevisionRepoSA(self.db).get_version(CATALOG))
+        if index.version != version:
+            # read after the revision, so the index holds at least what it says
+            rows = await self.db.execute(select(Item.id, Item.name, Item.description))
+            index = _search_indexes.get(self.db.get_bind(), index)
+            if index.version != version:
+                index = SearchIndex()
+                index.add_many(rows)
+                index.version = version
+                _search_indexes[self.db.get_bind()] = index
+
+        ids = index.search(query, limit, offset)
+        if not ids:
+            return []
+        rows = await self.db.execute(select(Item.__table__).where(Item.id.in_(ids)))
+        found = {
+            item.id: item
+            for item in _item_list.validate_python(rows, from_attributes=True)
+        }
+        return [found[id] for id in ids if id in found]
+
+    async def _search_postgres(
+        self, query: str, limit: int, offset: int
+    ) -> List[ItemSchema]:
+        words = tokenize(query)
+        if not words:
+            return []
+
+        # every word as typed or as the start of a word, both served by
+        # ix_items_search; names with a typo are found by ix_items_name_trgm
+        document = literal_column(SEARCH_DOCUMENT, TSVECTOR)
+        ts_query = func.to_tsquery(
+            literal_column("'simple'::regconfig"),
+            " & ".join(f"'{word}':*" for word in words),
+        )
+        phrase = literal(" ".join(words))
+        rank = func.ts_rank(document, ts_query) + func.word_similarity(
+            phrase, Item.name
+        )
+        rows = await self.db.execute(
+            select(Item.__table__)
+            .where(document.op("@@")(ts_query) | phrase.op("<%")(Item.name))
+            .order_by(rank.desc(), Item.name, Item.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        return _item_list.validate_python(rows, from_attributes=True)
+
+    async def reserve_stock(self, id: UUID, quantity: int) -> bool:
+        _check_quantities([quantity])
+        # the condition is evaluated under the row lock taken by the UPDATE,
+        # so concurrent reservations can never oversell
+        result = await self.db.execute(
+            update(Item.__table__)
+            .where(Item.id == id, Item.quantity >= quantity)
+            .values(quantity=Item.quantity - quantity)
+        )
+        if result.rowcount != 1:
+            return False
+        # stock levels are left out of the catalog revision, which would
+        # otherwise lock the same row for every cart write
+        record_item_changes(self.db, ids=[id])
+        return True
+
+    async def reserve_stock_batch(self, quantities: Dict[UUID, int]) -> Set[UUID]:
+        _check_quantities(quantities.values())
+        if not quantities:
+            return set()
+
+        ids = sorted(quantities)
+        # lock the rows in ID order first so that overlapping batches queue up
+        # instead of deadlocking (a no-op on SQLite)
+        await self.db.execute(
+            select(Item.id).where(Item.id.in_(ids)).order_by(Item.id).with_for_update()
+        )
+
+        requested = case(quantities, value=Item.id)
+        result = await self.db.execute(
+            update(Item.__table__)
+            .where(Item.id.in_(ids), Item.quantity >= requested)
+            .values(quantity=Item.quantity - requested)
+            .returning(Item.id)
+        )
+        reserved = set(result.scalars())
+        record_item_changes(self.db, ids=reserved)
+        return reserved
+
+    async def release_stock(self, quantities: Dict[UUID, int]) -> None:
+        _check_quantities(quantities.values())
+        if not quantities:
+            return
+
+        # a stable lock order keeps concurrent releases from deadlocking
+        await self.db.execute(
+            update(Item.__table__)
+            .where(Item.id == bindparam("item_id"))
+            .values(quantity=Item.quantity + bindparam("released")),
+            [{"item_id": id, "released": quantities[id]} for id in sorted(quantities)],
+        )
+        record_item_changes(self.db, ids=quantities)
+
+
+class ItemRepoCached(ItemRepo):
+    """
+    Read-through cache of items by ID in front of an ItemRepoSA. Every write
+    through this repository invalidates the items it touches once its
+    transaction is over.
+
+    Invalidations only reach the cache of this process: with several worker
+    processes, the others may serve an item changed elsewhere for up to the
+    cache's TTL.
+    """
+
+    def __init__(self, repo: ItemRepoSA, cache: CacheBackend):
+        self.repo = repo
+        self.cache = cache
+        self.db = repo.db
+
+    @staticmethod
+    def _key(id: UUID) -> str:
+        return f"item:{id}"
+
+    def _when_done(self, action: Callable[[], Awaitable[None]]):
+        # dropping entries any earlier, a concurrent read could put the state
+        # committed before back in the cache, and a read in this transaction
+        # its uncommitted state
+        on_commit(self.db, action)
+        on_rollback(self.db, action)
+
+    def _invalidate(self, ids: Iterable[UUID]):
+        keys = [self._key(id) for id in ids]
+        if keys:
+            self._when_done(partial(self.cache.delete_many, keys))
+
+    async def save_item(self, item: ItemBase) -> ItemSchema:
+        saved = await self.repo.save_item(item)
+        self._invalidate([saved.id])
+        return saved
+
+    async def save_items(self, items: List[ItemBase]) -> Set[str]:
+        # new items get new IDs, so nothing cached can be stale
+        return await self.repo.save_items(items)
+
+    async def update_items(self, items: List[ItemBase]) -> None:
+        # the cache is keyed by ID and these are matched by name
+        await self.repo.update_items(items)
+        self._when_done(self.cache.clear)
+
+    async def find_existing_names(self, names: List[str]) -> Set[str]:
+        return await self.repo.find_existing_names(names)
+
+    async def get_all_items(self) -> List[ItemSchema]:
+        return await self.repo.get_all_items()
+
+    def stream_items(self, batch_size: int) -> AsyncIterator[ItemSchema]:
+        return self.repo.stream_items(batch_size)
+
+    async def get_items_page(
+        self,
+        limit: int,
+        after: Tuple[str, UUID] | None = None,
+        filters: ItemFilter | None = None,
+    ) -> List[ItemSchema]:
+        return await self.repo.get_items_page(limit, after, filters)
+
+    async def find_item_by_name(self, name: str) -> ItemSchema | None:
+        return await self.repo.find_item_by_name(name)
+
+    async def find_item_by_id(self, id: UUID) -> ItemSchema | None:
+        items = await self.find_items_by_ids([id])
+        return items[0] if items else None
+
+    async def find_items_by_ids(self, ids: List[UUID]) -> List[ItemSchema]:
+        cached = await self.cache.get_many([self._key(id) for id in ids])
+        missing = [id for id in ids if self._key(id) not in cached]
+
+        if missing:
+            loaded = await self.repo.find_items_by_ids(missing)
+            fresh = {self._key(item.id): item for item in loaded}
+            await self.cache.set_many(fresh)
+            cached.update(fresh)
+
+        return [cached[self._key(id)] for id in ids if self._key(id) in cached]
+
+    async def search_items(
+        self, query: str, limit: int, offset: int = 0
+    ) -> List[ItemSchema]:
+        return await self.repo.search_items(query, limit, offset)
+
+    async def reserve_stock(self, id: UUID, quantity: int) -> bool:
+        _check_quantities([quantity])
+        reserved = await self.repo.reserve_stock(id, quantity)
+        if reserved:
+            self._invalidate([id])
+        return reserved
+
+    async def reserve_stock_batch(self, quantities: Dict[UUID, int]) -> Set[UUID]:
+        _check_quantities(quantities.values())
+        reserved = await self.repo.reserve_stock_batch(quantities)
+        self._invalidate(reserved)
+        return reserved
+
+    async def release_stock(self, quantities: Dict[UUID, int]) -> None:
+        _check_quantities(quantities.values())
+        await self.repo.release_stock(quantities)
+        self._invalidate(quantities)
+
+
+class ItemRepoMemory(ItemRepo):
+    """
+    Items kept in a MemoryStore, indexed by ID and by name. Writes are not
+    transactional: they are visible to everyone as soon as they are made.
+    """
+
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    async def save_item(self, item: ItemBase) -> ItemSchema:
+        with self.store.lock:
+            if item.name in self.store.item_ids_by_name:
+                raise ItemAlreadyExistsError("An item with this name already exists")
+            new_item = ItemSchema(id=uuid4(), **item.model_dump())
+            self.store.add_item(new_item)
+            self.store.record_item_event(new_item)
+            self.store.bump(CATALOG)
+        return new_item
+
+    async def save_items(self, items: List[ItemBase]) -> Set[str]:
+        inserted = set()
+        with self.store.lock:
+            for item in items:
+                if item.name in self.store.item_ids_by_name:
+                    continue
+                new_item = ItemSchema(id=uuid4(), **item.model_dump())
+                self.store.add_item(new_item)
+                self.store.record_item_event(new_item)
+                inserted.add(item.name)
+            if inserted:
+                self.store.bump(CATALOG)
+        return inserted
+
+    async def update_items(self, items: List[ItemBase]) -> None:
+        with self.store.lock:
+            for item in items:
+                id = self.store.item_ids_by_name.get(item.name)
+                if id is not None:
+                    self.store.items[id] = ItemSchema(id=id, **item.model_dump())
+                    self.store.search_index.add(id, item.name, item.description)
+                    self.store.record_item_event(self.store.items[id])
+            self.store.bump(CATALOG)
+
+    async def find_existing_names(self, names: List[str]) -> Set[str]:
+        with self.store.lock:
+            return {name for name in names if name in self.store.item_ids_by_name}
+
+    async def get_all_items(self) -> List[ItemSchema]:
+        with self.store.lock:
+            return list(self.store.items.values())
+
+    async def stream_items(self, batch_size: int) -> AsyncIterator[ItemSchema]:
+        after = None
+        while True:
+            batch = await self.get_items_page(batch_size, after)
+            for item in batch:
+                yield item
+            if len(batch) < batch_size:
+                return
+            after = (batch[-1].name, batch[-1].id)
+
+    async def get_items_page(
+        self,
+        limit: int,
+        after: Tuple[str, UUID] | None = None,
+        filters: ItemFilter | None = None,
+    ) -> List[ItemSchema]:
+        with self.store.lock:
+            keys = self.store.item_keys
+            start = 0 if after is None else bisect_right(keys, tuple(after))
+            items = (self.store.items[id] for _, id in islice(keys, start, None))
+            if filters is not None:
+                items = (item for item in items if _matches(item, filters))
+            return list(islice(items, limit))
+
+    async def find_item_by_name(self, name: str) -> ItemSchema | None:
+        with self.store.lock:
+            id = self.store.item_ids_by_name.get(name)
+            return None if id is None else self.store.items[id]
+
+    async def find_item_by_id(self, id: UUID) -> ItemSchema | None:
+        with self.store.lock:
+            return self.store.items.get(id)
+
+    async def find_items_by_ids(self, ids: List[UUID]) -> List[ItemSchema]:
+        with self.store.lock:
+            return [self.store.items[id] for id in ids if id in self.store.items]
+
+    async def search_items(
+        self, query: str, limit: int, offset: int = 0
+    ) -> List[ItemSchema]:
+        with self.store.lock:
+            ids = self.store.search_index.search(query, limit, offset)
+            return [self.store.items[id] for id in ids]
+
+    async def reserve_stock(self, id: UUID, quantity: int) -> bool:
+        return id in await self.reserve_stock_batch({id: quantity})
+
+    async def reserve_stock_batch(self, quantities: Dict[UUID, int]) -> Set[UUID]:
+        _check_quantities(quantities.values())
+        reserved = set()
+        with self.store.lock:
+            for id, quantity in quantities.items():
+                item = self.store.items.get(id)
+                if item is None or item.quantity < quantity:
+                    continue
+                self.store.items[id] = item.model_copy(
+                    update={"quantity": item.quantity - quantity}
+                )
+                self.store.record_item_event(self.store.items[id])
+                reserved.add(id)
+        return reserved
+
+    async def release_stock(self, quantities: Dict[UUID, int]) -> None:
+        _check_quantities(quantities.values())
+        with self.store.lock:
+            for id, quantity in quantities.items():
+                item = self.store.items.get(id)
+                if item is not None:
+                    self.store.items[id] = item.model_copy(
+                        update={"quantity": item.quantity + quantity}
+                    )
+                    self.store.record_item_event(self.store.items[id])
+
+
+def _check_quantities(quantities: Iterable[int]):
+    # a negative quantity would put stock back instead of taking it out
+    if any(quantity <= 0 for quantity in quantities):
+        raise ValueError("Stock quantities must be positive")
+
+
+def _matches(item: ItemSchema, filters: ItemFilter) -> bool:
+    if filters.min_price is not None and item.price < filters.min_price:
+        return False
+    if filters.max_price is not None and item.price > filters.max_price:
+        return False
+    if filters.in_stock is not None and (item.quantity > 0) != filters.in_stock:
+        return False
+    return True
@@ -1,3 +1,4 @@
+from enum import Enum
 from typing import List
 from uuid import UUID
 from pydantic import BaseModel, ConfigDict
@@ -16,5 +17,47 @@ class Item(ItemBase):
     id: UUID
 
 
+class ItemFilter(BaseModel):
+    min_price: float | None = None
+    max_price: float | None = None
+    in_stock: bool | None = None
+
+
 class AllItemsRepsonse(BaseModel):
     items: List[Item]
+    next_cursor: str | None = None
+
+
+class SearchResponse(BaseModel):
+    items: List[Item]
+    next_offset: int | None = None
+
+
+class ItemEvent(BaseModel):
+    # position in the stream of changes, to resume from
+    offset: int
+    item: Item
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class ImportConflictReason(str, Enum):
+    INVALID = "invalid"
+    DUPLICATE_IN_UPLOAD = "duplicate_in_upload"
+    ALREADY_EXISTS = "already_exists"
+
+
+class ItemImportConflict(BaseModel):
+    row: int
+    name: str | None = None
+    reason: ImportConflictReason
+    detail: str | None = None
+
+
+class ItemImportReport(BaseModel):
+    created: int = 0
+    updated: int = 0
+    conflicts: List[ItemImportConflict] = []
@@ -0,0 +1,261 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+from uuid import UUID
+
+# how much a query word matching an indexed word counts, by kind of match
+EXACT, PREFIX, TYPO = 10, 8, 5
+# matches in the name count more than in the description
+NAME, DESCRIPTION = 2, 1
+# the most indexed words a query word expands to by prefix
+MAX_EXPANSIONS = 50
+# shorter query words are not corrected, they have too many neighbours
+MIN_TYPO_LENGTH = 4
+
+_WORD = re.compile(r"\w+")
+
+# documents by score, every document in a single one
+Tiers = Dict[int, Set[int]]
+
+
+def tokenize(text: str | None) -> List[str]:
+    return _WORD.findall(text.lower()) if text else []
+
+
+def _without(word: str, i: int) -> str:
+    after = i + 1
+    return word[:i] + word[after:]
+
+
+def _deletes(word: str) -> Set[str]:
+    return {_without(word, i) for i in range(len(word))}
+
+
+def _one_edit_apart(a: str, b: str) -> bool:
+    """
+    Whether `b` is `a` with one letter inserted, deleted, replaced or two
+    neighbouring letters swapped.
+    """
+    if abs(len(a) - len(b)) > 1 or a == b:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        return len(diff) == 1 or (
+            len(diff) == 2
+            and diff[1] == diff[0] + 1
+            and a[diff[0]] == b[diff[1]]
+            and a[diff[1]] == b[diff[0]]
+        )
+    shorter, longer = sorted((a, b), key=len)
+    return any(_without(longer, i) == shorter for i in range(len(longer)))
+
+
+def _combine(tiers: Tiers, other: Tiers) -> Tiers:
+    # the documents in both, scored with the sum of their scores
+    combined: Tiers = {}
+    for score, docs in tiers.items():
+        for other_score, other_docs in other.items():
+            both = docs & other_docs
+            if both:
+                combined.setdefault(score + other_score, set()).update(both)
+    return combined
+
+
+class SearchIndex:
+    """
+    In-process inverted index over the names and descriptions of items, for
+    the backends without a search index of their own. Every query word has
+    to match a word of the item, exactly, as a prefix or with one typo;
+    results are ranked by how well and where they matched, then by name.
+
+    Items are numbered as they are indexed and postings are sets of those
+    numbers, so matching and ranking are mostly set operations.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        # document number -> item ID and name
+        self.ids: List[UUID] = []
+        self.names: List[str] = []
+        self.docs_by_id: Dict[UUID, int] = {}
+        self.docs_by_name: Dict[str, int] = {}
+        # every document number, sorted by name
+        self.by_name: List[int] = []
+        # word -> documents having it in their name, or in their description
+        self.in_names: Dict[str, Set[int]] = defaultdict(set)
+        self.in_descriptions: Dict[str, Set[int]] = defaultdict(set)
+        # document number -> words of its name and of its description
+        self.words_by_doc: Dict[int, Tuple[Set[str], Set[str]]] = {}
+        # every indexed word, sorted, for prefix lookups
+        self.words: List[str] = []
+        # every indexed word with one letter deleted -> the words it came from
+        self.neighbours: Dict[str, Set[str]] = defaultdict(set)
+        # the catalog revision it reflects, once filled from the database by
+        # the SQL repository
+        self.version: int | None = None
+
+    def __len__(self) -> int:
+        return len(self.docs_by_id)
+
+    def add_many(self, items: Iterable[Tuple[UUID, str, str | None]]):
+        """
+        Index (ID, name, description) triples, replacing what was indexed for
+        items with the same IDs.
+        """
+        with self.lock:
+            new_words, new_names = [], []
+            for id, name, description in items:
+                doc = self.docs_by_id.get(id)
+                if doc is None:
+                    doc = len(self.ids)
+                    self.ids.append(id)
+                    self.names.append(name)
+                    self.docs_by_id[id] = doc
+                    new_names.append(doc)
+                else:
+                    self._unindex(doc)
+                    if self.names[doc] != name:
+                        self.by_name.remove(doc)
+                        self.names[doc] = name
+                        new_names.append(doc)
+                self.docs_by_name[name] = doc
+
+                name_words = set(tokenize(name))
+                description_words = set(tokenize(description))
+                self.words_by_doc[doc] = (name_words, description_words)
+                for words, postings in (
+                    (name_words, self.in_names),
+                    (description_words, self.in_descriptions),
+                ):
+                    for word in words:
+                        if word not in self.in_names and (
+                            word not in self.in_descriptions
+                        ):
+                            new_words.append(word)
+                            for deleted in _deletes(word):
+                                self.neighbours[deleted].add(word)
+                        postings[word].add(doc)
+
+            if len(new_words) > 100:
+                self.words = sorted(set(self.words).union(new_words))
+            else:
+                for word in new_words:
+                    insort(self.words, word)
+
+            name_of: Callable[[int], str] = self.names.__getitem__
+            if len(new_names) > 100:
+                self.by_name.extend(new_names)
+                self.by_name.sort(key=name_of)
+            else:
+                for doc in new_names:
+                    insort(self.by_name, doc, key=name_of)
+
+    def add(self, id: UUID, name: str, description: str | None):
+        self.add_many([(id, name, description)])
+
+    def update_description(self, name: str, description: str | None):
+        with self.lock:
+            doc = self.docs_by_name.get(name)
+            if doc is not None:
+                self.add(self.ids[doc], name, description)
+
+    def _unindex(self, doc: int):
+        # called holding the lock, indexed words are kept even when unused
+        name_words, description_words = self.words_by_doc.pop(doc)
+        for word in name_words:
+            self.in_names[word].discard(doc)
+        for word in description_words:
+            self.in_descriptions[word].discard(doc)
+        self.docs_by_name.pop(self.names[doc], None)
+
+    def clear(self):
+        with self.lock:
+            self.__init__()
+
+    def _expand(self, query_word: str) -> List[Tuple[str, int]]:
+        expansions = [(query_word, EXACT)]
+
+        start = bisect_left(self.words, query_word)
+        if start < len(self.words) and self.words[start] == query_word:
+            start += 1
+        end = start + MAX_EXPANSIONS
+        for word in self.words[start:end]:
+            if not word.startswith(query_word):
+                break
+            expansions.append((word, PREFIX))
+
+        if len(query_word) >= MIN_TYPO_LENGTH:
+            candidates = set(self.neighbours.get(query_word, ()))
+            for deleted in _deletes(query_word):
+                candidates.add(deleted)
+                candidates.update(self.neighbours.get(deleted, ()))
+            expansions.extend(
+                (word, TYPO) for word in candidates if _one_edit_apart(query_word, word)
+            )
+        return expansions
+
+    def _match(self, query_word: str) -> Tiers:
+        postings_by_score = defaultdict(list)
+        for word, quality in self._expand(query_word):
+            if word in self.in_names:
+                postings_by_score[quality * NAME].append(self.in_names[word])
+            if word in self.in_descriptions:
+                postings_by_score[quality * DESCRIPTION].append(
+                    self.in_descriptions[word]
+                )
+
+        # each document counts with its best match only
+        tiers: Tiers = {}
+        matched: Set[int] = set()
+        for score in sorted(postings_by_score, reverse=True):
+            postings = postings_by_score[score]
+            # the postings themselves are never changed, only read
+            docs = postings[0] if len(postings) == 1 else set().union(*postings)
+            if matched:
+                docs = docs - matched
+            if docs:
+                tiers[score] = docs
+                matched = matched | docs
+        return tiers
+
+    def _first_by_name(self, docs: Set[int], count: int) -> List[int]:
+        # walking the catalog by name until enough are found beats sorting
+        # the documents, unless they are few of the catalog
+        if len(docs) * len(docs) > count * len(self.by_name):
+            return list(islice(filter(docs.__contains__, self.by_name), count))
+        return sorted(docs, key=self.names.__getitem__)[:count]
+
+    def search(self, query: str, limit: int, offset: int = 0) -> List[UUID]:
+        """
+        The IDs of the items matching every word of the query, best first,
+        then by name.
+        """
+        query_words = tokenize(query)
+        if not query_words:
+            return []
+
+        with self.lock:
+            first_word, *other_words = dict.fromkeys(query_words)
+            tiers = self._match(first_word)
+            for query_word in other_words:
+                if not tiers:
+                    break
+                tiers = _combine(tiers, self._match(query_word))
+            if not tiers:
+                return []
+
+            page: List[UUID] = []
+            for score in sorted(tiers, reverse=True):
+                docs = tiers[score]
+                if offset >= len(docs):
+                    offset -= len(docs)
+                    continue
+                first = self._first_by_name(docs, offset + limit - len(page))
+                page.extend(self.ids[doc] for doc in first[offset:])
+                offset = 0
+                if len(page) >= limit:
+                    break
+            return page
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from ..dependencies import db_scope, get_item_event_repo, get_unit_of_work
+from .events import ItemEventBroker
+from .usecases import number_item_events, prune_item_events, relay_item_events
+
+logger = logging.getLogger(__name__)
+
+# how often the outbox is pruned
+PRUNE_INTERVAL_SECONDS = 60.0
+
+
+async def relay_item_events_periodically(
+    broker: ItemEventBroker,
+    interval: float,
+    batch_size: int,
+    retention: timedelta,
+):
+    """
+    Number the changes committed to the outbox, publish them to the clients
+    following them in this process, from the time the relay starts, and
+    prune the outbox. Every process runs its own relay: they take turns at
+    numbering, and nothing is taken out of the outbox by publishing it.
+    """
+    after = None
+    pruned_at = time.monotonic()
+    while True:
+        try:
+            async with db_scope() as db:
+                item_event_repo = get_item_event_repo(db)
+                await number_item_events(
+                    get_unit_of_work(db), item_event_repo, batch_size
+                )
+                if after is None:
+                    _, after = await item_event_repo.get_offsets()
+                after = await relay_item_events(
+                    item_event_repo, broker, after, batch_size
+                )
+
+            if time.monotonic() - pruned_at >= PRUNE_INTERVAL_SECONDS:
+                pruned_at = time.monotonic()
+                async with db_scope() as db:
+                    pruned = await prune_item_events(
+                        get_unit_of_work(db), get_item_event_repo(db), retention
+                    )
+                if pruned:
+                    logger.info("Pruned %d item events", pruned)
+        except Exception:
+            logger.exception("Failed to relay item events")
+
+        await asyncio.sleep(interval)
@@ -1,18 +1,335 @@
-from typing import List
+import asyncio
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, List, Set, Tuple
+from uuid import UUID
 
-from .schema import ItemBase, Item
+from pydantic import ValidationError
 
-from ..exceptions import ItemAlreadyExistsError
+from .schema import (
+    ImportConflictReason,
+    ItemBase,
+    ItemFilter,
+    ItemImportConflict,
+    ItemImportReport,
+    Item,
+    ItemEvent,
+)
+
+from ..exceptions import (
+    InvalidCursorError,
+    ItemAlreadyExistsError,
+    ItemEventsGoneError,
+)
+from ..item.events import ItemEventBroker, ItemEventRepo, Subscription
 from ..item.repository import ItemRepo
+from ..revisions import CATALOG, RevisionRepo
+from ..unit_of_work import UnitOfWork
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# deeper result pages are not worth ranking, a narrower query finds them
+MAX_SEARCH_OFFSET = 1000
+EXPORT_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 1000
+MAX_IMPORT_BATCH_SIZE = 10000
 
 
-def create_item(item_repo: ItemRepo, item: ItemBase) -> Item:
-    search_result = item_repo.find_item_by_name(item.name)
+async def create_item(uow: UnitOfWork, item_repo: ItemRepo, item: ItemBase) -> Item:
+    search_result = await item_repo.find_item_by_name(item.name)
     if search_result is not None:
         raise ItemAlreadyExistsError("An item with this name already exists")
 
-    return item_repo.save_item(item)
+    new_item = await item_repo.save_item(item)
+    await uow.commit()
+
+    return new_item
+
+
+async def get_all(item_repo: ItemRepo) -> List[Item]:
+    return await item_repo.get_all_items()
+
+
+async def import_items(
+    uow: UnitOfWork,
+    item_repo: ItemRepo,
+    rows: AsyncIterator[Tuple[int, Any]],
+    upsert: bool = False,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> ItemImportReport:
+    """
+    Create items from (row number, raw item) pairs in batches. Rows that are
+    invalid, repeat a name from earlier in the upload or, unless `upsert` is
+    set, name an existing item are reported as conflicts instead.
+    """
+    report = ItemImportReport()
+    seen: Set[str] = set()
+    batch: List[Tuple[int, ItemBase]] = []
+
+    async for row, payload in rows:
+        try:
+            item = ItemBase.model_validate(payload)
+        except ValidationError as e:
+            name = payload.get("name") if isinstance(payload, dict) else None
+            report.conflicts.append(
+                ItemImportConflict(
+                    row=row,
+                    name=name if isinstance(name, str) else None,
+                    reason=ImportConflictReason.INVALID,
+                    detail="; ".join(
+                        f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                        for error in e.errors()
+                    ),
+                )
+            )
+            continue
+
+        if item.name in seen:
+            report.conflicts.append(
+                ItemImportConflict(
+                    row=row,
+                    name=item.name,
+                    reason=ImportConflictReason.DUPLICATE_IN_UPLOAD,
+                )
+            )
+            continue
+        seen.add(item.name)
+
+        batch.append((row, item))
+        if len(batch) >= batch_size:
+            await _import_batch(item_repo, batch, upsert, report)
+            batch = []
+
+    if batch:
+        await _import_batch(item_repo, batch, upsert, report)
+
+    await uow.commit()
+
+    report.conflicts.sort(key=lambda conflict: conflict.row)
+    return report
+
+
+async def _import_batch(
+    item_repo: ItemRepo,
+    batch: List[Tuple[int, ItemBase]],
+    upsert: bool,
+    report: ItemImportReport,
+):
+    existing = await item_repo.find_existing_names([item.name for _, item in batch])
+    inserted = await item_repo.save_items(
+        [item for _, item in batch if item.name not in existing]
+    )
+    report.created += len(inserted)
+
+    # includes names taken by another writer after the lookup
+    not_inserted = [(row, item) for row, item in batch if item.name not in inserted]
+    if upsert:
+        await item_repo.update_items([item for _, item in not_inserted])
+        report.updated += len(not_inserted)
+        return
+
+    report.conflicts.extend(
+        ItemImportConflict(
+            row=row, name=item.name, reason=ImportConflictReason.ALREADY_EXISTS
+        )
+        for row, item in not_inserted
+    )
+
+
+def export_all(item_repo: ItemRepo) -> AsyncIterator[Item]:
+    return item_repo.stream_items(EXPORT_BATCH_SIZE)
+
+
+def encode_cursor(item: Item) -> str:
+    payload = json.dumps([item.name, str(item.id)]).encode("UTF-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, UUID]:
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not (
+            isinstance(decoded, list)
+            and len(decoded) == 2
+            and all(isinstance(part, str) for part in decoded)
+        ):
+            raise ValueError("Expected a name and an ID")
+        name, id = decoded
+        return name, UUID(id)
+    except (TypeError, ValueError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+
+
+async def get_page(
+    item_repo: ItemRepo,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    filters: ItemFilter | None = None,
+) -> Tuple[List[Item], str | None]:
+    """
+    Return one page of the catalog and the cursor of the next page, if any.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_cursor(cursor) if cursor is not None else None
+
+    # fetch one extra row to learn whether another page exists
+    items = await item_repo.get_items_page(limit + 1, after, filters)
+    if len(items) <= limit:
+        return items, None
+
+    items = items[:limit]
+    return items, encode_cursor(items[-1])
+
+
+async def search(
+    item_repo: ItemRepo,
+    query: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    offset: int = 0,
+) -> Tuple[List[Item], int | None]:
+    """
+    Return one page of the items matching the query, best first, and the
+    offset of the next page, if any.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    offset = max(0, min(offset, MAX_SEARCH_OFFSET))
+
+    # fetch one extra item to learn whether another page exists
+    items = await item_repo.search_items(query, limit + 1, offset)
+    if len(items) <= limit:
+        return items, None
+    return items[:limit], offset + limit
+
+
+async def get_catalog_version(
+    revision_repo: RevisionRepo, stock_staleness: int, now: datetime | None = None
+) -> str:
+    """
+    Changes whenever the catalog revision does, and every `stock_staleness`
+    seconds. Stock levels change with nearly every cart write and are left
+    out of the revision, so that a revalidated page shows them at most that
+    old; clients following the item events get them as they change.
+    """
+    now = now or datetime.now(timezone.utc)
+    window = int(now.timestamp()) // stock_staleness
+    return f"{await revision_repo.get_version(CATALOG)}.{window}"
+
+
+async def number_item_events(
+    uow: UnitOfWork, item_event_repo: ItemEventRepo, batch_size: int
+) -> int:
+    """
+    Give offsets to the events committed to the outbox since the last time,
+    `batch_size` per transaction. Returns how many were numbered.
+    """
+    numbered = 0
+    while True:
+        batch = await item_event_repo.number_events(batch_size)
+        await uow.commit()
+        numbered += batch
+        if batch < batch_size:
+            return numbered
+
+
+async def relay_item_events(
+    item_event_repo: ItemEventRepo,
+    broker: ItemEventBroker,
+    after: int,
+    batch_size: int,
+) -> int:
+    """
+    Publish the events of the outbox above offset `after` to the broker.
+    Returns the offset of the last event published, `after` if none was.
+    """
+    while events := await item_event_repo.get_events(after, batch_size):
+        broker.publish(events)
+        after = events[-1].offset
+        if len(events) < batch_size:
+            break
+    return after
+
+
+async def prune_item_events(
+    uow: UnitOfWork, item_event_repo: ItemEventRepo, retention: timedelta
+) -> int:
+    """
+    Drop the events older than the retention period. Returns how many were.
+    """
+    pruned = await item_event_repo.prune(datetime.now(timezone.utc) - retention)
+    await uow.commit()
+    return pruned
+
+
+async def follow_item_events(
+    repo_scope: Callable[[], AsyncContextManager[ItemEventRepo]],
+    broker: ItemEventBroker,
+    after: int | None,
+    batch_size: int,
+    keepalive: float,
+) -> AsyncIterator[ItemEvent | None]:
+    """
+    Follow the changes of items from offset `after` on, or from now on
+    without one: the events still in the outbox first, then those published
+    by the relay as they come. None is yielded after `keepalive` seconds
+    without events.
+
+    The outbox is read with a short lived repository from `repo_scope` each
+    time, so that no database connection is held while waiting for events.
+    """
+    subscription = broker.subscribe()
+    try:
+        async with repo_scope() as item_event_repo:
+            first, last = await item_event_repo.get_offsets()
+        if after is None:
+            after = last
+        elif after < first - 1 or after > last:
+            raise ItemEventsGoneError(
+                f"Events after offset {after} are not kept, reload the catalog"
+            )
+    except BaseException:
+        broker.unsubscribe(subscription)
+        raise
+
+    return _follow(repo_scope, broker, subscription, after, batch_size, keepalive)
+
 
+async def _follow(
+    repo_scope: Callable[[], AsyncContextManager[ItemEventRepo]],
+    broker: ItemEventBroker,
+    subscription: Subscription,
+    after: int,
+    batch_size: int,
+    keepalive: float,
+) -> AsyncIterator[ItemEvent | None]:
+    try:
+        # subscribed before reading the outbox, so that nothing committed in
+        # between is missed; what is both read and published is skipped
+        catch_up = True
+        while True:
+            if catch_up:
+                subscription.overflowed = False
+                while not subscription.events.empty():
+                    subscription.events.get_nowait()
+                while True:
+                    async with repo_scope() as item_event_repo:
+                        events = await item_event_repo.get_events(after, batch_size)
+                    for event in events:
+                        yield event
+                        after = event.offset
+                    if len(events) < batch_size:
+                        break
+                catch_up = False
 
-def get_all(item_repo: ItemRepo) -> List[Item]:
-    return item_repo.get_all_items()
+            try:
+                event = await asyncio.wait_for(subscription.events.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if subscription.overflowed:
+                catch_up = True
+            elif event.offset > after:
+                yield event
+                after = event.offset
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,77 @@
+import threading
+from bisect import insort
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Tuple
+from uuid import UUID, uuid4
+
+from .item.schema import Item, ItemEvent
+from .item.search import SearchIndex
+from .user.schema import ItemQuantity, Order, User
+
+
+@dataclass
+class CartEntry:
+    cart_item: ItemQuantity
+    reserved_until: datetime
+
+
+@dataclass
+class MemoryStore:
+    """
+    Process-wide state of the in-memory repositories. Every read and write
+    holds `lock`, so the store can be shared by threads as well as tasks.
+    """
+
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+    items: Dict[UUID, Item] = field(default_factory=dict)
+    item_ids_by_name: Dict[str, UUID] = field(default_factory=dict)
+    # (name, id) of every item, sorted like the catalog pages
+    item_keys: List[Tuple[str, UUID]] = field(default_factory=list)
+    search_index: SearchIndex = field(default_factory=SearchIndex)
+    # every change of an item with when it was made, oldest first
+    item_events: Deque[Tuple[datetime, ItemEvent]] = field(default_factory=deque)
+    last_item_event: int = 0
+
+    users: Dict[UUID, User] = field(default_factory=dict)
+    user_ids_by_email: Dict[str, UUID] = field(default_factory=dict)
+    hashed_passwords: Dict[UUID, str] = field(default_factory=dict)
+    carts: Dict[UUID, Dict[UUID, CartEntry]] = field(default_factory=dict)
+    orders: Dict[UUID, List[Order]] = field(default_factory=dict)
+
+    # see revisions.py, a new epoch starts whenever the counters restart
+    epoch: str = field(default_factory=lambda: uuid4().hex[:8])
+    revisions: Dict[str, int] = field(default_factory=dict)
+
+    def add_item(self, item: Item):
+        self.items[item.id] = item
+        self.item_ids_by_name[item.name] = item.id
+        insort(self.item_keys, (item.name, item.id))
+        self.search_index.add(item.id, item.name, item.description)
+
+    def record_item_event(self, item: Item):
+        self.last_item_event += 1
+        event = ItemEvent(offset=self.last_item_event, item=item)
+        self.item_events.append((datetime.now(timezone.utc), event))
+
+    def bump(self, *keys: str):
+        for key in keys:
+            self.revisions[key] = self.revisions.get(key, 0) + 1
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.item_ids_by_name.clear()
+            self.item_keys.clear()
+            self.search_index.clear()
+            self.item_events.clear()
+            self.last_item_event = 0
+            self.users.clear()
+            self.user_ids_by_email.clear()
+            self.hashed_passwords.clear()
+            self.carts.clear()
+            self.orders.clear()
+            self.revisions.clear()
+            self.epoch = uuid4().hex[:8]
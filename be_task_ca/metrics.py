@@ -0,0 +1,178 @@
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Labels, value: float):
+        with self._lock:
+            # bucket counts, then the sum and the count of observations
+            series = self._series.setdefault(labels, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    le = (("le", _format(bound)),)
+                    lines.append(f"{self.name}_bucket{_labels(labels + le)} {count}")
+                inf = (("le", "+Inf"),)
+                lines.append(f"{self.name}_bucket{_labels(labels + inf)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(labels)} {series[-1]}")
+        return lines
+
+
+def _format(value: float) -> str:
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def gauges(prefix: str, help: str, values: Dict[str, float]) -> List[str]:
+    lines = []
+    for name, value in values.items():
+        lines.append(f"# HELP {prefix}_{name} {help}")
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        lines.append(f"{prefix}_{name} {value}")
+    return lines
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling the request.",
+    DURATION_BUCKETS,
+)
+request_statements = Histogram(
+    "http_request_db_statements",
+    "SQL statements executed while handling the request.",
+    STATEMENT_BUCKETS,
+)
+request_db_duration = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in SQL statements while handling the request.",
+    DURATION_BUCKETS,
+)
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+
+
+current_request: ContextVar[RequestStats | None] = ContextVar(
+    "current_request", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    started = conn.info["query_started"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def instrument_sqlalchemy():
+    """
+    Attribute every SQL statement, on any engine, to the request running it.
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """
+    Record latency, SQL statement count and SQL time per route, optionally
+    reporting the request's figures in a Server-Timing header.
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"server-timing", self._server_timing(stats, started)),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            current_request.reset(token)
+            route = scope.get("route")
+            labels = (
+                ("method", scope["method"]),
+                ("route", getattr(route, "path", "unmatched")),
+                ("status", str(status)),
+            )
+            request_duration.observe(labels, time.perf_counter() - started)
+            request_statements.observe(labels[:2], stats.statements)
+            request_db_duration.observe(labels[:2], stats.db_seconds)
+
+    @staticmethod
+    def _server_timing(stats: RequestStats, started: float) -> bytes:
+        total = (time.perf_counter() - started) * 1000
+        return (
+            f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.statements} queries"'
+            f", app;dur={total:.2f}"
+        ).encode("latin-1")
+
+
+def render_request_metrics() -> List[str]:
+    lines = []
+    for histogram in (request_duration, request_statements, request_db_duration):
+        lines.extend(histogram.render())
+    return lines
@@ -0,0 +1,47 @@
+import time
+from typing import Mapping
+
+# requests that never write, and may therefore run on a replica
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# when the client last changed something, set on every successful write
+LAST_WRITE_COOKIE = "last_write"
+
+
+class ReadYourWritesMiddleware:
+    """
+    Stamp the responses to successful writes with the time of the write, so
+    that the next reads of the same client can stay on the primary until the
+    replicas have caught up with it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = f"{LAST_WRITE_COOKIE}={time.time():.3f}; Path=/; HttpOnly"
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"set-cookie", f"{cookie}; SameSite=Lax".encode("latin-1")),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def wrote_recently(cookies: Mapping[str, str], window: float) -> bool:
+    """
+    Whether the client's last write, as told by its cookies, is less than
+    `window` seconds old.
+    """
+    try:
+        last_write = float(cookies.get(LAST_WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    return time.time() - last_write < window
@@ -0,0 +1,38 @@
+from pydantic import BaseModel
+from starlette.responses import Response
+
+
+class ModelResponse(Response):
+    """
+    JSON response serialised straight to bytes from a pydantic model that is
+    already valid. Returning it from a route skips FastAPI's validation and
+    encoding of the returned value; declare `response_model` on the route to
+    keep the documented schema.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: BaseModel) -> bytes:
+        return content.__pydantic_serializer__.to_json(content)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Whether an If-None-Match header lists `etag`, comparing weakly as GET
+    requests call for.
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def cache_control(public: bool, max_age: int) -> str:
+    # no-cache still lets clients store the response, but they revalidate it
+    scope = "public" if public else "private"
+    if max_age > 0:
+        return f"{scope}, max-age={max_age}"
+    return f"{scope}, no-cache"
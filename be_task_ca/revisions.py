@@ -0,0 +1,98 @@
+from abc import ABC, abstractmethod
+from typing import Iterable
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .database import Base, upsert_insert
+from .memory import MemoryStore
+
+# the items of the catalog and what it says of them, stock levels apart
+CATALOG = "catalog"
+
+# keys changed by the writes of a session, bumped when it commits
+_CHANGED = "changed_revisions"
+# the versions they were bumped to, until the session commits again
+_BUMPED = "bumped_revisions"
+
+
+def cart_revision(user_id: UUID) -> str:
+    return f"cart:{user_id}"
+
+
+class Revision(Base):
+    __tablename__ = "revisions"
+
+    key: Mapped[str] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column()
+
+
+def record_change(db, *keys: str):
+    """
+    Note that the session's transaction changed what the given revisions
+    stand for. UnitOfWorkSA bumps them in that transaction when committing.
+    """
+    db.info.setdefault(_CHANGED, set()).update(keys)
+
+
+def pop_changes(db) -> set:
+    db.info.pop(_BUMPED, None)
+    return db.info.pop(_CHANGED, set())
+
+
+def bumped_version(db, key: str) -> int | None:
+    """
+    The version the transaction the session last committed bumped `key` to,
+    for the actions run once it is committed.
+    """
+    return db.info.get(_BUMPED, {}).get(key)
+
+
+class RevisionRepo(ABC):
+    """
+    Version counters of data that clients revalidate, such as the catalog
+    and each user's cart. A version changes whenever a committed write
+    changes the data it stands for, so it can serve as an ETag.
+    """
+
+    @abstractmethod
+    async def get_version(self, key: str) -> str:
+        """
+        The current version of `key`, an opaque token.
+        """
+        pass
+
+
+class RevisionRepoSA(RevisionRepo):
+    def __init__(self, db):
+        self.db = db
+
+    async def get_version(self, key: str) -> str:
+        version = await self.db.scalar(
+            select(Revision.version).where(Revision.key == key)
+        )
+        return str(version or 0)
+
+    async def bump(self, keys: Iterable[str]) -> None:
+        # the rows stay locked until the commit that follows, taking them in a
+        # stable order keeps concurrent commits from deadlocking
+        statement = upsert_insert(self.db, Revision.__table__).values(
+            [{"key": key, "version": 1} for key in sorted(keys)]
+        )
+        result = await self.db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["key"], set_={"version": Revision.version + 1}
+            ).returning(Revision.key, Revision.version)
+        )
+        self.db.info[_BUMPED] = {key: version for key, version in result}
+
+
+class RevisionRepoMemory(RevisionRepo):
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    async def get_version(self, key: str) -> str:
+        with self.store.lock:
+            # the epoch tells apart the counters of another process lifetime
+            return f"{self.store.epoch}.{self.store.revisions.get(key, 0)}"
@@ -0,0 +1,89 @@
+import importlib.util
+import logging
+
+import uvicorn
+
+from .config import (
+    CartStoreSettings,
+    ItemCacheSettings,
+    RepositorySettings,
+    ServerSettings,
+)
+
+logger = logging.getLogger(__name__)
+
+APP = "be_task_ca.app:app"
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def uvicorn_options(settings: ServerSettings) -> dict:
+    """
+    Keyword arguments of uvicorn.run for a production server: the uvloop
+    event loop and the httptools parser when they are installed, and every
+    worker in a process of its own, started fresh rather than forked so that
+    none inherits the engine or the pools of another.
+    """
+    return {
+        "host": settings.HOST,
+        "port": settings.PORT,
+        "workers": settings.WORKERS,
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        "backlog": settings.BACKLOG,
+        "timeout_keep_alive": settings.KEEP_ALIVE_SECONDS,
+        "timeout_graceful_shutdown": settings.GRACEFUL_SHUTDOWN_SECONDS,
+        "proxy_headers": True,
+        "forwarded_allow_ips": settings.FORWARDED_ALLOW_IPS,
+        "access_log": settings.ACCESS_LOG,
+    }
+
+
+def check_workers(workers: int):
+    """
+    Refuse to run several workers with state that lives in a single process,
+    and warn about the item cache, which each worker keeps on its own.
+    """
+    if workers <= 1:
+        return
+    if RepositorySettings().BACKEND == "memory":
+        raise SystemExit(
+            "REPOSITORY_BACKEND=memory keeps data in one process, "
+            "run it with SERVER_WORKERS=1"
+        )
+    if CartStoreSettings().BACKEND == "write_behind":
+        raise SystemExit(
+            "CART_STORE_BACKEND=write_behind keeps carts in one process, "
+            "run it with SERVER_WORKERS=1"
+        )
+    item_cache_settings = ItemCacheSettings()
+    if item_cache_settings.ENABLED:
+        logger.warning(
+            "Each worker caches items on its own: an item changed through one "
+            "worker may be served unchanged by the others for up to "
+            "ITEM_CACHE_TTL_SECONDS=%s",
+            item_cache_settings.TTL_SECONDS,
+        )
+
+
+def serve():
+    """
+    Run the app with several worker processes. On SIGTERM each worker stops
+    accepting connections, lets in-flight requests finish for up to
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS, then shuts down cleanly.
+    """
+    settings = ServerSettings()
+    check_workers(settings.WORKERS)
+
+    options = uvicorn_options(settings)
+    logger.info(
+        "Starting %d workers on %s:%d (loop=%s, http=%s)",
+        options["workers"],
+        options["host"],
+        options["port"],
+        options["loop"],
+        options["http"],
+    )
+    uvicorn.run(APP, **options)
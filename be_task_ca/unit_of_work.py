@@ -0,0 +1,85 @@
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import finish_committed, undo_uncommitted
+from .item.events import pop_item_changes, write_outbox
+from .revisions import RevisionRepoSA, pop_changes
+
+
+class UnitOfWork(ABC):
+    """
+    The transaction shared by the repositories of a request. Repositories
+    only write into it; a usecase that changes anything commits it once, when
+    it is done. Whatever is left uncommitted is rolled back at the end of the
+    request.
+    """
+
+    @abstractmethod
+    async def commit(self) -> None:
+        """
+        Make every write done so far permanent.
+        """
+        pass
+
+    @abstractmethod
+    async def rollback(self) -> None:
+        """
+        Discard every write done since the last commit.
+        """
+        pass
+
+    @abstractmethod
+    def savepoint(self) -> AsyncContextManager[None]:
+        """
+        Async context manager undoing only the writes done inside it when it
+        exits with an exception, leaving the rest of the transaction usable.
+        """
+        pass
+
+
+class UnitOfWorkSA(UnitOfWork):
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def commit(self) -> None:
+        changed_ids, changed_names = pop_item_changes(self.db)
+        if changed_ids or changed_names:
+            await write_outbox(self.db, changed_ids, changed_names)
+        # bumped right before committing so that the revision rows are locked
+        # only briefly
+        changed = pop_changes(self.db)
+        if changed:
+            await RevisionRepoSA(self.db).bump(changed)
+        await self.db.commit()
+        await finish_committed(self.db)
+
+    async def rollback(self) -> None:
+        pop_changes(self.db)
+        pop_item_changes(self.db)
+        await self.db.rollback()
+        await undo_uncommitted(self.db)
+
+    @asynccontextmanager
+    async def savepoint(self) -> AsyncIterator[None]:
+        async with self.db.begin_nested():
+            yield
+
+
+class UnitOfWorkMemory(UnitOfWork):
+    """
+    The in-memory repositories apply writes immediately, so there is nothing
+    to commit or roll back.
+    """
+
+    async def commit(self) -> None:
+        pass
+
+    async def rollback(self) -> None:
+        pass
+
+    @asynccontextmanager
+    async def savepoint(self) -> AsyncIterator[None]:
+        yield
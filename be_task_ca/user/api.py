@@ -1,20 +1,51 @@
+from datetime import timedelta
+from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 
+from .passwords import PasswordHasher
 from .repository import UserRepo
-from .schema import ItemQuantity, AddToCartResponse, UserPrivate
-from .usecases import add_item_to_cart, create_user, list_items_in_cart
+from .schema import (
+    AddToCartResponse,
+    BatchAddToCartResponse,
+    CartView,
+    ItemQuantity,
+    Order,
+    UserPrivate,
+)
+from .usecases import (
+    add_item_to_cart,
+    add_items_to_cart,
+    checkout,
+    create_user,
+    get_cart_version,
+    list_items_in_cart,
+    view_cart,
+)
 
-from ..dependencies import get_item_repo, get_user_repo
+from ..config import CartSettings
+from ..dependencies import (
+    get_cart_settings,
+    get_item_repo,
+    get_password_hasher,
+    get_revision_repo,
+    get_unit_of_work,
+    get_user_repo,
+)
 from ..exceptions import (
+    CartEmptyError,
     ItemAlreadyInCartError,
     ItemDoesNotExistError,
     ItemQuantityError,
+    PasswordHasherBusyError,
     UserAlreadyExistsError,
     UserDoesNotExistError,
 )
 from ..item.repository import ItemRepo
+from ..responses import ModelResponse, cache_control, etag_matches
+from ..revisions import RevisionRepo
+from ..unit_of_work import UnitOfWork
 
 
 user_router = APIRouter(
@@ -25,26 +56,44 @@ user_router = APIRouter(
 
 @user_router.post("/")
 async def post_customer(
-    user: UserPrivate, user_repo: UserRepo = Depends(get_user_repo)
+    user: UserPrivate,
+    uow: UnitOfWork = Depends(get_unit_of_work),
+    user_repo: UserRepo = Depends(get_user_repo),
+    password_hasher: PasswordHasher = Depends(get_password_hasher),
 ):
     try:
-        return create_user(user_repo, user)
+        return await create_user(uow, user_repo, password_hasher, user)
     except UserAlreadyExistsError as e:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=str(e),
         )
+    except PasswordHasherBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
 
 
 @user_router.post("/{user_id}/cart")
 async def post_cart(
     user_id: UUID,
     cart_item: ItemQuantity,
+    uow: UnitOfWork = Depends(get_unit_of_work),
     user_repo: UserRepo = Depends(get_user_repo),
     item_repo: ItemRepo = Depends(get_item_repo),
+    cart_settings: CartSettings = Depends(get_cart_settings),
 ) -> AddToCartResponse:
     try:
-        cart_items = add_item_to_cart(user_repo, item_repo, user_id, cart_item)
+        cart_items = await add_item_to_cart(
+            uow,
+            user_repo,
+            item_repo,
+            user_id,
+            cart_item,
+            timedelta(seconds=cart_settings.RESERVATION_TTL_SECONDS),
+        )
         return AddToCartResponse(items=cart_items)
     except UserDoesNotExistError as e:
         raise HTTPException(
@@ -68,13 +117,83 @@ async def post_cart(
         )
 
 
-@user_router.get("/{user_id}/cart")
+@user_router.post("/{user_id}/cart/batch")
+async def post_cart_batch(
+    user_id: UUID,
+    cart_items: List[ItemQuantity],
+    uow: UnitOfWork = Depends(get_unit_of_work),
+    user_repo: UserRepo = Depends(get_user_repo),
+    item_repo: ItemRepo = Depends(get_item_repo),
+    cart_settings: CartSettings = Depends(get_cart_settings),
+) -> BatchAddToCartResponse:
+    try:
+        results, items = await add_items_to_cart(
+            uow,
+            user_repo,
+            item_repo,
+            user_id,
+            cart_items,
+            timedelta(seconds=cart_settings.RESERVATION_TTL_SECONDS),
+        )
+        return BatchAddToCartResponse(results=results, items=items)
+    except UserDoesNotExistError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e),
+        )
+
+
+@user_router.post("/{user_id}/checkout")
+async def post_checkout(
+    user_id: UUID,
+    uow: UnitOfWork = Depends(get_unit_of_work),
+    user_repo: UserRepo = Depends(get_user_repo),
+) -> Order:
+    try:
+        return await checkout(uow, user_repo, user_id)
+    except UserDoesNotExistError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e),
+        )
+    except CartEmptyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+        )
+
+
+@user_router.get("/{user_id}/cart", response_model=AddToCartResponse)
 async def get_cart(
+    user_id: UUID,
+    if_none_match: str | None = Header(None),
+    user_repo: UserRepo = Depends(get_user_repo),
+    revision_repo: RevisionRepo = Depends(get_revision_repo),
+) -> Response:
+    # read before the cart, so that the cart is never older than its ETag
+    etag = f'"cart-{await get_cart_version(revision_repo, user_id)}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control(public=False, max_age=0)}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        cart_items = await list_items_in_cart(user_repo, user_id)
+        return ModelResponse(
+            AddToCartResponse.model_construct(items=cart_items), headers=headers
+        )
+    except UserDoesNotExistError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e),
+        )
+
+
+@user_router.get("/{user_id}/cart/view", response_model=CartView)
+async def get_cart_view(
     user_id: UUID, user_repo: UserRepo = Depends(get_user_repo)
-) -> AddToCartResponse:
+) -> ModelResponse:
     try:
-        cart_items = list_items_in_cart(user_repo, user_id)
-        return AddToCartResponse(items=cart_items)
+        return ModelResponse(await view_cart(user_repo, user_id))
     except UserDoesNotExistError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,421 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterable, List, Literal, Set, TextIO, Tuple
+from uuid import UUID
+
+from ..memory import CartEntry
+from .schema import ItemQuantity
+
+logger = logging.getLogger(__name__)
+
+JournalFsync = Literal["always", "everysec", "no"]
+
+
+class CartStore(ABC):
+    """
+    Key-value store holding every cart, keyed by user ID, in front of the
+    cart_items table. It is the source of truth for carts: changed carts are
+    marked dirty and written to the database later, in batches. Methods are
+    async so a shared store living in another process can be slotted in.
+
+    Added entries stay pending until `confirm`, once the stock reserved for
+    them is committed: pending entries are visible and keep the item from
+    being added twice, but are neither persisted nor written out.
+    """
+
+    @abstractmethod
+    async def has_cart(self, user_id: UUID) -> bool:
+        """
+        Whether a cart, even an empty one, is kept for the user.
+        """
+        pass
+
+    @abstractmethod
+    async def get_cart(self, user_id: UUID) -> List[CartEntry]:
+        """
+        The entries of the user's cart, empty if no cart is kept for them.
+        """
+        pass
+
+    @abstractmethod
+    async def add(self, user_id: UUID, entries: List[CartEntry]) -> Set[UUID]:
+        """
+        Add, as pending, the entries whose item is not in the user's cart yet,
+        creating the cart if needed. Returns the IDs of the items added.
+        """
+        pass
+
+    @abstractmethod
+    async def confirm(self, user_id: UUID, item_ids: Iterable[UUID]) -> None:
+        """
+        Make pending entries of the user's cart permanent.
+        """
+        pass
+
+    @abstractmethod
+    async def remove(self, user_id: UUID, item_ids: Iterable[UUID]) -> None:
+        """
+        Remove the given items from the user's cart.
+        """
+        pass
+
+    @abstractmethod
+    async def take(self, user_id: UUID) -> List[CartEntry]:
+        """
+        Remove every permanent entry of the user's cart and return them.
+        """
+        pass
+
+    @abstractmethod
+    async def remove_expired(self, now: datetime) -> Dict[UUID, List[CartEntry]]:
+        """
+        Remove every permanent entry whose reservation expired before `now`
+        and return them by user ID.
+        """
+        pass
+
+    @abstractmethod
+    async def load(self, carts: Dict[UUID, List[CartEntry]]) -> None:
+        """
+        Fill the store with carts read from the database, keeping those it
+        already has. Loaded carts are not dirty.
+        """
+        pass
+
+    @abstractmethod
+    async def take_dirty(self, limit: int) -> Dict[UUID, List[CartEntry]]:
+        """
+        Return the permanent entries of at most `limit` carts changed since
+        they were last taken, and consider those carts clean from now on.
+        """
+        pass
+
+    @abstractmethod
+    async def mark_dirty(self, user_ids: Iterable[UUID]) -> None:
+        """
+        Mark carts as changed again, after failing to write them out.
+        """
+        pass
+
+    @abstractmethod
+    async def checkpoint(self) -> None:
+        """
+        Forget what is needed to recover carts that were written out since the
+        last checkpoint.
+        """
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """
+        Release what the store holds open, once nothing uses it anymore.
+        """
+        pass
+
+
+class CartStoreMemory(CartStore):
+    """
+    In-process stand-in for a key-value store, for tests and single process
+    deployments. With a journal, every change is appended to it as the whole
+    resulting cart; after a crash, the carts not yet written to the database
+    are recovered from it. `fsync` picks how durable the journal is: after
+    every change ("always"), at most once a second ("everysec", a crash may
+    lose the last second of changes) or whenever the OS decides ("no").
+
+    Entries are confirmed once the transaction reserving their stock has
+    committed, and a confirmation lost in a crash leaves that stock reserved
+    with no cart to expire it from, for good. "always" is thus the default;
+    only a crash between the commit and the fsync right after it loses one.
+
+    The journal is written by a thread of its own, so that requests do not
+    wait on the disk while holding the store. Changes made meanwhile are
+    written and synced together, and with "always" a change returns once the
+    sync covering it is done.
+    """
+
+    def __init__(self, journal_path: str | None = None, fsync: JournalFsync = "always"):
+        self.journal_path = journal_path
+        self.fsync = fsync
+        self.lock = threading.RLock()
+        self.carts: Dict[UUID, Dict[UUID, CartEntry]] = {}
+        # (user ID, item ID) of the entries that are not confirmed yet
+        self.pending: Set[Tuple[UUID, UUID]] = set()
+        self.dirty: Set[UUID] = set()
+
+        # journal lines not written yet, the last one numbered `_numbered`
+        self._queued: List[str] = []
+        self._numbered = 0
+        # changes waiting for the sync that covers their line number
+        self._waiters: List[Tuple[int, asyncio.Future]] = []
+        self._compactions: List[asyncio.Future] = []
+        self._closing = False
+        self._wakeup = threading.Condition(self.lock)
+        self._writer: threading.Thread | None = None
+
+        if journal_path is not None:
+            self._recover()
+            self._writer = threading.Thread(
+                target=self._write_journal,
+                args=(open(journal_path, "a", encoding="UTF-8"), journal_path),
+                name="cart-journal",
+                daemon=True,
+            )
+            self._writer.start()
+
+    def _recover(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding="UTF-8") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a record torn by the crash, nothing after it was written
+                    break
+                user_id = UUID(record["user_id"])
+                self.carts[user_id] = {
+                    entry.cart_item.item_id: entry
+                    for entry in map(_entry_from_json, record["items"])
+                }
+                self.dirty.add(user_id)
+
+    def _permanent(self, user_id: UUID) -> List[CartEntry]:
+        return [
+            entry
+            for item_id, entry in self.carts.get(user_id, {}).items()
+            if (user_id, item_id) not in self.pending
+        ]
+
+    def _changed(self, user_id: UUID) -> asyncio.Future | None:
+        # called holding the lock, returns what to await for the change to be
+        # on disk, if it is to be waited for
+        self.dirty.add(user_id)
+        if self._writer is None:
+            return None
+        self._queued.append(_cart_to_json(user_id, self._permanent(user_id)) + "\n")
+        self._numbered += 1
+        self._wakeup.notify()
+        if self.fsync != "always":
+            return None
+        synced = asyncio.get_running_loop().create_future()
+        self._waiters.append((self._numbered, synced))
+        return synced
+
+    def _write_journal(self, journal: TextIO, journal_path: str):
+        # runs in the writer thread, the only one using the journal file
+        synced_at = time.monotonic()
+        unsynced = False
+        while True:
+            with self._wakeup:
+                self._wakeup.wait_for(
+                    lambda: self._queued or self._compactions or self._closing,
+                    timeout=1.0 if unsynced else None,
+                )
+                compactions, self._compactions = self._compactions, []
+                lines, self._queued = self._queued, []
+                if compactions:
+                    # the carts as they are now supersede every queued change
+                    lines = [
+                        _cart_to_json(user_id, self._permanent(user_id)) + "\n"
+                        for user_id in self.dirty
+                    ]
+                written = self._numbered
+                closing = self._closing
+
+            error: OSError | None = None
+            sync = (
+                compactions
+                or closing
+                or self.fsync == "always"
+                or (self.fsync == "everysec" and time.monotonic() - synced_at >= 1)
+            )
+            try:
+                if compactions:
+                    journal = self._compact(journal, journal_path, lines)
+                else:
+                    journal.writelines(lines)
+                    journal.flush()
+                    if sync:
+                        os.fsync(journal.fileno())
+            except OSError as e:
+                logger.exception("Failed to write the cart journal")
+                error = e
+
+            if sync or error is not None:
+                synced_at = time.monotonic()
+                unsynced = False
+                self._finish(written, compactions, error)
+            else:
+                unsynced = self.fsync == "everysec" and (unsynced or bool(lines))
+
+            if closing:
+                journal.close()
+                return
+
+    def _compact(self, journal: TextIO, journal_path: str, lines: List[str]) -> TextIO:
+        # rewrite the journal with just the carts still to be written out
+        compacted = f"{journal_path}.compacting"
+        with open(compacted, "w", encoding="UTF-8") as new_journal:
+            new_journal.writelines(lines)
+            new_journal.flush()
+            os.fsync(new_journal.fileno())
+        os.replace(compacted, journal_path)
+        journal.close()
+        return open(journal_path, "a", encoding="UTF-8")
+
+    def _finish(
+        self,
+        written: int,
+        compactions: List[asyncio.Future],
+        error: OSError | None,
+    ):
+        # wake up the changes up to `written` and the compactions just done
+        with self.lock:
+            finished = [future for number, future in self._waiters if number <= written]
+            self._waiters = [
+                (number, future) for number, future in self._waiters if number > written
+            ]
+        for future in finished + compactions:
+            try:
+                future.get_loop().call_soon_threadsafe(_resolve, future, error)
+            except RuntimeError:
+                # its event loop is closed, nothing waits for it anymore
+                pass
+
+    async def has_cart(self, user_id: UUID) -> bool:
+        with self.lock:
+            return user_id in self.carts
+
+    async def get_cart(self, user_id: UUID) -> List[CartEntry]:
+        with self.lock:
+            return list(self.carts.get(user_id, {}).values())
+
+    async def add(self, user_id: UUID, entries: List[CartEntry]) -> Set[UUID]:
+        added = set()
+        with self.lock:
+            cart = self.carts.setdefault(user_id, {})
+            for entry in entries:
+                if entry.cart_item.item_id not in cart:
+                    cart[entry.cart_item.item_id] = entry
+                    self.pending.add((user_id, entry.cart_item.item_id))
+                    added.add(entry.cart_item.item_id)
+        return added
+
+    async def confirm(self, user_id: UUID, item_ids: Iterable[UUID]) -> None:
+        with self.lock:
+            self.pending.difference_update((user_id, id) for id in item_ids)
+            synced = self._changed(user_id)
+        if synced is not None:
+            await synced
+
+    async def remove(self, user_id: UUID, item_ids: Iterable[UUID]) -> None:
+        with self.lock:
+            cart = self.carts.get(user_id, {})
+            for id in item_ids:
+                cart.pop(id, None)
+                self.pending.discard((user_id, id))
+            synced = self._changed(user_id)
+        if synced is not None:
+            await synced
+
+    async def take(self, user_id: UUID) -> List[CartEntry]:
+        synced = None
+        with self.lock:
+            taken = self._permanent(user_id)
+            if taken:
+                for entry in taken:
+                    del self.carts[user_id][entry.cart_item.item_id]
+                synced = self._changed(user_id)
+        if synced is not None:
+            await synced
+        return taken
+
+    async def remove_expired(self, now: datetime) -> Dict[UUID, List[CartEntry]]:
+        removed = {}
+        synced = None
+        with self.lock:
+            for user_id in self.carts:
+                expired = [
+                    entry
+                    for entry in self._permanent(user_id)
+                    if entry.reserved_until < now
+                ]
+                if expired:
+                    for entry in expired:
+                        del self.carts[user_id][entry.cart_item.item_id]
+                    removed[user_id] = expired
+                    synced = self._changed(user_id)
+        if synced is not None:
+            await synced
+        return removed
+
+    async def load(self, carts: Dict[UUID, List[CartEntry]]) -> None:
+        with self.lock:
+            for user_id, entries in carts.items():
+                if user_id not in self.carts:
+                    self.carts[user_id] = {e.cart_item.item_id: e for e in entries}
+
+    async def take_dirty(self, limit: int) -> Dict[UUID, List[CartEntry]]:
+        with self.lock:
+            taken = list(self.dirty)[:limit]
+            self.dirty.difference_update(taken)
+            return {user_id: self._permanent(user_id) for user_id in taken}
+
+    async def mark_dirty(self, user_ids: Iterable[UUID]) -> None:
+        with self.lock:
+            self.dirty.update(user_ids)
+
+    async def checkpoint(self) -> None:
+        if self._writer is None:
+            return
+        compacted = asyncio.get_running_loop().create_future()
+        with self._wakeup:
+            self._compactions.append(compacted)
+            self._wakeup.notify()
+        await compacted
+
+    def close(self) -> None:
+        with self._wakeup:
+            writer, self._writer = self._writer, None
+            self._closing = True
+            self._wakeup.notify()
+        if writer is not None:
+            writer.join()
+
+
+def _resolve(future: asyncio.Future, error: OSError | None):
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
+
+
+def _cart_to_json(user_id: UUID, entries: List[CartEntry]) -> str:
+    return json.dumps(
+        {
+            "user_id": str(user_id),
+            "items": [
+                {
+                    "item_id": str(entry.cart_item.item_id),
+                    "quantity": entry.cart_item.quantity,
+                    "reserved_until": entry.reserved_until.isoformat(),
+                }
+                for entry in entries
+            ],
+        }
+    )
+
+
+def _entry_from_json(item: dict) -> CartEntry:
+    return CartEntry(
+        ItemQuantity(item_id=item["item_id"], quantity=item["quantity"]),
+        datetime.fromisoformat(item["reserved_until"]),
+    )
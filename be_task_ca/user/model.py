@@ -1,8 +1,9 @@
 from dataclasses import dataclass
+from datetime import datetime
 from typing import List
 from uuid import UUID, uuid4
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import DateTime, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ..database import Base
@@ -17,6 +18,31 @@ class CartItem(Base):
     )
     item_id: Mapped[UUID] = mapped_column(ForeignKey("items.id"), primary_key=True)
     quantity: Mapped[int] = mapped_column()
+    # the stock of the item stays reserved for the cart until then
+    reserved_until: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), index=True
+    )
+
+
+@dataclass
+class Order(Base):
+    __tablename__ = "orders"
+
+    id: Mapped[UUID] = mapped_column(primary_key=True, default=uuid4)
+    user_id: Mapped[UUID] = mapped_column(ForeignKey("users.id"), index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+
+@dataclass
+class OrderLine(Base):
+    __tablename__ = "order_lines"
+
+    order_id: Mapped[UUID] = mapped_column(ForeignKey("orders.id"), primary_key=True)
+    item_id: Mapped[UUID] = mapped_column(ForeignKey("items.id"), primary_key=True)
+    # name and price as they were when the order was placed
+    name: Mapped[str] = mapped_column()
+    price: Mapped[float] = mapped_column()
+    quantity: Mapped[int] = mapped_column()
 
 
 @dataclass
@@ -33,4 +59,5 @@ class User(Base):
     last_name: Mapped[str] = mapped_column()
     hashed_password: Mapped[str] = mapped_column()
     shipping_address: Mapped[str | None] = mapped_column(default=None, nullable=True)
-    cart_items: Mapped[List["CartItem"]] = relationship()
+    # never loaded implicitly: repositories choose how to load carts
+    cart_items: Mapped[List["CartItem"]] = relationship(lazy="raise")
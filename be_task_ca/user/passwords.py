@@ -0,0 +1,64 @@
+import asyncio
+import hashlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from ..exceptions import PasswordHasherBusyError
+
+
+def hash_password(password: str) -> str:
+    """
+    The hash stored for a password. A module-level function so that it can be
+    sent to a process pool.
+    """
+    return hashlib.sha512(password.encode("UTF-8")).hexdigest()
+
+
+class PasswordHasher:
+    """
+    Hashes passwords on a pool of workers so that the CPU spent on it never
+    blocks the event loop. At most `max_pending` hashes are queued or running;
+    callers beyond that wait up to `queue_timeout` seconds for a slot and then
+    get a PasswordHasherBusyError.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        queue_timeout: float,
+        use_processes: bool = False,
+    ):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.use_processes = use_processes
+        self._slots = asyncio.Semaphore(max_pending)
+        self._executor: Executor | None = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            executor_class = (
+                ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            )
+            self._executor = executor_class(max_workers=self.workers)
+        return self._executor
+
+    async def hash(self, password: str) -> str:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise PasswordHasherBusyError(
+                "Too many passwords waiting to be hashed"
+            ) from None
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), hash_password, password
+            )
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
@@ -1,94 +1,727 @@
 from abc import ABC, abstractmethod
-from typing import List
-from uuid import UUID
+from datetime import datetime
+from collections import defaultdict
+from functools import partial
+from typing import Dict, List, Set
+from uuid import UUID, uuid4
 
+from pydantic import TypeAdapter
+from sqlalchemy import case, delete, func, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+
+from ..database import on_commit, on_rollback, upsert_insert
+from ..exceptions import UserAlreadyExistsError
+from ..memory import CartEntry, MemoryStore
+from ..revisions import cart_revision, record_change
+from .cart_store import CartStore
+from ..item.model import Item
 from .schema import (
+    AddToCartResult,
+    CartItemDetails,
+    CartLine,
+    CartLoading,
+    CartView,
     ItemQuantity,
-    UserPrivate,
+    Order as OrderSchema,
+    UserBase,
     User as UserSchema,
 )
-from .model import CartItem, User
+from .model import CartItem, Order, OrderLine, User
+
+
+_cart_item_list = TypeAdapter(List[ItemQuantity])
+
+_cart_details_list = TypeAdapter(List[CartItemDetails])
+
+_cart_line_list = TypeAdapter(List[CartLine])
+
+USER_COLUMNS = (
+    User.id,
+    User.email,
+    User.first_name,
+    User.last_name,
+    User.shipping_address,
+)
+CART_DETAILS_COLUMNS = (CartItem.item_id, CartItem.quantity, Item.name, Item.price)
+LINE_TOTAL = CartItem.quantity * Item.price
+
+
+def _order(id: UUID, created_at: datetime, lines: List[CartLine]) -> OrderSchema:
+    lines.sort(key=lambda line: (line.name, line.item_id))
+    return OrderSchema(
+        id=id,
+        created_at=created_at,
+        items=lines,
+        total=sum(line.line_total for line in lines),
+    )
 
 
 class UserRepo(ABC):
     @abstractmethod
-    def save_user(self, user: UserPrivate) -> UserSchema:
+    async def save_user(self, user: UserBase, hashed_password: str) -> UserSchema:
         """
-        Save a new user to the database.
+        Save a new user with the given password hash to the database.
         """
         pass
 
     @abstractmethod
-    def update_user_cart_items(
-        self, user_id: UUID, cart_item: ItemQuantity
-    ) -> ItemQuantity:
+    async def add_item_to_cart(
+        self, user_id: UUID, cart_item: ItemQuantity, reserved_until: datetime
+    ) -> AddToCartResult:
+        """
+        Add an item in the user's cart if the user and the item exist and the
+        item is not already in the cart. The stock for it must already have
+        been reserved; the cart item holds that reservation until
+        `reserved_until`.
+        """
+        pass
+
+    @abstractmethod
+    async def add_items_to_cart(
+        self, user_id: UUID, cart_items: List[ItemQuantity], reserved_until: datetime
+    ) -> Set[UUID]:
+        """
+        Add several items, whose stock has already been reserved, in the
+        user's cart at once. Items already in the cart are skipped; returns the
+        IDs of the items that were added.
+        """
+        pass
+
+    @abstractmethod
+    async def remove_expired_cart_items(self, now: datetime) -> List[ItemQuantity]:
+        """
+        Remove every cart item whose reservation expired before `now` and
+        return what was removed.
+        """
+        pass
+
+    @abstractmethod
+    async def take_cart(self, user_id: UUID) -> List[ItemQuantity] | None:
+        """
+        Empty the user's cart and return what was in it, None if the user does
+        not exist. The stock reserved for the items stays taken.
+        """
+        pass
+
+    @abstractmethod
+    async def save_order(
+        self, user_id: UUID, cart_items: List[ItemQuantity], created_at: datetime
+    ) -> OrderSchema:
         """
-        Add an item in the user's cart.
+        Save an order of the given items for the user, at the current name
+        and price of each item, with lines ordered by item name.
         """
         pass
 
     @abstractmethod
-    def find_user_by_email(self, email: str) -> UserSchema | None:
+    async def find_user_by_email(
+        self, email: str, cart: CartLoading = CartLoading.NONE
+    ) -> UserSchema | None:
         """
-        Find a user by their email address.
+        Find a user by their email address, loading their cart as requested.
         """
         pass
 
     @abstractmethod
-    def find_user_by_id(self, id: UUID) -> UserSchema | None:
+    async def find_user_by_id(
+        self, id: UUID, cart: CartLoading = CartLoading.NONE
+    ) -> UserSchema | None:
         """
-        Find a user by their unique ID.
+        Find a user by their unique ID, loading their cart as requested.
+        With CartLoading.NONE the returned cart is empty.
         """
         pass
 
     @abstractmethod
-    def list_items_in_cart(self, user_id: UUID) -> List[ItemQuantity]:
+    async def list_items_in_cart(self, user_id: UUID) -> List[ItemQuantity]:
         """
         List all items in a user's cart.
         """
         pass
 
+    @abstractmethod
+    async def view_cart(self, user_id: UUID) -> CartView | None:
+        """
+        The user's cart with the name and price of every item, the total of
+        each line and of the whole cart, ordered by item name. None if the
+        user does not exist.
+        """
+        pass
+
 
 class UserRepoSA(UserRepo):
     def __init__(self, db):
         self.db = db
 
-    def save_user(self, user: UserPrivate) -> UserSchema:
+    async def save_user(self, user: UserBase, hashed_password: str) -> UserSchema:
         user = User(
             first_name=user.first_name,
             last_name=user.last_name,
             email=user.email,
-            hashed_password=user.hashed_password,
+            hashed_password=hashed_password,
             shipping_address=user.shipping_address,
+            cart_items=[],
         )
-        self.db.add(user)
-        self.db.commit()
+        try:
+            # lets a concurrent signup with the same email fail on its own
+            async with self.db.begin_nested():
+                self.db.add(user)
+        except IntegrityError as e:
+            raise UserAlreadyExistsError(
+                "An user with this email address already exists"
+            ) from e
 
         return UserSchema.model_validate(user)
 
-    def update_user_cart_items(self, user_id, cart_item: ItemQuantity) -> ItemQuantity:
-        new_cart_item = CartItem(
-            user_id=user_id,
-            item_id=cart_item.item_id,
-            quantity=cart_item.quantity,
+    async def add_item_to_cart(
+        self, user_id: UUID, cart_item: ItemQuantity, reserved_until: datetime
+    ) -> AddToCartResult:
+        eligible = (
+            select(
+                User.id,
+                Item.id,
+                literal(cart_item.quantity),
+                literal(reserved_until, CartItem.reserved_until.type),
+            )
+            .join(Item, Item.id == cart_item.item_id)
+            .where(User.id == user_id)
+        )
+        statement = (
+            upsert_insert(self.db, CartItem)
+            .from_select(["user_id", "item_id", "quantity", "reserved_until"], eligible)
+            .on_conflict_do_nothing()
+        )
+
+        result = await self.db.execute(statement)
+        if result.rowcount == 1:
+            record_change(self.db, cart_revision(user_id))
+            return AddToCartResult.ADDED
+
+        return await self._explain_rejected_cart_item(user_id, cart_item)
+
+    async def _explain_rejected_cart_item(
+        self, user_id: UUID, cart_item: ItemQuantity
+    ) -> AddToCartResult:
+        row = (
+            await self.db.execute(
+                select(User.id, Item.id)
+                .outerjoin(Item, Item.id == cart_item.item_id)
+                .where(User.id == user_id)
+            )
+        ).first()
+
+        if row is None:
+            return AddToCartResult.USER_NOT_FOUND
+        if row[1] is None:
+            return AddToCartResult.ITEM_NOT_FOUND
+        # the insert hit the (user_id, item_id) primary key
+        return AddToCartResult.ALREADY_IN_CART
+
+    async def add_items_to_cart(
+        self, user_id: UUID, cart_items: List[ItemQuantity], reserved_until: datetime
+    ) -> Set[UUID]:
+        if not cart_items:
+            return set()
+
+        result = await self.db.execute(
+            upsert_insert(self.db, CartItem)
+            .on_conflict_do_nothing()
+            .returning(CartItem.item_id),
+            [
+                {
+                    "user_id": user_id,
+                    "item_id": cart_item.item_id,
+                    "quantity": cart_item.quantity,
+                    "reserved_until": reserved_until,
+                }
+                for cart_item in cart_items
+            ],
+        )
+        added = set(result.scalars())
+        if added:
+            record_change(self.db, cart_revision(user_id))
+        return added
+
+    async def remove_expired_cart_items(self, now: datetime) -> List[ItemQuantity]:
+        rows = (
+            await self.db.execute(
+                delete(CartItem)
+                .where(CartItem.reserved_until < now)
+                .returning(CartItem.user_id, CartItem.item_id, CartItem.quantity)
+            )
+        ).all()
+        record_change(self.db, *{cart_revision(row.user_id) for row in rows})
+        return [ItemQuantity.model_validate(row) for row in rows]
+
+    async def take_cart(self, user_id: UUID) -> List[ItemQuantity] | None:
+        # deleting claims the rows, a concurrent checkout or release of the
+        # same cart gets none of them
+        rows = (
+            await self.db.execute(
+                delete(CartItem)
+                .where(CartItem.user_id == user_id)
+                .returning(CartItem.item_id, CartItem.quantity)
+            )
+        ).all()
+        if not rows:
+            exists = await self.db.scalar(select(User.id).where(User.id == user_id))
+            return None if exists is None else []
+
+        record_change(self.db, cart_revision(user_id))
+        return _cart_item_list.validate_python(rows, from_attributes=True)
+
+    async def save_order(
+        self, user_id: UUID, cart_items: List[ItemQuantity], created_at: datetime
+    ) -> OrderSchema:
+        order_id = uuid4()
+        await self.db.execute(
+            insert(Order.__table__).values(
+                id=order_id, user_id=user_id, created_at=created_at
+            )
         )
-        self.db.add(new_cart_item)
-        self.db.commit()
 
-        return ItemQuantity.model_validate(new_cart_item)
+        # every line in one statement, priced from the items table
+        quantities = {cart_item.item_id: cart_item.quantity for cart_item in cart_items}
+        lines = select(
+            literal(order_id, OrderLine.order_id.type),
+            Item.id,
+            Item.name,
+            Item.price,
+            case(quantities, value=Item.id),
+        ).where(Item.id.in_(quantities))
+        rows = await self.db.execute(
+            insert(OrderLine.__table__)
+            .from_select(["order_id", "item_id", "name", "price", "quantity"], lines)
+            .returning(
+                OrderLine.item_id,
+                OrderLine.name,
+                OrderLine.price,
+                OrderLine.quantity,
+                (OrderLine.quantity * OrderLine.price).label("line_total"),
+            )
+        )
+        return _order(
+            order_id,
+            created_at,
+            _cart_line_list.validate_python(rows, from_attributes=True),
+        )
+
+    async def find_user_by_email(
+        self, email: str, cart: CartLoading = CartLoading.NONE
+    ) -> UserSchema | None:
+        return await self._find_user(User.email == email, cart)
+
+    async def find_user_by_id(
+        self, id: UUID, cart: CartLoading = CartLoading.NONE
+    ) -> UserSchema | None:
+        return await self._find_user(User.id == id, cart)
 
-    def find_user_by_email(self, email: str) -> UserSchema | None:
-        user = self.db.query(User).filter(User.email == email).first()
-        if not user:
+    async def _find_user(self, condition, cart: CartLoading) -> UserSchema | None:
+        # plain rows of just the public columns: no ORM instances to build
+        # and no password hash to load
+        if cart == CartLoading.JOINED:
+            return await self._find_user_with_cart_details(condition)
+
+        row = (await self.db.execute(select(*USER_COLUMNS).where(condition))).first()
+        if row is None:
             return None
-        return UserSchema.model_validate(user)
 
-    def find_user_by_id(self, id: UUID) -> UserSchema | None:
-        user = self.db.query(User).filter(User.id == id).first()
-        if not user:
+        cart_items = []
+        if cart == CartLoading.SELECT:
+            cart_items = await self.list_items_in_cart(row.id)
+        return UserSchema.model_validate({**row._mapping, "cart_items": cart_items})
+
+    async def _find_user_with_cart_details(self, condition) -> UserSchema | None:
+        rows = (
+            await self.db.execute(
+                select(*USER_COLUMNS, *CART_DETAILS_COLUMNS)
+                .outerjoin(CartItem, CartItem.user_id == User.id)
+                .outerjoin(Item, Item.id == CartItem.item_id)
+                .where(condition)
+            )
+        ).all()
+        if not rows:
             return None
-        return UserSchema.model_validate(user)
 
-    def list_items_in_cart(self, user_id) -> List[ItemQuantity]:
-        cart_items = self.db.query(CartItem).filter(CartItem.user_id == user_id).all()
-        return [ItemQuantity.model_validate(item) for item in cart_items]
+        user = {column.key: getattr(rows[0], column.key) for column in USER_COLUMNS}
+        # a user with an empty cart comes back as a single row of NULLs
+        cart_items = [row for row in rows if row.item_id is not None]
+        return UserSchema.model_validate(
+            {
+                **user,
+                "cart_items": _cart_details_list.validate_python(
+                    cart_items, from_attributes=True
+                ),
+            }
+        )
+
+    async def list_items_in_cart(self, user_id) -> List[ItemQuantity]:
+        rows = await self.db.execute(
+            select(CartItem.item_id, CartItem.quantity).where(
+                CartItem.user_id == user_id
+            )
+        )
+        return _cart_item_list.validate_python(rows, from_attributes=True)
+
+    async def view_cart(self, user_id: UUID) -> CartView | None:
+        # joined from users so that an unknown user and an empty cart can be
+        # told apart; the cart total is a window over the same rows
+        rows = (
+            await self.db.execute(
+                select(
+                    *CART_DETAILS_COLUMNS,
+                    LINE_TOTAL.label("line_total"),
+                    func.coalesce(func.sum(LINE_TOTAL).over(), 0).label("total"),
+                )
+                .select_from(User)
+                .outerjoin(CartItem, CartItem.user_id == User.id)
+                .outerjoin(Item, Item.id == CartItem.item_id)
+                .where(User.id == user_id)
+                .order_by(Item.name, Item.id)
+            )
+        ).all()
+        if not rows:
+            return None
+
+        # an empty cart comes back as a single row of NULLs
+        lines = [row for row in rows if row.item_id is not None]
+        return CartView.model_construct(
+            items=_cart_line_list.validate_python(lines, from_attributes=True),
+            total=float(rows[0].total),
+        )
+
+    async def get_all_carts(self) -> Dict[UUID, List[CartEntry]]:
+        """
+        Every cart in the database, keyed by user ID.
+        """
+        carts = defaultdict(list)
+        rows = await self.db.execute(
+            select(
+                CartItem.user_id,
+                CartItem.item_id,
+                CartItem.quantity,
+                CartItem.reserved_until,
+            )
+        )
+        for row in rows:
+            carts[row.user_id].append(
+                CartEntry(ItemQuantity.model_validate(row), row.reserved_until)
+            )
+        return dict(carts)
+
+    async def replace_carts(self, carts: Dict[UUID, List[CartEntry]]) -> None:
+        """
+        Overwrite the carts of the given users with the given entries.
+        """
+        if not carts:
+            return
+
+        await self.db.execute(delete(CartItem).where(CartItem.user_id.in_(carts)))
+        rows = [
+            {
+                "user_id": user_id,
+                "item_id": entry.cart_item.item_id,
+                "quantity": entry.cart_item.quantity,
+                "reserved_until": entry.reserved_until,
+            }
+            for user_id, entries in carts.items()
+            for entry in entries
+        ]
+        if rows:
+            await self.db.execute(insert(CartItem.__table__), rows)
+
+
+class UserRepoWriteBehind(UserRepo):
+    """
+    Users in the database through a UserRepoSA, carts in a CartStore that
+    writes them to the database later, in batches (see tasks.py).
+
+    Cart writes follow the transaction of the request, which holds the stock
+    reservations: added items are confirmed once it commits, and removed ones
+    put back if it does not. Should the process die in between, stock stays
+    reserved for nothing rather than being sold twice. Items put in a cart
+    are taken to exist, their stock having been reserved.
+    """
+
+    def __init__(self, repo: UserRepoSA, store: CartStore):
+        self.repo = repo
+        self.store = store
+        self.db = repo.db
+
+    async def save_user(self, user: UserBase, hashed_password: str) -> UserSchema:
+        return await self.repo.save_user(user, hashed_password)
+
+    async def _user_exists(self, user_id: UUID) -> bool:
+        # carts are only ever kept for existing users, which are never deleted
+        return await self.store.has_cart(user_id) or (
+            await self.repo.find_user_by_id(user_id) is not None
+        )
+
+    async def _add(self, user_id: UUID, entries: List[CartEntry]) -> Set[UUID]:
+        added = await self.store.add(user_id, entries)
+        if added:
+            on_commit(self.db, partial(self.store.confirm, user_id, added))
+            on_rollback(self.db, partial(self.store.remove, user_id, added))
+            record_change(self.db, cart_revision(user_id))
+        return added
+
+    async def add_item_to_cart(
+        self, user_id: UUID, cart_item: ItemQuantity, reserved_until: datetime
+    ) -> AddToCartResult:
+        if not await self._user_exists(user_id):
+            return AddToCartResult.USER_NOT_FOUND
+        if not await self._add(user_id, [CartEntry(cart_item, reserved_until)]):
+            return AddToCartResult.ALREADY_IN_CART
+        return AddToCartResult.ADDED
+
+    async def add_items_to_cart(
+        self, user_id: UUID, cart_items: List[ItemQuantity], reserved_until: datetime
+    ) -> Set[UUID]:
+        if not cart_items or not await self._user_exists(user_id):
+            return set()
+        return await self._add(
+            user_id, [CartEntry(cart_item, reserved_until) for cart_item in cart_items]
+        )
+
+    async def remove_expired_cart_items(self, now: datetime) -> List[ItemQuantity]:
+        removed = await self.store.remove_expired(now)
+        for user_id, entries in removed.items():
+            on_rollback(self.db, partial(_put_back, self.store, user_id, entries))
+            record_change(self.db, cart_revision(user_id))
+        return [entry.cart_item for entries in removed.values() for entry in entries]
+
+    async def take_cart(self, user_id: UUID) -> List[ItemQuantity] | None:
+        if not await self._user_exists(user_id):
+            return None
+        entries = await self.store.take(user_id)
+        if entries:
+            on_rollback(self.db, partial(_put_back, self.store, user_id, entries))
+            record_change(self.db, cart_revision(user_id))
+        return [entry.cart_item for entry in entries]
+
+    async def save_order(
+        self, user_id: UUID, cart_items: List[ItemQuantity], created_at: datetime
+    ) -> OrderSchema:
+        return await self.repo.save_order(user_id, cart_items, created_at)
+
+    async def find_user_by_email(
+        self, email: str, cart: CartLoading = CartLoading.NONE
+    ) -> UserSchema | None:
+        user = await self.repo.find_user_by_email(email)
+        return None if user is None else await self._with_cart(user, cart)
+
+    async def find_user_by_id(
+        self, id: UUID, cart: CartLoading = CartLoading.NONE
+    ) -> UserSchema | None:
+        user = await self.repo.find_user_by_id(id)
+        return None if user is None else await self._with_cart(user, cart)
+
+    async def _with_cart(self, user: UserSchema, cart: CartLoading) -> UserSchema:
+        if cart == CartLoading.NONE:
+            return user
+        if cart == CartLoading.SELECT:
+            cart_items = await self.list_items_in_cart(user.id)
+        else:
+            cart_items = [
+                CartItemDetails(**line.model_dump(exclude={"line_total"}))
+                for line in await self._cart_lines(user.id)
+            ]
+        return user.model_copy(update={"cart_items": cart_items})
+
+    async def list_items_in_cart(self, user_id: UUID) -> List[ItemQuantity]:
+        return [entry.cart_item for entry in await self.store.get_cart(user_id)]
+
+    async def _cart_lines(self, user_id: UUID) -> List[CartLine]:
+        cart_items = await self.list_items_in_cart(user_id)
+        if not cart_items:
+            return []
+
+        rows = await self.db.execute(
+            select(Item.id, Item.name, Item.price).where(
+                Item.id.in_([cart_item.item_id for cart_item in cart_items])
+            )
+        )
+        items = {row.id: row for row in rows}
+        lines = [
+            CartLine(
+                **cart_item.model_dump(),
+                name=items[cart_item.item_id].name,
+                price=items[cart_item.item_id].price,
+                line_total=cart_item.quantity * items[cart_item.item_id].price,
+            )
+            for cart_item in cart_items
+        ]
+        return sorted(lines, key=lambda line: (line.name, line.item_id))
+
+    async def view_cart(self, user_id: UUID) -> CartView | None:
+        if not await self._user_exists(user_id):
+            return None
+        lines = await self._cart_lines(user_id)
+        return CartView(items=lines, total=sum(line.line_total for line in lines))
+
+
+async def _put_back(store: CartStore, user_id: UUID, entries: List[CartEntry]):
+    added = await store.add(user_id, entries)
+    await store.confirm(user_id, added)
+
+
+class UserRepoMemory(UserRepo):
+    """
+    Users and carts kept in a MemoryStore, indexed by ID and by email.
+    Writes are not transactional: they are visible to everyone as soon as
+    they are made.
+    """
+
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    async def save_user(self, user: UserBase, hashed_password: str) -> UserSchema:
+        with self.store.lock:
+            if user.email in self.store.user_ids_by_email:
+                raise UserAlreadyExistsError(
+                    "An user with this email address already exists"
+                )
+            new_user = UserSchema(
+                id=uuid4(),
+                **user.model_dump(include=set(UserBase.model_fields)),
+                cart_items=[],
+            )
+            self.store.users[new_user.id] = new_user
+            self.store.user_ids_by_email[new_user.email] = new_user.id
+            self.store.hashed_passwords[new_user.id] = hashed_password
+            self.store.carts[new_user.id] = {}
+        return new_user
+
+    async def add_item_to_cart(
+        self, user_id: UUID, cart_item: ItemQuantity, reserved_until: datetime
+    ) -> AddToCartResult:
+        with self.store.lock:
+            cart = self.store.carts.get(user_id)
+            if cart is None:
+                return AddToCartResult.USER_NOT_FOUND
+            if cart_item.item_id not in self.store.items:
+                return AddToCartResult.ITEM_NOT_FOUND
+            if cart_item.item_id in cart:
+                return AddToCartResult.ALREADY_IN_CART
+            cart[cart_item.item_id] = CartEntry(cart_item, reserved_until)
+            self.store.bump(cart_revision(user_id))
+        return AddToCartResult.ADDED
+
+    async def add_items_to_cart(
+        self, user_id: UUID, cart_items: List[ItemQuantity], reserved_until: datetime
+    ) -> Set[UUID]:
+        added: Set[UUID] = set()
+        with self.store.lock:
+            cart = self.store.carts.get(user_id)
+            if cart is None:
+                return added
+            for cart_item in cart_items:
+                if cart_item.item_id in cart or cart_item.item_id in added:
+                    continue
+                if cart_item.item_id not in self.store.items:
+                    continue
+                cart[cart_item.item_id] = CartEntry(cart_item, reserved_until)
+                added.add(cart_item.item_id)
+            if added:
+                self.store.bump(cart_revision(user_id))
+        return added
+
+    async def remove_expired_cart_items(self, now: datetime) -> List[ItemQuantity]:
+        removed: List[ItemQuantity] = []
+        with self.store.lock:
+            for user_id, cart in self.store.carts.items():
+                expired = [
+                    item_id
+                    for item_id, entry in cart.items()
+                    if entry.reserved_until < now
+                ]
+                if expired:
+                    removed.extend(cart.pop(item_id).cart_item for item_id in expired)
+                    self.store.bump(cart_revision(user_id))
+        return removed
+
+    async def take_cart(self, user_id: UUID) -> List[ItemQuantity] | None:
+        with self.store.lock:
+            cart = self.store.carts.get(user_id)
+            if cart is None:
+                return None
+            taken = [entry.cart_item for entry in cart.values()]
+            if taken:
+                cart.clear()
+                self.store.bump(cart_revision(user_id))
+        return taken
+
+    async def save_order(
+        self, user_id: UUID, cart_items: List[ItemQuantity], created_at: datetime
+    ) -> OrderSchema:
+        with self.store.lock:
+            lines = []
+            for cart_item in cart_items:
+                item = self.store.items.get(cart_item.item_id)
+                if item is None:
+                    continue
+                lines.append(
+                    CartLine(
+                        **cart_item.model_dump(),
+                        name=item.name,
+                        price=item.price,
+                        line_total=cart_item.quantity * item.price,
+                    )
+                )
+            order = _order(uuid4(), created_at, lines)
+            self.store.orders.setdefault(user_id, []).append(order)
+        return order
+
+    async def find_user_by_email(
+        self, email: str, cart: CartLoading = CartLoading.NONE
+    ) -> UserSchema | None:
+        with self.store.lock:
+            id = self.store.user_ids_by_email.get(email)
+            return None if id is None else self._with_cart(id, cart)
+
+    async def find_user_by_id(
+        self, id: UUID, cart: CartLoading = CartLoading.NONE
+    ) -> UserSchema | None:
+        with self.store.lock:
+            return self._with_cart(id, cart) if id in self.store.users else None
+
+    async def list_items_in_cart(self, user_id: UUID) -> List[ItemQuantity]:
+        with self.store.lock:
+            cart = self.store.carts.get(user_id, {})
+            return [entry.cart_item for entry in cart.values()]
+
+    async def view_cart(self, user_id: UUID) -> CartView | None:
+        with self.store.lock:
+            cart = self.store.carts.get(user_id)
+            if cart is None:
+                return None
+            lines = []
+            for entry in cart.values():
+                item = self.store.items[entry.cart_item.item_id]
+                lines.append(
+                    CartLine(
+                        **entry.cart_item.model_dump(),
+                        name=item.name,
+                        price=item.price,
+                        line_total=entry.cart_item.quantity * item.price,
+                    )
+                )
+        lines.sort(key=lambda line: (line.name, line.item_id))
+        return CartView(items=lines, total=sum(line.line_total for line in lines))
+
+    def _with_cart(self, id: UUID, cart: CartLoading) -> UserSchema:
+        entries = self.store.carts[id].values()
+        if cart == CartLoading.NONE:
+            cart_items = []
+        elif cart == CartLoading.SELECT:
+            cart_items = [entry.cart_item for entry in entries]
+        else:
+            cart_items = [
+                CartItemDetails(
+                    **entry.cart_item.model_dump(),
+                    name=self.store.items[entry.cart_item.item_id].name,
+                    price=self.store.items[entry.cart_item.item_id].price,
+                )
+                for entry in entries
+            ]
+        return self.store.users[id].model_copy(update={"cart_items": cart_items})
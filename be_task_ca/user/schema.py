@@ -1,14 +1,43 @@
-import hashlib
+from datetime import datetime
+from enum import Enum
 from typing import List
 from uuid import UUID
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class ItemQuantity(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
     item_id: UUID
-    quantity: int
+    quantity: int = Field(gt=0)
+
+
+class CartItemDetails(ItemQuantity):
+    name: str
+    price: float
+
+
+class CartLine(CartItemDetails):
+    line_total: float
+
+
+class CartView(BaseModel):
+    items: List[CartLine]
+    total: float
+
+
+class Order(BaseModel):
+    id: UUID
+    created_at: datetime
+    items: List[CartLine]
+    total: float
+
+
+class CartLoading(str, Enum):
+    # how much of the cart to load along with a user
+    NONE = "none"
+    SELECT = "select"  # the cart items, in a second query
+    JOINED = "joined"  # the cart items and their item details, in the same query
 
 
 class UserBase(BaseModel):
@@ -21,10 +50,6 @@ class UserBase(BaseModel):
 class UserPrivate(UserBase):
     password: str
 
-    @property
-    def hashed_password(self) -> str:
-        return hashlib.sha512(self.password.encode("UTF-8")).hexdigest()
-
 
 class User(UserBase):
     model_config = ConfigDict(from_attributes=True)
@@ -35,3 +60,26 @@ class User(UserBase):
 
 class AddToCartResponse(BaseModel):
     items: List[ItemQuantity]
+
+
+class AddToCartResult(str, Enum):
+    ADDED = "added"
+    USER_NOT_FOUND = "user_not_found"
+    ITEM_NOT_FOUND = "item_not_found"
+    ALREADY_IN_CART = "already_in_cart"
+
+
+class CartItemStatus(str, Enum):
+    ADDED = "added"
+    ITEM_NOT_FOUND = "item_not_found"
+    NOT_ENOUGH_STOCK = "not_enough_stock"
+    ALREADY_IN_CART = "already_in_cart"
+
+
+class CartItemResult(ItemQuantity):
+    status: CartItemStatus
+
+
+class BatchAddToCartResponse(BaseModel):
+    results: List[CartItemResult]
+    items: List[ItemQuantity]
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+
+from ..database import db_session_scope
+from ..dependencies import db_scope, get_item_repo, get_unit_of_work, get_user_repo
+from .cart_store import CartStore
+from .repository import UserRepoSA
+from .usecases import release_expired_reservations
+
+logger = logging.getLogger(__name__)
+
+
+async def sweep_expired_reservations(interval: float):
+    """
+    Periodically return the stock held by expired cart reservations.
+    """
+    while True:
+        try:
+            async with db_scope() as db:
+                released = await release_expired_reservations(
+                    get_unit_of_work(db), get_user_repo(db), get_item_repo(db)
+                )
+            if released:
+                logger.info("Released %d expired cart reservations", released)
+        except Exception:
+            logger.exception("Failed to release expired cart reservations")
+
+        await asyncio.sleep(interval)
+
+
+async def load_carts(store: CartStore):
+    """
+    Fill a write-behind cart store with the carts already in the database.
+    """
+    async with db_session_scope() as db:
+        await store.load(await UserRepoSA(db).get_all_carts())
+
+
+async def flush_carts(store: CartStore, batch_size: int) -> int:
+    """
+    Write every changed cart of a write-behind cart store to the database,
+    `batch_size` carts per transaction. Returns the number of carts written.
+    """
+    flushed = 0
+    while carts := await store.take_dirty(batch_size):
+        try:
+            async with db_session_scope() as db:
+                await UserRepoSA(db).replace_carts(carts)
+                await db.commit()
+        except BaseException:
+            await store.mark_dirty(carts)
+            raise
+        flushed += len(carts)
+
+    if flushed:
+        await store.checkpoint()
+    return flushed
+
+
+async def flush_carts_periodically(store: CartStore, interval: float, batch_size: int):
+    while True:
+        try:
+            flushed = await flush_carts(store, batch_size)
+            if flushed:
+                logger.debug("Wrote %d carts to the database", flushed)
+        except Exception:
+            logger.exception("Failed to write carts to the database")
+
+        await asyncio.sleep(interval)
@@ -1,63 +1,228 @@
-from typing import List
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
 from uuid import UUID
 
 from ..exceptions import (
+    CartEmptyError,
     ItemAlreadyInCartError,
     ItemDoesNotExistError,
     ItemQuantityError,
     UserAlreadyExistsError,
     UserDoesNotExistError,
 )
+from ..revisions import RevisionRepo, cart_revision
+from ..unit_of_work import UnitOfWork
+from .passwords import PasswordHasher
 from .repository import UserRepo
 
 from ..item.repository import ItemRepo
 
 from .schema import (
+    AddToCartResult,
+    CartItemResult,
+    CartItemStatus,
+    CartLoading,
+    CartView,
     ItemQuantity,
+    Order,
     UserPrivate,
     User,
 )
 
+DEFAULT_RESERVATION_TTL = timedelta(minutes=15)
 
-def create_user(user_repo: UserRepo, create_user: UserPrivate) -> User:
-    search_result = user_repo.find_user_by_email(create_user.email)
+
+async def create_user(
+    uow: UnitOfWork,
+    user_repo: UserRepo,
+    password_hasher: PasswordHasher,
+    create_user: UserPrivate,
+) -> User:
+    search_result = await user_repo.find_user_by_email(create_user.email)
     if search_result is not None:
         raise UserAlreadyExistsError("An user with this email address already exists")
 
-    new_user = user_repo.save_user(create_user)
+    hashed_password = await password_hasher.hash(create_user.password)
+    new_user = await user_repo.save_user(create_user, hashed_password)
+    await uow.commit()
 
     return new_user
 
 
-def add_item_to_cart(
+async def add_item_to_cart(
+    uow: UnitOfWork,
     user_repo: UserRepo,
     item_repo: ItemRepo,
     user_id: UUID,
     cart_item: ItemQuantity,
+    reservation_ttl: timedelta = DEFAULT_RESERVATION_TTL,
 ) -> List[ItemQuantity]:
-    user = user_repo.find_user_by_id(user_id)
-    if user is None:
-        raise UserDoesNotExistError("User does not exist")
+    reserved = await item_repo.reserve_stock(cart_item.item_id, cart_item.quantity)
+    if not reserved:
+        if await user_repo.find_user_by_id(user_id) is None:
+            raise UserDoesNotExistError("User does not exist")
+        if await item_repo.find_item_by_id(cart_item.item_id) is None:
+            raise ItemDoesNotExistError("Item does not exist")
+        raise ItemQuantityError("Not enough items in stock")
 
-    item = item_repo.find_item_by_id(cart_item.item_id)
-    if item is None:
-        raise ItemDoesNotExistError("Item does not exist")
+    reserved_until = datetime.now(timezone.utc) + reservation_ttl
+    result = await user_repo.add_item_to_cart(user_id, cart_item, reserved_until)
 
-    if item.quantity < cart_item.quantity:
-        raise ItemQuantityError("Not enough items in stock")
+    if result != AddToCartResult.ADDED:
+        await item_repo.release_stock({cart_item.item_id: cart_item.quantity})
 
-    item_ids = [o.item_id for o in user.cart_items]
-    if cart_item.item_id in item_ids:
+    if result == AddToCartResult.USER_NOT_FOUND:
+        raise UserDoesNotExistError("User does not exist")
+    if result == AddToCartResult.ITEM_NOT_FOUND:
+        raise ItemDoesNotExistError("Item does not exist")
+    if result == AddToCartResult.ALREADY_IN_CART:
         raise ItemAlreadyInCartError("Item already in cart")
 
-    user_repo.update_user_cart_items(user_id, cart_item)
+    await uow.commit()
+    return await user_repo.list_items_in_cart(user_id)
 
-    return user_repo.list_items_in_cart(user.id)
 
+async def add_items_to_cart(
+    uow: UnitOfWork,
+    user_repo: UserRepo,
+    item_repo: ItemRepo,
+    user_id: UUID,
+    cart_items: List[ItemQuantity],
+    reservation_ttl: timedelta = DEFAULT_RESERVATION_TTL,
+) -> Tuple[List[CartItemResult], List[ItemQuantity]]:
+    """
+    Add several items in the user's cart in one go. Each item is added or
+    rejected on its own; returns the outcome per item and the updated cart.
+    """
+    user = await user_repo.find_user_by_id(user_id, CartLoading.SELECT)
+    if user is None:
+        raise UserDoesNotExistError("User does not exist")
 
-def list_items_in_cart(user_repo: UserRepo, user_id: UUID) -> List[ItemQuantity]:
-    user = user_repo.find_user_by_id(user_id)
+    in_cart = {cart_item.item_id for cart_item in user.cart_items}
+    stock = {
+        item.id: item.quantity
+        for item in await item_repo.find_items_by_ids(
+            list({cart_item.item_id for cart_item in cart_items})
+        )
+    }
+
+    statuses: Dict[int, CartItemStatus] = {}
+    candidates: Dict[int, ItemQuantity] = {}
+    for position, cart_item in enumerate(cart_items):
+        if cart_item.item_id not in stock:
+            statuses[position] = CartItemStatus.ITEM_NOT_FOUND
+        elif cart_item.item_id in in_cart:
+            statuses[position] = CartItemStatus.ALREADY_IN_CART
+        elif stock[cart_item.item_id] < cart_item.quantity:
+            statuses[position] = CartItemStatus.NOT_ENOUGH_STOCK
+        else:
+            # a repeated item in the same request counts as already in the cart
+            in_cart.add(cart_item.item_id)
+            candidates[position] = cart_item
+
+    reserved = await item_repo.reserve_stock_batch(
+        {cart_item.item_id: cart_item.quantity for cart_item in candidates.values()}
+    )
+    for position, cart_item in candidates.items():
+        if cart_item.item_id not in reserved:
+            statuses[position] = CartItemStatus.NOT_ENOUGH_STOCK
+
+    reserved_until = datetime.now(timezone.utc) + reservation_ttl
+    to_add = [c for c in candidates.values() if c.item_id in reserved]
+    added = await user_repo.add_items_to_cart(user_id, to_add, reserved_until)
+
+    # lost a race with a concurrent add of the same item
+    await item_repo.release_stock(
+        {c.item_id: c.quantity for c in to_add if c.item_id not in added}
+    )
+    for position, cart_item in candidates.items():
+        if cart_item.item_id in added:
+            statuses[position] = CartItemStatus.ADDED
+        elif cart_item.item_id in reserved:
+            statuses[position] = CartItemStatus.ALREADY_IN_CART
+
+    results = [
+        CartItemResult(
+            item_id=cart_item.item_id,
+            quantity=cart_item.quantity,
+            status=statuses[position],
+        )
+        for position, cart_item in enumerate(cart_items)
+    ]
+    await uow.commit()
+
+    cart = user.cart_items + [c for c in to_add if c.item_id in added]
+    return results, cart
+
+
+async def release_expired_reservations(
+    uow: UnitOfWork,
+    user_repo: UserRepo,
+    item_repo: ItemRepo,
+    now: datetime | None = None,
+) -> int:
+    """
+    Drop expired cart items and return their stock. Returns the number of
+    cart items removed.
+    """
+    expired = await user_repo.remove_expired_cart_items(
+        now or datetime.now(timezone.utc)
+    )
+
+    quantities: Dict[UUID, int] = defaultdict(int)
+    for cart_item in expired:
+        quantities[cart_item.item_id] += cart_item.quantity
+    await item_repo.release_stock(quantities)
+    await uow.commit()
+
+    return len(expired)
+
+
+async def checkout(
+    uow: UnitOfWork,
+    user_repo: UserRepo,
+    user_id: UUID,
+    now: datetime | None = None,
+) -> Order:
+    """
+    Turn the user's cart into an order. The stock of every item was taken
+    when it was put in the cart, so the order only claims those reservations;
+    either the whole cart becomes the order or nothing changes.
+    """
+    cart_items = await user_repo.take_cart(user_id)
+    if cart_items is None:
+        raise UserDoesNotExistError("User does not exist")
+    if not cart_items:
+        raise CartEmptyError("Cart is empty")
+
+    order = await user_repo.save_order(
+        user_id, cart_items, now or datetime.now(timezone.utc)
+    )
+    await uow.commit()
+
+    return order
+
+
+async def list_items_in_cart(user_repo: UserRepo, user_id: UUID) -> List[ItemQuantity]:
+    # the user and their cart in a single query
+    user = await user_repo.find_user_by_id(user_id, CartLoading.JOINED)
     if user is None:
         raise UserDoesNotExistError("User does not exist")
 
-    return user_repo.list_items_in_cart(user.id)
+    return user.cart_items
+
+
+async def get_cart_version(revision_repo: RevisionRepo, user_id: UUID) -> str:
+    """
+    Changes whenever an item is added to or removed from the user's cart.
+    """
+    return await revision_repo.get_version(cart_revision(user_id))
+
+
+async def view_cart(user_repo: UserRepo, user_id: UUID) -> CartView:
+    cart = await user_repo.view_cart(user_id)
+    if cart is None:
+        raise UserDoesNotExistError("User does not exist")
+
+    return cart
@@ -0,0 +1,158 @@
+"""
+Race concurrent checkouts of carts sharing the same few items.
+
+Every client is a separate user who puts a random handful of the same
+--items items in their cart, then checks out, each step in its own session
+and transaction, the way concurrent requests would. The run fails if a
+request errors out (a deadlock, say), or unless, for every item, the units
+ordered plus the units left in stock add up to the initial stock.
+
+    python -m benchmarks.checkout_contention --clients 500 --items 10
+
+The database is taken from DATABASE_CONNECTION_STRING, defaulting to a
+temporary SQLite file.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List
+from uuid import UUID
+
+from be_task_ca import database
+from be_task_ca.database import Base, db_session_scope, get_db_engine
+from be_task_ca.dependencies import get_item_repo, get_unit_of_work, get_user_repo
+from be_task_ca.exceptions import CartEmptyError
+from be_task_ca.item.model import Item
+from be_task_ca.user.model import CartItem, User  # noqa
+from be_task_ca.user.schema import ItemQuantity, Order
+from be_task_ca.user.usecases import add_items_to_cart, checkout
+
+from .stats import percentiles
+
+
+async def seed(clients: int, items: int, stock: int) -> tuple[list[UUID], list[UUID]]:
+    engine = get_db_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with db_session_scope() as db:
+        catalog = [
+            Item(name=f"hot-item-{i}", price=1.0, quantity=stock)
+            for i in range(items)
+        ]
+        users = [
+            User(
+                email=f"client-{i}@example.com",
+                first_name="Client",
+                last_name=str(i),
+                hashed_password="",
+            )
+            for i in range(clients)
+        ]
+        db.add_all(catalog)
+        db.add_all(users)
+        await db.commit()
+        return [item.id for item in catalog], [user.id for user in users]
+
+
+async def buy(
+    user_id: UUID, cart_items: List[ItemQuantity]
+) -> tuple[Order | None, float]:
+    async with db_session_scope() as db:
+        await add_items_to_cart(
+            get_unit_of_work(db),
+            get_user_repo(db),
+            get_item_repo(db),
+            user_id,
+            cart_items,
+        )
+
+    started = time.perf_counter()
+    try:
+        async with db_session_scope() as db:
+            order = await checkout(get_unit_of_work(db), get_user_repo(db), user_id)
+    except CartEmptyError:
+        # every item of the cart was out of stock
+        order = None
+    return order, time.perf_counter() - started
+
+
+async def run(clients: int, items: int, stock: int, per_cart: int) -> bool:
+    item_ids, user_ids = await seed(clients, items, stock)
+    rng = random.Random(42)
+    carts = {
+        user_id: [
+            ItemQuantity(item_id=item_id, quantity=rng.randint(1, 3))
+            for item_id in rng.sample(item_ids, min(per_cart, items))
+        ]
+        for user_id in user_ids
+    }
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(buy(user_id, cart_items) for user_id, cart_items in carts.items()),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - started
+
+    async with db_session_scope() as db:
+        remaining: Dict[UUID, int] = {
+            item.id: item.quantity
+            for item in await get_item_repo(db).find_items_by_ids(item_ids)
+        }
+    await get_db_engine().dispose()
+
+    failures = [result for result in results if isinstance(result, BaseException)]
+    completed = [result for result in results if not isinstance(result, BaseException)]
+    orders = [order for order, _ in completed if order is not None]
+    ordered = Counter()
+    for order in orders:
+        for line in order.items:
+            ordered[line.item_id] += line.quantity
+    latency = percentiles([latency * 1000 for _, latency in completed])
+    conserved = all(ordered[id] + remaining[id] == stock for id in item_ids)
+
+    print(f"clients={clients} items={items} stock={stock} per cart={per_cart}")
+    print(
+        f"orders={len(orders)} units ordered={sum(ordered.values())} "
+        f"units left={sum(remaining.values())} failed requests={len(failures)}"
+    )
+    print(f"throughput={clients / elapsed:.0f} checkouts/s")
+    print(
+        f"checkout latency p50={latency['p50']:.1f}ms p95={latency['p95']:.1f}ms "
+        f"p99={latency['p99']:.1f}ms"
+    )
+    for failure in failures[:3]:
+        print(f"  {type(failure).__name__}: {failure}", file=sys.stderr)
+
+    return not failures and conserved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--per-cart", type=int, default=4)
+    args = parser.parse_args()
+
+    if "DATABASE_CONNECTION_STRING" not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(), "checkout.db")
+        os.environ["DATABASE_CONNECTION_STRING"] = f"sqlite+aiosqlite:///{path}"
+    database.engine = None
+    database.SessionLocal = None
+
+    correct = asyncio.run(run(args.clients, args.items, args.stock, args.per_cart))
+    if not correct:
+        print("FAILED: a request failed or stock was lost", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Replay a realistic mix of API requests and report throughput and latency.
+
+After seeding users and items through the API, a fixed, seeded sequence of
+requests (signups, new items, adds to cart, cart views and catalog pages) is
+replayed by concurrent clients. Throughput and p50/p95/p99 latencies are
+compared with the baseline stored in benchmarks/baseline.json, and the run
+fails when throughput drops or p95 latency grows by more than the tolerance.
+
+    python -m benchmarks.load --users 100 --items 500 --requests 5000
+
+By default the app runs in-process against a temporary SQLite file. Set
+DATABASE_CONNECTION_STRING to run it in-process against Postgres instead,
+REPOSITORY_BACKEND=memory to leave the database out altogether, or pass --url
+to load an already running server. --save-baseline records the
+run as the new baseline for its profile instead of comparing.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Tuple
+from uuid import uuid4
+
+import httpx
+from sqlalchemy import make_url
+
+from be_task_ca import database
+from be_task_ca.database import Base, get_db_engine
+from be_task_ca.item.model import Item  # noqa
+from be_task_ca.user.model import CartItem, User  # noqa
+
+from .stats import percentiles
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+# relative weights of the operations in the replayed traffic
+MIX = {
+    "list_items": 40,
+    "get_cart": 25,
+    "add_to_cart": 20,
+    "create_item": 10,
+    "create_user": 5,
+}
+
+# responses that are a legitimate outcome of the operation under load
+EXPECTED_STATUS = {
+    "list_items": {200},
+    "get_cart": {200},
+    "add_to_cart": {200, 409},  # already in the cart or out of stock
+    "create_item": {200},
+    "create_user": {200},
+}
+
+
+@dataclass
+class Results:
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def record(self, operation: str, started: float, response: httpx.Response):
+        self.latencies[operation].append((time.perf_counter() - started) * 1000)
+        if response.status_code not in EXPECTED_STATUS[operation]:
+            self.errors[operation] += 1
+
+
+class Workload:
+    """
+    A reproducible sequence of requests over the seeded users and items.
+    """
+
+    def __init__(self, tag: str, user_ids: List[str], item_ids: List[str], seed):
+        self.tag = tag
+        self.user_ids = user_ids
+        self.item_ids = item_ids
+        self.random = random.Random(seed)
+        self.created = 0
+
+    def user_payload(self) -> dict:
+        self.created += 1
+        return {
+            "email": f"{self.tag}-user-{self.created}@example.com",
+            "first_name": "Load",
+            "last_name": "Test",
+            "password": "secret",
+        }
+
+    def item_payload(self) -> dict:
+        self.created += 1
+        return {
+            "name": f"{self.tag}-item-{self.created}",
+            "description": "Seeded by the load benchmark",
+            "price": round(self.random.uniform(1, 100), 2),
+            "quantity": 1_000_000,
+        }
+
+    def operations(self, count: int) -> List[Tuple[str, str, str, dict | None]]:
+        names, weights = zip(*MIX.items())
+        operations = []
+        for name in self.random.choices(names, weights, k=count):
+            user_id = self.random.choice(self.user_ids)
+            if name == "list_items":
+                operations.append((name, "GET", "/items/?limit=50", None))
+            elif name == "get_cart":
+                operations.append((name, "GET", f"/users/{user_id}/cart", None))
+            elif name == "add_to_cart":
+                item = {"item_id": self.random.choice(self.item_ids), "quantity": 1}
+                operations.append((name, "POST", f"/users/{user_id}/cart", item))
+            elif name == "create_item":
+                operations.append((name, "POST", "/items/", self.item_payload()))
+            else:
+                operations.append((name, "POST", "/users/", self.user_payload()))
+        return operations
+
+
+async def create_schema():
+    engine = get_db_engine()
+    async with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def seed(client: httpx.AsyncClient, workload: Workload, args):
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def create(path: str, payload: dict) -> str:
+        async with slots:
+            response = await client.post(path, json=payload)
+        response.raise_for_status()
+        return response.json()["id"]
+
+    workload.user_ids = await asyncio.gather(
+        *(create("/users/", workload.user_payload()) for _ in range(args.users))
+    )
+    workload.item_ids = await asyncio.gather(
+        *(create("/items/", workload.item_payload()) for _ in range(args.items))
+    )
+
+
+async def replay(client: httpx.AsyncClient, operations, concurrency: int) -> Results:
+    results = Results()
+    queue = iter(operations)
+
+    async def worker():
+        for operation, method, path, payload in queue:
+            started = time.perf_counter()
+            response = await client.request(method, path, json=payload)
+            results.record(operation, started, response)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+def in_memory() -> bool:
+    return os.environ.get("REPOSITORY_BACKEND") == "memory"
+
+
+async def run(args) -> Tuple[float, Results]:
+    uses_engine = not args.url and not in_memory()
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        from be_task_ca.app import create_app
+
+        if uses_engine:
+            await create_schema()
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=create_app()),
+            base_url="http://benchmark",
+            timeout=60,
+        )
+
+    workload = Workload(uuid4().hex[:8], [], [], args.seed)
+    async with client:
+        await seed(client, workload, args)
+        operations = workload.operations(args.requests)
+
+        started = time.perf_counter()
+        results = await replay(client, operations, args.concurrency)
+        elapsed = time.perf_counter() - started
+
+    if uses_engine:
+        await get_db_engine().dispose()
+
+    return args.requests / elapsed, results
+
+
+def summarise(throughput: float, results: Results) -> dict:
+    every = [latency for values in results.latencies.values() for latency in values]
+    return {
+        "throughput": round(throughput, 1),
+        **{name: round(value, 2) for name, value in percentiles(every).items()},
+    }
+
+
+def report(summary: dict, results: Results):
+    print(f"{'operation':<14}{'count':>8}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for operation in MIX:
+        latencies = results.latencies.get(operation, [])
+        cuts = percentiles(latencies)
+        print(
+            f"{operation:<14}{len(latencies):>8}{results.errors[operation]:>8}"
+            f"{cuts['p50']:>7.1f}ms{cuts['p95']:>7.1f}ms{cuts['p99']:>7.1f}ms"
+        )
+    print(
+        f"throughput={summary['throughput']:.0f} req/s "
+        f"p50={summary['p50']:.1f}ms p95={summary['p95']:.1f}ms "
+        f"p99={summary['p99']:.1f}ms"
+    )
+
+
+def regressions(summary: dict, baseline: dict, tolerance: float) -> List[str]:
+    found = []
+    if summary["throughput"] < baseline["throughput"] * (1 - tolerance):
+        found.append(
+            f"throughput {summary['throughput']:.0f} req/s is below the "
+            f"baseline of {baseline['throughput']:.0f} req/s"
+        )
+    if summary["p95"] > baseline["p95"] * (1 + tolerance):
+        found.append(
+            f"p95 latency {summary['p95']:.1f}ms is above the "
+            f"baseline of {baseline['p95']:.1f}ms"
+        )
+    return found
+
+
+def default_profile(args) -> str:
+    if args.url:
+        return "http"
+    if in_memory():
+        return f"memory-c{args.concurrency}"
+    backend = make_url(os.environ["DATABASE_CONNECTION_STRING"]).get_backend_name()
+    return f"{backend}-c{args.concurrency}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="load a running server instead of the app")
+    parser.add_argument("--profile", help="baseline entry to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    if not args.url and "DATABASE_CONNECTION_STRING" not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(), "load.db")
+        os.environ["DATABASE_CONNECTION_STRING"] = f"sqlite+aiosqlite:///{path}"
+    database.engine = None
+    database.SessionLocal = None
+    # one log line per request would dominate the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    throughput, results = asyncio.run(run(args))
+    summary = summarise(throughput, results)
+    report(summary, results)
+
+    if sum(results.errors.values()):
+        print("FAILED: unexpected responses", file=sys.stderr)
+        sys.exit(1)
+
+    profile = args.profile or default_profile(args)
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+
+    if args.save_baseline:
+        baselines[profile] = summary
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"saved baseline {profile!r} to {args.baseline}")
+        return
+
+    if profile not in baselines:
+        print(f"no baseline {profile!r} to compare with, run with --save-baseline")
+        return
+
+    found = regressions(summary, baselines[profile], args.tolerance)
+    for regression in found:
+        print(f"REGRESSION ({profile}): {regression}", file=sys.stderr)
+    if found:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
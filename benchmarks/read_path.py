@@ -0,0 +1,171 @@
+"""
+Measure the per-row CPU cost of serving the item catalog.
+
+A catalog of --items items is read in a single page and turned into a JSON
+response body in two ways: the way GET /items/ used to do it (ORM instances,
+model_validate on each, then FastAPI re-validating and encoding the returned
+model), and the lean path it uses now (plain rows, model_construct and
+serialising the response model straight to bytes). Each stage is timed and
+reported in microseconds per row, then the whole catalog is paged through
+GET /items/ in-process for the end to end cost.
+
+    python -m benchmarks.read_path --items 10000
+
+The database is taken from DATABASE_CONNECTION_STRING, defaulting to a
+temporary SQLite file.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+
+from be_task_ca import database
+from be_task_ca.database import Base, db_session_scope, get_db_engine
+from be_task_ca.item.model import Item
+from be_task_ca.item.repository import ItemRepoSA
+from be_task_ca.item.schema import AllItemsRepsonse, Item as ItemSchema
+from be_task_ca.responses import ModelResponse
+from be_task_ca.user.model import CartItem, User  # noqa
+
+response_adapter = TypeAdapter(AllItemsRepsonse)
+
+
+async def seed(items: int):
+    engine = get_db_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Item.__table__),
+            [
+                {
+                    "name": f"item-{i:06}",
+                    "description": f"Description of item {i}",
+                    "price": i % 1000 + 0.99,
+                    "quantity": i % 50,
+                }
+                for i in range(items)
+            ],
+        )
+
+
+async def legacy_rows(db, limit: int) -> List[ItemSchema]:
+    items = await db.scalars(select(Item).order_by(Item.name, Item.id).limit(limit))
+    return [ItemSchema.model_validate(item) for item in items]
+
+
+def legacy_body(items: List[ItemSchema]) -> bytes:
+    response = AllItemsRepsonse(items=items)
+    # what FastAPI does with a returned model: validate it against the
+    # response model, encode it to plain data and json.dumps that
+    value = response_adapter.validate_python(response)
+    data = jsonable_encoder(response_adapter.dump_python(value, mode="json"))
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def lean_body(items: List[ItemSchema]) -> bytes:
+    return ModelResponse(AllItemsRepsonse.model_construct(items=items)).body
+
+
+async def time_stage(repeat: int, stage: Callable) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = stage()
+        if asyncio.iscoroutine(result):
+            result = await result
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+async def compare(items: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    stages = {}
+    async with db_session_scope() as db:
+        # a fresh session each time so no identity map is reused
+        async def legacy_fetch():
+            async with db_session_scope() as fresh:
+                return await legacy_rows(fresh, items)
+
+        fetched, rows = await time_stage(repeat, legacy_fetch)
+        encoded, body = await time_stage(repeat, lambda: legacy_body(rows))
+        stages["legacy"] = {"fetch": fetched, "serialise": encoded}
+        legacy = json.loads(body)
+
+        repo = ItemRepoSA(db)
+        fetched, rows = await time_stage(repeat, lambda: repo.get_items_page(items))
+        encoded, body = await time_stage(repeat, lambda: lean_body(rows))
+        stages["lean"] = {"fetch": fetched, "serialise": encoded}
+
+        assert json.loads(body) == legacy, "the lean path changed the response"
+    return stages
+
+
+async def page_through(items: int, page_size: int) -> float:
+    from be_task_ca.app import create_app
+
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=create_app()), base_url="http://benchmark"
+    )
+    seen = 0
+    started = time.perf_counter()
+    async with client:
+        cursor = None
+        while True:
+            params = {"limit": page_size, **({"cursor": cursor} if cursor else {})}
+            page = (await client.get("/items/", params=params)).json()
+            seen += len(page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+    elapsed = time.perf_counter() - started
+
+    assert seen == items, f"paged through {seen} of {items} items"
+    return elapsed
+
+
+async def run(items: int, repeat: int, page_size: int):
+    await seed(items)
+    stages = await compare(items, repeat)
+    elapsed = await page_through(items, page_size)
+    await get_db_engine().dispose()
+
+    print(f"items={items} (median of {repeat} runs, microseconds per row)")
+    print(f"{'path':<8}{'fetch':>10}{'serialise':>12}{'total':>10}")
+    for path, timings in stages.items():
+        fetch, serialise = (timings[stage] / items * 1e6 for stage in timings)
+        print(f"{path:<8}{fetch:>10.2f}{serialise:>12.2f}{fetch + serialise:>10.2f}")
+    print(
+        f"GET /items/ limit={page_size}: {elapsed * 1000:.0f}ms for the catalog, "
+        f"{elapsed / items * 1e6:.2f}us per row"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=200)
+    args = parser.parse_args()
+
+    if "DATABASE_CONNECTION_STRING" not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(), "read_path.db")
+        os.environ["DATABASE_CONNECTION_STRING"] = f"sqlite+aiosqlite:///{path}"
+    database.engine = None
+    database.SessionLocal = None
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    asyncio.run(run(args.items, args.repeat, args.page_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Measure search latency on a large catalog.
+
+A catalog of --items items named and described with random words is seeded,
+then a mix of exact, prefix, typo and multi-word queries is run through
+ItemRepoSA.search_items, reporting how long the first search took (on SQLite
+it builds the in-process index) and the p50/p95/p99 latency of the others.
+
+    python -m benchmarks.search --items 1000000
+
+The database is taken from DATABASE_CONNECTION_STRING, defaulting to a
+temporary SQLite file; on Postgres the GIN indexes are used instead.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+
+from sqlalchemy import insert
+
+from be_task_ca import database
+from be_task_ca.database import Base, db_session_scope, get_db_engine
+from be_task_ca.item.model import Item
+from be_task_ca.item.repository import ItemRepoSA
+from be_task_ca.user.model import CartItem, User  # noqa
+
+ADJECTIVES = """
+    antique bright compact cordless dimmable ergonomic foldable glossy heavy
+    industrial modern oak portable rustic sleek smart solid vintage walnut
+    waterproof wireless wooden
+""".split()
+NOUNS = """
+    armchair bench bookcase cabinet chair clock desk drawer dresser lamp
+    lantern mirror ottoman pillow rug shelf sofa stool table wardrobe
+""".split()
+INSERT_BATCH_SIZE = 10_000
+
+
+def random_name(rng: random.Random, i: int) -> str:
+    return f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}"
+
+
+def with_typo(rng: random.Random, word: str) -> str:
+    letters = list(word)
+    i = rng.randrange(len(word) - 1)
+    letters[i], letters[i + 1] = letters[i + 1], letters[i]
+    return "".join(letters)
+
+
+def queries(rng: random.Random, count: int) -> List[str]:
+    kinds = [
+        lambda: rng.choice(NOUNS),
+        lambda: rng.choice(NOUNS)[:3],
+        lambda: with_typo(rng, rng.choice(ADJECTIVES)),
+        lambda: f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)[:4]}",
+    ]
+    return [rng.choice(kinds)() for _ in range(count)]
+
+
+async def seed(items: int, rng: random.Random):
+    engine = get_db_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        for start in range(0, items, INSERT_BATCH_SIZE):
+            await conn.execute(
+                insert(Item.__table__),
+                [
+                    {
+                        "name": random_name(rng, i),
+                        "description": " ".join(rng.sample(ADJECTIVES, 3)),
+                        "price": i % 1000 + 0.99,
+                        "quantity": i % 50,
+                    }
+                    for i in range(start, min(start + INSERT_BATCH_SIZE, items))
+                ],
+            )
+
+
+async def run(items: int, searches: int, limit: int):
+    rng = random.Random(42)
+    await seed(items, rng)
+
+    async with db_session_scope() as db:
+        repo = ItemRepoSA(db)
+        started = time.perf_counter()
+        await repo.search_items("lamp", limit)
+        first = time.perf_counter() - started
+
+        timings = []
+        for query in queries(rng, searches):
+            started = time.perf_counter()
+            await repo.search_items(query, limit)
+            timings.append(time.perf_counter() - started)
+    await get_db_engine().dispose()
+
+    p50, p95, p99 = (
+        statistics.quantiles(timings, n=100)[p - 1] * 1000 for p in (50, 95, 99)
+    )
+    print(f"items={items} searches={searches} limit={limit}")
+    print(f"first search: {first * 1000:.0f}ms")
+    print(f"p50={p50:.2f}ms p95={p95:.2f}ms p99={p99:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--searches", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if "DATABASE_CONNECTION_STRING" not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(), "search.db")
+        os.environ["DATABASE_CONNECTION_STRING"] = f"sqlite+aiosqlite:///{path}"
+    database.engine = None
+    database.SessionLocal = None
+
+    asyncio.run(run(args.items, args.searches, args.limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+import statistics
+from typing import Dict, List
+
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    """
+    The p50, p95 and p99 of the given latencies, in the same unit.
+    """
+    if len(latencies) < 2:
+        value = latencies[0] if latencies else 0.0
+        return {"p50": value, "p95": value, "p99": value}
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
@@ -0,0 +1,122 @@
+"""
+Hammer a single hot item with concurrent add-to-cart requests.
+
+Every client is a separate user trying to reserve units of the same item in
+its own session and transaction, the way concurrent requests would. The run
+fails unless exactly as many reservations succeed as the stock allows and the
+stock never goes negative.
+
+    python -m benchmarks.stock_contention --clients 500 --stock 100
+
+The database is taken from DATABASE_CONNECTION_STRING, defaulting to a
+temporary SQLite file.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from uuid import UUID
+
+from be_task_ca import database
+from be_task_ca.database import Base, db_session_scope, get_db_engine
+from be_task_ca.dependencies import get_item_repo, get_unit_of_work, get_user_repo
+from be_task_ca.exceptions import ItemQuantityError
+from be_task_ca.item.model import Item
+from be_task_ca.user.model import CartItem, User  # noqa
+from be_task_ca.user.schema import ItemQuantity
+from be_task_ca.user.usecases import add_item_to_cart
+
+from .stats import percentiles
+
+
+async def seed(clients: int, stock: int) -> tuple[UUID, list[UUID]]:
+    engine = get_db_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with db_session_scope() as db:
+        item = Item(name="hot-item", price=1.0, quantity=stock)
+        users = [
+            User(
+                email=f"client-{i}@example.com",
+                first_name="Client",
+                last_name=str(i),
+                hashed_password="",
+            )
+            for i in range(clients)
+        ]
+        db.add(item)
+        db.add_all(users)
+        await db.commit()
+        return item.id, [user.id for user in users]
+
+
+async def reserve(user_id: UUID, item_id: UUID, quantity: int) -> tuple[bool, float]:
+    started = time.perf_counter()
+    try:
+        async with db_session_scope() as db:
+            await add_item_to_cart(
+                get_unit_of_work(db),
+                get_user_repo(db),
+                get_item_repo(db),
+                user_id,
+                ItemQuantity(item_id=item_id, quantity=quantity),
+            )
+        reserved = True
+    except ItemQuantityError:
+        reserved = False
+    return reserved, time.perf_counter() - started
+
+
+async def run(clients: int, stock: int, quantity: int) -> bool:
+    item_id, user_ids = await seed(clients, stock)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(reserve(user_id, item_id, quantity) for user_id in user_ids)
+    )
+    elapsed = time.perf_counter() - started
+
+    async with db_session_scope() as db:
+        remaining = (await get_item_repo(db).find_item_by_id(item_id)).quantity
+    await get_db_engine().dispose()
+
+    reserved = sum(1 for ok, _ in results if ok)
+    latency = percentiles([latency * 1000 for _, latency in results])
+    expected = min(clients, stock // quantity)
+
+    print(f"clients={clients} stock={stock} quantity={quantity}")
+    print(f"reserved={reserved} expected={expected} remaining stock={remaining}")
+    print(f"throughput={clients / elapsed:.0f} req/s")
+    print(
+        f"latency p50={latency['p50']:.1f}ms p95={latency['p95']:.1f}ms "
+        f"p99={latency['p99']:.1f}ms"
+    )
+
+    return reserved == expected and remaining == stock - reserved * quantity
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--stock", type=int, default=50)
+    parser.add_argument("--quantity", type=int, default=1)
+    args = parser.parse_args()
+
+    if "DATABASE_CONNECTION_STRING" not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(), "contention.db")
+        os.environ["DATABASE_CONNECTION_STRING"] = f"sqlite+aiosqlite:///{path}"
+    database.engine = None
+    database.SessionLocal = None
+
+    correct = asyncio.run(run(args.clients, args.stock, args.quantity))
+    if not correct:
+        print("FAILED: stock was oversold or lost", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from be_task_ca.app import create_app
+from be_task_ca.database import Base
+from be_task_ca.dependencies import get_db
+from be_task_ca.item.model import Item  # noqa
+from be_task_ca.user.model import CartItem, User  # noqa
+from be_task_ca.unit_of_work import UnitOfWork
+
+
+def create_test_engine(url: str = "sqlite+aiosqlite:///:memory:"):
+    engine = create_async_engine(url)
+
+    # let SQLAlchemy emit BEGIN itself, as the sqlite driver would otherwise
+    # start transactions late and break SAVEPOINTs
+    @event.listens_for(engine.sync_engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return engine
+
+
+@pytest.fixture(scope="function")
+async def engine():
+    engine = create_test_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    try:
+        yield engine
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+
+@pytest.fixture(scope="function")
+async def db(engine):
+    SessionLocal = async_sessionmaker(
+        autoflush=False, expire_on_commit=False, bind=engine
+    )
+    db = SessionLocal()
+
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+@pytest.fixture
+def uow():
+    return MagicMock(spec=UnitOfWork)
+
+
+@pytest.fixture
+async def api_client(engine):
+    """
+    Client of a fresh app whose requests use sessions on the test engine.
+    """
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def get_test_db():
+        async with SessionLocal() as db:
+            yield db
+
+    app = create_app()
+    app.dependency_overrides[get_db] = get_test_db
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from be_task_ca.app import app
+from be_task_ca.dependencies import get_item_repo
+from be_task_ca.item.repository import ItemRepo
+from be_task_ca.item.schema import Item
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def items():
+    return [
+        Item(id=uuid4(), name=f"item-{i}", price=float(i), quantity=i)
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def item_repo(items):
+    async def stream_items(batch_size):
+        for item in items:
+            yield item
+
+    item_repo = MagicMock(spec=ItemRepo)
+    item_repo.stream_items.side_effect = stream_items
+    app.dependency_overrides[get_item_repo] = lambda: item_repo
+    yield item_repo
+    app.dependency_overrides = {}
+
+
+def test_export_items_as_ndjson(item_repo, items):
+    response = client.get("/items/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert [json.loads(line) for line in lines] == [
+        item.model_dump(mode="json") for item in items
+    ]
+
+
+def test_export_items_as_csv(item_repo, items):
+    response = client.get("/items/export", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["name"] for row in rows] == [item.name for item in items]
+    assert [row["id"] for row in rows] == [str(item.id) for item in items]
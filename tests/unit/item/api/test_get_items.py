@@ -0,0 +1,93 @@
+import base64
+from datetime import datetime, timezone
+from unittest import mock
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from be_task_ca.app import app
+from be_task_ca.dependencies import get_item_repo, get_revision_repo
+from be_task_ca.item.repository import ItemRepo
+from be_task_ca.item.schema import AllItemsRepsonse, Item
+from be_task_ca.revisions import CATALOG, RevisionRepo
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def item_repo():
+    item_repo = MagicMock(spec=ItemRepo)
+    app.dependency_overrides[get_item_repo] = lambda: item_repo
+    yield item_repo
+    app.dependency_overrides = {}
+
+
+@pytest.fixture
+def revision_repo(item_repo):
+    revision_repo = MagicMock(spec=RevisionRepo)
+    revision_repo.get_version.return_value = "7"
+    app.dependency_overrides[get_revision_repo] = lambda: revision_repo
+    return revision_repo
+
+
+@pytest.fixture(autouse=True)
+def clock():
+    with mock.patch("be_task_ca.item.usecases.datetime") as datetime_mock:
+        # in the 170406722nd window of 10 seconds
+        datetime_mock.now.return_value = datetime(
+            2024, 1, 1, 0, 0, 25, tzinfo=timezone.utc
+        )
+        yield
+
+
+@mock.patch("be_task_ca.item.api.get_page")
+def test_get_items(usecase_mock, item_repo, revision_repo):
+    items = [Item(id=uuid4(), name="lamp", price=12.5, quantity=3)]
+    usecase_mock.return_value = (items, "next")
+
+    response = client.get("/items/?limit=1")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == AllItemsRepsonse(
+        items=items, next_cursor="next"
+    ).model_dump(mode="json")
+    assert response.headers["etag"] == '"catalog-7.170406722"'
+    assert response.headers["cache-control"] == "public, no-cache"
+
+
+@mock.patch("be_task_ca.item.api.get_page")
+def test_get_items_not_modified(usecase_mock, item_repo, revision_repo):
+    response = client.get(
+        "/items/", headers={"If-None-Match": 'W/"catalog-7.170406722"'}
+    )
+
+    revision_repo.get_version.assert_awaited_once_with(CATALOG)
+    usecase_mock.assert_not_called()
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == '"catalog-7.170406722"'
+
+
+def test_get_items_documents_the_response_model():
+    schema = app.openapi()["paths"]["/items/"]["get"]["responses"]["200"]
+
+    assert schema["content"]["application/json"]["schema"] == {
+        "$ref": "#/components/schemas/AllItemsRepsonse"
+    }
+
+
+@pytest.mark.parametrize(
+    "payload",
+    ['["a", 5]', '[5, "a"]', '{"a": 1}', '"ab"', '["a", "b", "c"]', "null"],
+)
+def test_get_items_with_a_malformed_cursor(payload, item_repo, revision_repo):
+    item_repo.get_items_page.return_value = []
+    cursor = base64.urlsafe_b64encode(payload.encode("UTF-8")).decode("ascii")
+
+    response = client.get("/items/", params={"cursor": cursor})
+
+    assert response.status_code == 400
+    item_repo.get_items_page.assert_not_called()
@@ -0,0 +1,46 @@
+from unittest import mock
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+from be_task_ca.app import app
+from be_task_ca.exceptions import ItemEventsGoneError
+from be_task_ca.item.schema import Item, ItemEvent
+
+client = TestClient(app)
+
+
+@mock.patch("be_task_ca.item.api.follow_item_events")
+def test_get_item_events(usecase_mock):
+    item = Item(id=uuid4(), name="lamp", price=12.5, quantity=3)
+
+    async def events():
+        yield ItemEvent(offset=8, item=item)
+        yield None
+
+    usecase_mock.return_value = events()
+
+    response = client.get("/items/events", headers={"Last-Event-ID": "7"})
+
+    assert usecase_mock.await_args.args[2] == 7
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == (
+        f"id: 8\nevent: item\ndata: {item.model_dump_json()}\n\n: keepalive\n\n"
+    )
+
+
+@mock.patch("be_task_ca.item.api.follow_item_events")
+def test_get_item_events_from_an_offset_no_longer_kept(usecase_mock):
+    usecase_mock.side_effect = ItemEventsGoneError("gone")
+
+    response = client.get("/items/events?after=3")
+
+    assert response.status_code == 410
+    assert response.json() == {"detail": "gone"}
+
+
+def test_get_item_events_with_an_invalid_last_event_id():
+    response = client.get("/items/events", headers={"Last-Event-ID": "abc"})
+
+    assert response.status_code == 400
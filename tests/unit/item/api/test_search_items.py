@@ -0,0 +1,40 @@
+from unittest import mock
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from be_task_ca.app import app
+from be_task_ca.dependencies import get_item_repo
+from be_task_ca.item.repository import ItemRepo
+from be_task_ca.item.schema import Item, SearchResponse
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def item_repo():
+    item_repo = MagicMock(spec=ItemRepo)
+    app.dependency_overrides[get_item_repo] = lambda: item_repo
+    yield item_repo
+    app.dependency_overrides = {}
+
+
+@mock.patch("be_task_ca.item.api.search")
+def test_search_items(usecase_mock, item_repo):
+    items = [Item(id=uuid4(), name="lamp", price=12.5, quantity=3)]
+    usecase_mock.return_value = (items, 20)
+
+    response = client.get("/items/search?q=lam&limit=20")
+
+    usecase_mock.assert_awaited_once_with(item_repo, "lam", 20, 0)
+    assert response.status_code == 200
+    assert response.json() == SearchResponse(items=items, next_offset=20).model_dump(
+        mode="json"
+    )
+
+
+def test_search_items_needs_a_query(item_repo):
+    assert client.get("/items/search").status_code == 422
+    assert client.get("/items/search?q=").status_code == 422
@@ -0,0 +1,123 @@
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+
+from be_task_ca.cache import LRUCache
+from be_task_ca.database import finish_committed, undo_uncommitted
+from be_task_ca.item.repository import ItemRepoCached, ItemRepoSA
+from be_task_ca.item.schema import Item, ItemBase
+
+
+@pytest.fixture
+def items():
+    return [Item(id=uuid4(), name=f"item-{i}", price=1.0, quantity=3) for i in range(3)]
+
+
+@pytest.fixture
+def session():
+    return MagicMock(info={})
+
+
+@pytest.fixture
+def repo(items, session):
+    repo = MagicMock(spec=ItemRepoSA)
+    repo.db = session
+    by_id = {item.id: item for item in items}
+    repo.find_items_by_ids.side_effect = lambda ids: [
+        by_id[id] for id in ids if id in by_id
+    ]
+    return repo
+
+
+@pytest.fixture
+def cache():
+    return LRUCache(max_size=100, ttl=60)
+
+
+@pytest.fixture
+def item_repo(repo, cache):
+    return ItemRepoCached(repo, cache)
+
+
+async def test_find_item_by_id_reads_through(item_repo, repo, items):
+    assert await item_repo.find_item_by_id(items[0].id) == items[0]
+    assert await item_repo.find_item_by_id(items[0].id) == items[0]
+
+    repo.find_items_by_ids.assert_awaited_once_with([items[0].id])
+
+
+async def test_find_items_by_ids_only_loads_missing_items(item_repo, repo, items):
+    await item_repo.find_item_by_id(items[0].id)
+    unknown = uuid4()
+
+    found = await item_repo.find_items_by_ids([items[0].id, unknown, items[1].id])
+
+    assert found == [items[0], items[1]]
+    repo.find_items_by_ids.assert_awaited_with([unknown, items[1].id])
+
+
+@pytest.mark.parametrize(
+    "write",
+    [
+        lambda item_repo, item: item_repo.reserve_stock(item.id, 1),
+        lambda item_repo, item: item_repo.reserve_stock_batch({item.id: 1}),
+        lambda item_repo, item: item_repo.release_stock({item.id: 1}),
+        lambda item_repo, item: item_repo.update_items(
+            [ItemBase(name=item.name, price=2.0, quantity=1)]
+        ),
+    ],
+)
+async def test_writes_invalidate_cached_items_once_committed(
+    item_repo, repo, session, items, write
+):
+    repo.reserve_stock.return_value = True
+    repo.reserve_stock_batch.return_value = {items[0].id}
+    await item_repo.find_item_by_id(items[0].id)
+
+    await write(item_repo, items[0])
+    # a concurrent request reading before the commit still sees the state
+    # committed before, and may cache it
+    await item_repo.find_item_by_id(items[0].id)
+    assert repo.find_items_by_ids.await_count == 1
+
+    await finish_committed(session)
+    await item_repo.find_item_by_id(items[0].id)
+
+    assert repo.find_items_by_ids.await_count == 2
+
+
+async def test_rolled_back_writes_invalidate_cached_items(
+    item_repo, repo, session, items
+):
+    repo.reserve_stock.return_value = True
+    await item_repo.reserve_stock(items[0].id, 1)
+    # read within the transaction, after the write
+    await item_repo.find_item_by_id(items[0].id)
+
+    await undo_uncommitted(session)
+    await item_repo.find_item_by_id(items[0].id)
+
+    assert repo.find_items_by_ids.await_count == 2
+
+
+async def test_failed_reservation_keeps_the_cache(item_repo, repo, items):
+    repo.reserve_stock.return_value = False
+    await item_repo.find_item_by_id(items[0].id)
+
+    await item_repo.reserve_stock(items[0].id, 10)
+    await item_repo.find_item_by_id(items[0].id)
+
+    repo.find_items_by_ids.assert_awaited_once()
+
+
+async def test_save_item_invalidates_the_new_item(
+    item_repo, repo, session, cache, items
+):
+    repo.save_item.return_value = items[0]
+    await cache.set_many({f"item:{items[0].id}": items[1]})
+
+    await item_repo.save_item(ItemBase(name="item-0", price=1.0, quantity=3))
+    await finish_committed(session)
+
+    assert await item_repo.find_item_by_id(items[0].id) == items[0]
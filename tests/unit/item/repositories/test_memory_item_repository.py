@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+
+import pytest
+
+from be_task_ca.exceptions import ItemAlreadyExistsError
+from be_task_ca.item.repository import ItemRepoMemory
+from be_task_ca.item.schema import ItemBase, ItemFilter
+from be_task_ca.memory import MemoryStore
+
+
+@pytest.fixture(scope="function")
+def item_repo():
+    return ItemRepoMemory(MemoryStore())
+
+
+@pytest.fixture(scope="function")
+async def catalog(item_repo):
+    await item_repo.save_items(
+        [
+            ItemBase(name=f"item-{i:02}", price=float(i), quantity=i % 3)
+            for i in range(10)
+        ]
+    )
+
+
+async def test_save_item(item_repo):
+    saved = await item_repo.save_item(ItemBase(name="lamp", price=12.5, quantity=3))
+
+    assert await item_repo.find_item_by_id(saved.id) == saved
+    assert await item_repo.find_item_by_name("lamp") == saved
+    with pytest.raises(ItemAlreadyExistsError):
+        await item_repo.save_item(ItemBase(name="lamp", price=1.0, quantity=1))
+
+
+async def test_save_items_skips_taken_names(item_repo):
+    await item_repo.save_item(ItemBase(name="lamp", price=12.5, quantity=3))
+
+    inserted = await item_repo.save_items(
+        [
+            ItemBase(name="lamp", price=1.0, quantity=1),
+            ItemBase(name="desk", price=99.0, quantity=1),
+        ]
+    )
+
+    assert inserted == {"desk"}
+    assert (await item_repo.find_item_by_name("lamp")).price == 12.5
+
+
+async def test_update_items(item_repo):
+    saved = await item_repo.save_item(ItemBase(name="lamp", price=12.5, quantity=3))
+
+    await item_repo.update_items([ItemBase(name="lamp", price=10.0, quantity=7)])
+
+    updated = await item_repo.find_item_by_id(saved.id)
+    assert (updated.price, updated.quantity) == (10.0, 7)
+
+
+async def test_get_items_page_walks_the_catalog_by_name(item_repo, catalog):
+    first = await item_repo.get_items_page(4)
+    rest = await item_repo.get_items_page(10, (first[-1].name, first[-1].id))
+
+    assert [item.name for item in first + rest] == [f"item-{i:02}" for i in range(10)]
+
+
+async def test_get_items_page_filters(item_repo, catalog):
+    items = await item_repo.get_items_page(
+        10, filters=ItemFilter(min_price=2, max_price=7, in_stock=True)
+    )
+
+    assert [item.name for item in items] == ["item-02", "item-04", "item-05", "item-07"]
+
+
+async def test_stream_items(item_repo, catalog):
+    names = [item.name async for item in item_repo.stream_items(batch_size=3)]
+
+    assert names == [f"item-{i:02}" for i in range(10)]
+
+
+async def test_search_items(item_repo):
+    await item_repo.save_items(
+        [
+            ItemBase(name="desk lamp", description="bright", price=12.5, quantity=3),
+            ItemBase(name="floor lamp", price=40.0, quantity=1),
+            ItemBase(name="desk", description="oak", price=99.0, quantity=1),
+        ]
+    )
+    await item_repo.update_items(
+        [ItemBase(name="desk", description="walnut", price=99.0, quantity=1)]
+    )
+
+    assert [i.name for i in await item_repo.search_items("lamp", 10)] == [
+        "desk lamp",
+        "floor lamp",
+    ]
+    assert [i.name for i in await item_repo.search_items("lamp", 1, 1)] == [
+        "floor lamp"
+    ]
+    assert [i.name for i in await item_repo.search_items("walnt", 10)] == ["desk"]
+    assert await item_repo.search_items("oak", 10) == []
+
+
+async def test_reserve_and_release_stock(item_repo):
+    saved = await item_repo.save_item(ItemBase(name="lamp", price=12.5, quantity=3))
+
+    assert await item_repo.reserve_stock(saved.id, 2) is True
+    assert await item_repo.reserve_stock(saved.id, 2) is False
+    await item_repo.release_stock({saved.id: 2})
+
+    assert (await item_repo.find_item_by_id(saved.id)).quantity == 3
+
+
+@pytest.mark.parametrize("quantity", [0, -1000])
+async def test_stock_changes_refuse_quantities_that_are_not_positive(
+    item_repo, quantity
+):
+    saved = await item_repo.save_item(ItemBase(name="lamp", price=12.5, quantity=1))
+
+    with pytest.raises(ValueError):
+        await item_repo.reserve_stock(saved.id, quantity)
+    with pytest.raises(ValueError):
+        await item_repo.release_stock({saved.id: quantity})
+
+    assert (await item_repo.find_item_by_id(saved.id)).quantity == 1
+
+
+def test_reserve_stock_from_many_threads_never_oversells(item_repo):
+    saved = asyncio.run(
+        item_repo.save_item(ItemBase(name="lamp", price=12.5, quantity=100))
+    )
+
+    def reserve(_):
+        return asyncio.run(item_repo.reserve_stock(saved.id, 1))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        reserved = sum(executor.map(reserve, range(250)))
+
+    assert reserved == 100
+    assert asyncio.run(item_repo.find_item_by_id(saved.id)).quantity == 0
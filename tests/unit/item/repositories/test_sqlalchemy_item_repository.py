@@ -0,0 +1,276 @@
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from be_task_ca.database import Base
+from be_task_ca.item.model import Item
+from be_task_ca.item.repository import ItemRepoSA
+from be_task_ca.item.schema import ItemBase, ItemFilter
+from be_task_ca.unit_of_work import UnitOfWorkSA
+
+
+async def count_items(db):
+    return await db.scalar(select(func.count()).select_from(Item))
+
+
+@pytest.fixture(scope="function")
+def item_repo(db):
+    return ItemRepoSA(db)
+
+
+async def test_save_item(item_repo, db):
+    item = ItemBase(name="lamp", description="a lamp", price=12.5, quantity=3)
+
+    assert await count_items(db) == 0
+
+    item_schema = await item_repo.save_item(item)
+
+    assert item_schema.name == "lamp"
+    assert item_schema.price == 12.5
+    assert await count_items(db) == 1
+
+
+async def test_get_all_items(item_repo, db):
+    db.add_all(
+        [
+            Item(name="lamp", price=12.5, quantity=3),
+            Item(name="desk", price=99.0, quantity=1),
+        ]
+    )
+    await db.commit()
+
+    items = await item_repo.get_all_items()
+
+    assert sorted(item.name for item in items) == ["desk", "lamp"]
+
+
+async def test_find_item_by_name(item_repo, db):
+    db.add(Item(name="lamp", price=12.5, quantity=3))
+    await db.commit()
+
+    assert (await item_repo.find_item_by_name("lamp")).name == "lamp"
+    assert await item_repo.find_item_by_name("desk") is None
+
+
+async def test_find_item_by_id(item_repo, db):
+    item = Item(name="lamp", price=12.5, quantity=3)
+    db.add(item)
+    await db.commit()
+
+    item_schema = await item_repo.find_item_by_id(item.id)
+
+    assert item_schema is not None
+    assert item_schema.id == item.id
+
+
+@pytest.fixture
+async def catalog(db):
+    items = [
+        Item(name=f"item-{i:02}", price=float(i), quantity=i % 3) for i in range(10)
+    ]
+    db.add_all(items)
+    await db.commit()
+    return items
+
+
+async def test_get_items_page_walks_the_catalog_by_name(item_repo, catalog):
+    first_page = await item_repo.get_items_page(4)
+    last = first_page[-1]
+    second_page = await item_repo.get_items_page(4, after=(last.name, last.id))
+
+    assert [i.name for i in first_page] == [f"item-{i:02}" for i in range(4)]
+    assert [i.name for i in second_page] == [f"item-{i:02}" for i in range(4, 8)]
+
+
+async def test_get_items_page_filters(item_repo, catalog):
+    in_range = await item_repo.get_items_page(
+        10, filters=ItemFilter(min_price=2, max_price=5)
+    )
+    in_stock = await item_repo.get_items_page(10, filters=ItemFilter(in_stock=True))
+
+    assert [i.price for i in in_range] == [2.0, 3.0, 4.0, 5.0]
+    assert all(i.quantity > 0 for i in in_stock)
+    assert len(in_stock) == 6
+
+
+async def test_stream_items(item_repo, catalog):
+    names = [item.name async for item in item_repo.stream_items(batch_size=3)]
+
+    assert names == [f"item-{i:02}" for i in range(10)]
+
+
+async def test_reserve_stock(item_repo, db):
+    item = Item(name="lamp", price=12.5, quantity=3)
+    db.add(item)
+    await db.commit()
+
+    assert await item_repo.reserve_stock(item.id, 2) is True
+    assert await item_repo.reserve_stock(item.id, 2) is False
+    assert await item_repo.reserve_stock(uuid4(), 1) is False
+    assert (await item_repo.find_item_by_id(item.id)).quantity == 1
+
+
+async def test_release_stock(item_repo, db):
+    lamp = Item(name="lamp", price=12.5, quantity=3)
+    desk = Item(name="desk", price=99.0, quantity=0)
+    db.add_all([lamp, desk])
+    await db.commit()
+
+    await item_repo.release_stock({lamp.id: 2, desk.id: 1})
+
+    assert (await item_repo.find_item_by_id(lamp.id)).quantity == 5
+    assert (await item_repo.find_item_by_id(desk.id)).quantity == 1
+
+
+@pytest.mark.parametrize("quantity", [0, -1000])
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda item_repo, id, quantity: item_repo.reserve_stock(id, quantity),
+        lambda item_repo, id, quantity: item_repo.reserve_stock_batch({id: quantity}),
+        lambda item_repo, id, quantity: item_repo.release_stock({id: quantity}),
+    ],
+)
+async def test_stock_changes_refuse_quantities_that_are_not_positive(
+    item_repo, db, change, quantity
+):
+    item = Item(name="lamp", price=12.5, quantity=1)
+    db.add(item)
+    await db.commit()
+
+    with pytest.raises(ValueError):
+        await change(item_repo, item.id, quantity)
+
+    assert (await item_repo.find_item_by_id(item.id)).quantity == 1
+
+
+async def test_save_items_skips_taken_names(item_repo, db):
+    db.add(Item(name="lamp", price=12.5, quantity=3))
+    await db.commit()
+
+    inserted = await item_repo.save_items(
+        [
+            ItemBase(name="lamp", price=1.0, quantity=1),
+            ItemBase(name="desk", price=99.0, quantity=1),
+        ]
+    )
+
+    assert inserted == {"desk"}
+    assert (await item_repo.find_item_by_name("lamp")).price == 12.5
+    assert await count_items(db) == 2
+
+
+async def test_update_items(item_repo, db):
+    db.add(Item(name="lamp", price=12.5, quantity=3))
+    await db.commit()
+
+    await item_repo.update_items(
+        [ItemBase(name="lamp", description="brighter", price=15.0, quantity=7)]
+    )
+
+    lamp = await item_repo.find_item_by_name("lamp")
+    assert (lamp.description, lamp.price, lamp.quantity) == ("brighter", 15.0, 7)
+
+
+async def test_find_existing_names(item_repo, catalog):
+    existing = await item_repo.find_existing_names(["item-01", "item-42", "item-09"])
+
+    assert existing == {"item-01", "item-09"}
+
+
+async def test_find_items_by_ids(item_repo, catalog):
+    items = await item_repo.find_items_by_ids([catalog[1].id, catalog[3].id, uuid4()])
+
+    assert sorted(item.name for item in items) == ["item-01", "item-03"]
+
+
+async def test_reserve_stock_batch(item_repo, db):
+    lamp = Item(name="lamp", price=12.5, quantity=3)
+    desk = Item(name="desk", price=99.0, quantity=1)
+    db.add_all([lamp, desk])
+    await db.commit()
+
+    reserved = await item_repo.reserve_stock_batch({lamp.id: 2, desk.id: 2, uuid4(): 1})
+
+    assert reserved == {lamp.id}
+    assert (await item_repo.find_item_by_id(lamp.id)).quantity == 1
+    assert (await item_repo.find_item_by_id(desk.id)).quantity == 1
+
+
+async def test_search_items(item_repo, db):
+    db.add_all(
+        [
+            Item(name="desk lamp", description="bright", price=12.5, quantity=3),
+            Item(name="floor lamp", price=40.0, quantity=1),
+            Item(name="desk", description="oak", price=99.0, quantity=1),
+        ]
+    )
+    await db.commit()
+
+    assert [i.name for i in await item_repo.search_items("lamp", 10)] == [
+        "desk lamp",
+        "floor lamp",
+    ]
+    assert [i.name for i in await item_repo.search_items("dsek", 10)] == [
+        "desk",
+        "desk lamp",
+    ]
+    assert [i.name for i in await item_repo.search_items("lamp", 1, 1)] == [
+        "floor lamp"
+    ]
+    assert await item_repo.search_items("chair", 10) == []
+
+
+async def test_search_index_follows_committed_writes(item_repo, db):
+    uow = UnitOfWorkSA(db)
+    await item_repo.save_item(ItemBase(name="lamp", price=12.5, quantity=3))
+    await uow.commit()
+    assert [i.name for i in await item_repo.search_items("lamp", 10)] == ["lamp"]
+
+    await item_repo.save_items([ItemBase(name="lampshade", price=5.0, quantity=1)])
+    await item_repo.update_items(
+        [ItemBase(name="lamp", description="walnut", price=12.5, quantity=3)]
+    )
+    await uow.rollback()
+    assert [i.name for i in await item_repo.search_items("lamp", 10)] == ["lamp"]
+    assert await item_repo.search_items("walnut", 10) == []
+
+    await item_repo.save_items([ItemBase(name="lampshade", price=5.0, quantity=1)])
+    await item_repo.update_items(
+        [ItemBase(name="lamp", description="walnut", price=12.5, quantity=3)]
+    )
+    await uow.commit()
+    assert [i.name for i in await item_repo.search_items("lamp", 10)] == [
+        "lamp",
+        "lampshade",
+    ]
+    assert [i.name for i in await item_repo.search_items("walnut", 10)] == ["lamp"]
+
+
+async def test_search_on_a_replica_follows_writes_to_the_primary(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'catalog.db'}"
+    # a replica that has caught up, as an engine of its own on the same file
+    primary, replica = create_async_engine(url), create_async_engine(url)
+    async with primary.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def write(item):
+        async with async_sessionmaker(primary)() as db:
+            await ItemRepoSA(db).save_items([item])
+            await UnitOfWorkSA(db).commit()
+
+    async def search(query):
+        async with async_sessionmaker(replica)() as db:
+            return [i.name for i in await ItemRepoSA(db).search_items(query, 10)]
+
+    try:
+        await write(ItemBase(name="lamp", price=12.5, quantity=3))
+        assert await search("lamp") == ["lamp"]
+
+        await write(ItemBase(name="lampshade", price=5.0, quantity=1))
+        assert await search("lamp") == ["lamp", "lampshade"]
+    finally:
+        await primary.dispose()
+        await replica.dispose()
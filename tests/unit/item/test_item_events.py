@@ -0,0 +1,166 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from be_task_ca.exceptions import ItemEventsGoneError
+from be_task_ca.item.events import (
+    ItemEventBroker,
+    ItemEventRepoMemory,
+    ItemEventRepoSA,
+)
+from be_task_ca.item.repository import ItemRepoMemory, ItemRepoSA
+from be_task_ca.item.schema import ItemBase
+from be_task_ca.item.usecases import (
+    follow_item_events,
+    number_item_events,
+    relay_item_events,
+)
+from be_task_ca.memory import MemoryStore
+from be_task_ca.unit_of_work import UnitOfWorkSA
+
+
+def lamp(quantity=3, description=None):
+    return ItemBase(name="lamp", description=description, price=12.5, quantity=quantity)
+
+
+async def test_item_changes_reach_the_outbox_when_committed(db):
+    item_repo, event_repo, uow = ItemRepoSA(db), ItemEventRepoSA(db), UnitOfWorkSA(db)
+    saved = await item_repo.save_item(lamp())
+    await uow.commit()
+    await item_repo.reserve_stock(saved.id, 2)
+    await uow.rollback()
+    await item_repo.reserve_stock_batch({saved.id: 1})
+    await item_repo.update_items([lamp(quantity=2, description="bright")])
+    await uow.commit()
+    # only read once numbered
+    assert await event_repo.get_events(0, 10) == []
+    assert await event_repo.number_events(10) == 2
+    await uow.commit()
+
+    events = await event_repo.get_events(0, 10)
+
+    assert [event.item.quantity for event in events] == [3, 2]
+    assert events[1].item.description == "bright"
+    assert events[1].offset > events[0].offset
+    assert await event_repo.get_offsets() == (events[0].offset, events[1].offset)
+    assert await event_repo.get_events(events[0].offset, 10) == events[1:]
+
+
+async def test_pruning_keeps_the_latest_event(db):
+    item_repo, event_repo, uow = ItemRepoSA(db), ItemEventRepoSA(db), UnitOfWorkSA(db)
+    saved = await item_repo.save_item(lamp())
+    await uow.commit()
+    await item_repo.release_stock({saved.id: 1})
+    await uow.commit()
+    await event_repo.number_events(10)
+    await item_repo.release_stock({saved.id: 1})
+    await uow.commit()
+    _, last = await event_repo.get_offsets()
+
+    # the event yet to be numbered is kept too
+    assert await event_repo.prune(datetime.now(timezone.utc) + timedelta(1)) == 1
+    assert await event_repo.get_offsets() == (last, last)
+    assert await event_repo.number_events(10) == 1
+    assert await event_repo.get_offsets() == (last, last + 1)
+
+
+async def test_events_are_numbered_in_batches(db):
+    item_repo, event_repo, uow = ItemRepoSA(db), ItemEventRepoSA(db), UnitOfWorkSA(db)
+    saved = await item_repo.save_item(lamp(quantity=10))
+    await uow.commit()
+    for _ in range(4):
+        await item_repo.reserve_stock(saved.id, 1)
+        await uow.commit()
+
+    assert await number_item_events(uow, event_repo, 2) == 5
+
+    events = await event_repo.get_events(0, 10)
+    assert [(e.offset, e.item.quantity) for e in events] == [
+        (1, 10),
+        (2, 9),
+        (3, 8),
+        (4, 7),
+        (5, 6),
+    ]
+
+
+async def test_memory_item_changes_are_events():
+    store = MemoryStore()
+    item_repo, event_repo = ItemRepoMemory(store), ItemEventRepoMemory(store)
+    saved = await item_repo.save_item(lamp())
+    await item_repo.reserve_stock(saved.id, 1)
+    await item_repo.release_stock({saved.id: 1})
+
+    events = await event_repo.get_events(1, 10)
+
+    assert [(e.offset, e.item.quantity) for e in events] == [(2, 2), (3, 3)]
+    assert await event_repo.get_offsets() == (1, 3)
+    assert await event_repo.prune(datetime.now(timezone.utc) + timedelta(1)) == 2
+    assert await event_repo.get_offsets() == (3, 3)
+
+
+@pytest.fixture
+def store():
+    return MemoryStore()
+
+
+@pytest.fixture
+def repo_scope(store):
+    @asynccontextmanager
+    async def scope():
+        yield ItemEventRepoMemory(store)
+
+    return scope
+
+
+async def test_follow_catches_up_then_gets_published_events(store, repo_scope):
+    broker = ItemEventBroker(max_pending=2)
+    item_repo = ItemRepoMemory(store)
+    saved = await item_repo.save_item(lamp())
+    await item_repo.reserve_stock(saved.id, 1)
+
+    events = await follow_item_events(repo_scope, broker, 0, 1, keepalive=0.01)
+    assert [(await anext(events)).offset for _ in range(2)] == [1, 2]
+    assert await anext(events) is None
+
+    await item_repo.reserve_stock(saved.id, 1)
+    await relay_item_events(ItemEventRepoMemory(store), broker, 2, 10)
+    assert (await anext(events)).offset == 3
+
+    # too many to queue: the follower reads them from the outbox instead
+    for _ in range(3):
+        await item_repo.release_stock({saved.id: 1})
+    await relay_item_events(ItemEventRepoMemory(store), broker, 3, 10)
+    assert [(await anext(events)).offset for _ in range(3)] == [4, 5, 6]
+
+    await events.aclose()
+    assert broker.subscriptions == set()
+
+
+async def test_follow_from_now_on(store, repo_scope):
+    broker = ItemEventBroker()
+    item_repo = ItemRepoMemory(store)
+    saved = await item_repo.save_item(lamp())
+
+    events = await follow_item_events(repo_scope, broker, None, 10, keepalive=1)
+    next_event = asyncio.ensure_future(anext(events))
+    await item_repo.reserve_stock(saved.id, 1)
+    await relay_item_events(ItemEventRepoMemory(store), broker, 1, 10)
+
+    assert (await next_event).offset == 2
+    await events.aclose()
+
+
+async def test_follow_from_an_offset_no_longer_kept(store, repo_scope):
+    broker = ItemEventBroker()
+    item_repo = ItemRepoMemory(store)
+    saved = await item_repo.save_item(lamp())
+    await item_repo.reserve_stock(saved.id, 1)
+    await ItemEventRepoMemory(store).prune(datetime.now(timezone.utc) + timedelta(1))
+
+    for after in (0, 3):
+        with pytest.raises(ItemEventsGoneError):
+            await follow_item_events(repo_scope, broker, after, 10, keepalive=1)
+    assert broker.subscriptions == set()
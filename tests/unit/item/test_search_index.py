@@ -0,0 +1,79 @@
+from uuid import uuid4
+
+from be_task_ca.item.search import MAX_EXPANSIONS, SearchIndex, tokenize
+
+
+def index_of(*items):
+    index = SearchIndex()
+    ids = {}
+    for name, description in items:
+        ids[name] = uuid4()
+        index.add(ids[name], name, description)
+    return index, ids
+
+
+def test_tokenize():
+    assert tokenize("Desk-Lamp, 40W LED!") == ["desk", "lamp", "40w", "led"]
+    assert tokenize(None) == []
+
+
+def test_every_word_must_match():
+    index, ids = index_of(
+        ("desk lamp", "a bright lamp"), ("floor lamp", None), ("desk", None)
+    )
+
+    assert index.search("lamp desk", 10) == [ids["desk lamp"]]
+    assert index.search("lamp chair", 10) == []
+    assert index.search("", 10) == []
+
+
+def test_matches_prefixes_and_typos():
+    index, ids = index_of(("standing desk", None), ("lamp", None))
+
+    assert index.search("stand", 10) == [ids["standing desk"]]
+    assert index.search("dsek", 10) == [ids["standing desk"]]
+    assert index.search("standign", 10) == [ids["standing desk"]]
+    # too short to be corrected
+    assert index.search("lmp", 10) == []
+
+
+def test_ranks_exact_matches_first_and_names_over_descriptions():
+    index, ids = index_of(
+        ("chair", "goes with the lamp"),
+        ("lampshade", None),
+        ("lamp", None),
+        ("lamb", None),
+    )
+
+    assert index.search("lamp", 10) == [
+        ids["lamp"],
+        ids["lampshade"],
+        # an exact match in the description weighs as much as a typo in the name
+        ids["chair"],
+        ids["lamb"],
+    ]
+    assert index.search("lamb", 10) == [ids["lamb"], ids["lamp"], ids["chair"]]
+
+
+def test_pages_through_results_ordered_by_name_on_ties():
+    index, ids = index_of(*((f"lamp {i}", None) for i in range(5)))
+
+    assert index.search("lamp", 2) == [ids["lamp 0"], ids["lamp 1"]]
+    assert index.search("lamp", 2, offset=4) == [ids["lamp 4"]]
+
+
+def test_limits_prefix_expansions():
+    index, _ = index_of(*((f"lamp{i:03}", None) for i in range(MAX_EXPANSIONS * 2)))
+
+    assert len(index.search("lamp", 1000)) == MAX_EXPANSIONS
+
+
+def test_reindexing_replaces_the_previous_words():
+    index, ids = index_of(("lamp", "bright"))
+
+    index.update_description("lamp", "dim")
+    index.add_many([(uuid4(), f"desk {i}", None) for i in range(200)])
+
+    assert index.search("bright", 10) == []
+    assert index.search("dim", 10) == [ids["lamp"]]
+    assert len(index) == 201
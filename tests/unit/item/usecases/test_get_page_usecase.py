@@ -0,0 +1,68 @@
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+
+from be_task_ca.exceptions import InvalidCursorError
+from be_task_ca.item.repository import ItemRepo
+from be_task_ca.item.schema import Item
+from be_task_ca.item.usecases import (
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    get_page,
+)
+
+
+@pytest.fixture
+def item_repo():
+    return MagicMock(spec=ItemRepo)
+
+
+@pytest.fixture
+def items():
+    return [
+        Item(id=uuid4(), name=f"item-{i}", price=1.0, quantity=1) for i in range(3)
+    ]
+
+
+async def test_get_page_returns_cursor_when_more_items_exist(item_repo, items):
+    item_repo.get_items_page.return_value = items
+
+    page, next_cursor = await get_page(item_repo, limit=2)
+
+    item_repo.get_items_page.assert_awaited_once_with(3, None, None)
+    assert page == items[:2]
+    assert decode_cursor(next_cursor) == (items[1].name, items[1].id)
+
+
+async def test_get_page_on_last_page(item_repo, items):
+    item_repo.get_items_page.return_value = items
+
+    page, next_cursor = await get_page(item_repo, limit=5)
+
+    assert page == items
+    assert next_cursor is None
+
+
+async def test_get_page_resumes_after_cursor(item_repo, items):
+    item_repo.get_items_page.return_value = []
+
+    await get_page(item_repo, limit=2, cursor=encode_cursor(items[0]))
+
+    item_repo.get_items_page.assert_awaited_once_with(
+        3, (items[0].name, items[0].id), None
+    )
+
+
+async def test_get_page_caps_the_page_size(item_repo):
+    item_repo.get_items_page.return_value = []
+
+    await get_page(item_repo, limit=MAX_PAGE_SIZE * 10)
+
+    item_repo.get_items_page.assert_awaited_once_with(MAX_PAGE_SIZE + 1, None, None)
+
+
+async def test_get_page_with_invalid_cursor(item_repo):
+    with pytest.raises(InvalidCursorError):
+        await get_page(item_repo, cursor="not-a-cursor")
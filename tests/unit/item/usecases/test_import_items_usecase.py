@@ -0,0 +1,109 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from be_task_ca.exceptions import InvalidItemImportError
+from be_task_ca.item.imports import parse_json_array, parse_ndjson
+from be_task_ca.item.repository import ItemRepo
+from be_task_ca.item.schema import ImportConflictReason, ItemBase
+from be_task_ca.item.usecases import import_items
+
+
+@pytest.fixture
+def item_repo():
+    item_repo = MagicMock(spec=ItemRepo)
+    item_repo.find_existing_names.return_value = set()
+    item_repo.save_items.side_effect = lambda items: {item.name for item in items}
+    return item_repo
+
+
+async def rows_of(*payloads):
+    for row, payload in enumerate(payloads, start=1):
+        yield row, payload
+
+
+def item(name, **fields):
+    return {"name": name, "price": 1.0, "quantity": 1, **fields}
+
+
+async def test_import_items_in_batches(uow, item_repo):
+    report = await import_items(
+        uow, item_repo, rows_of(*(item(f"item-{i}") for i in range(5))), batch_size=2
+    )
+
+    assert report.created == 5
+    assert report.conflicts == []
+    assert [len(c.args[0]) for c in item_repo.save_items.await_args_list] == [2, 2, 1]
+    assert item_repo.find_existing_names.await_count == 3
+
+
+async def test_import_items_reports_conflicts(uow, item_repo):
+    item_repo.find_existing_names.return_value = {"taken"}
+
+    report = await import_items(
+        uow,
+        item_repo,
+        rows_of(item("new"), item("taken"), item("new"), {"name": "no-price"}),
+    )
+
+    assert report.created == 1
+    assert [(c.row, c.name, c.reason) for c in report.conflicts] == [
+        (2, "taken", ImportConflictReason.ALREADY_EXISTS),
+        (3, "new", ImportConflictReason.DUPLICATE_IN_UPLOAD),
+        (4, "no-price", ImportConflictReason.INVALID),
+    ]
+    item_repo.update_items.assert_not_awaited()
+
+
+async def test_import_items_reports_invalid_names(uow, item_repo):
+    report = await import_items(
+        uow, item_repo, rows_of(item(5), item(["a"]), item(None), ["not", "an item"])
+    )
+
+    assert report.created == 0
+    assert [(c.row, c.name, c.reason) for c in report.conflicts] == [
+        (row, None, ImportConflictReason.INVALID) for row in range(1, 5)
+    ]
+
+
+async def test_import_items_upserts_existing_items(uow, item_repo):
+    item_repo.find_existing_names.return_value = {"taken"}
+
+    report = await import_items(
+        uow, item_repo, rows_of(item("new"), item("taken", price=2.0)), upsert=True
+    )
+
+    assert (report.created, report.updated, report.conflicts) == (1, 1, [])
+    item_repo.update_items.assert_awaited_once_with(
+        [ItemBase(name="taken", price=2.0, quantity=1)]
+    )
+
+
+async def test_import_items_when_a_name_is_taken_concurrently(uow, item_repo):
+    item_repo.save_items.side_effect = lambda items: set()
+
+    report = await import_items(uow, item_repo, rows_of(item("raced")))
+
+    assert report.created == 0
+    assert report.conflicts[0].reason == ImportConflictReason.ALREADY_EXISTS
+
+
+async def test_parse_ndjson_across_chunks():
+    async def chunks():
+        yield b'{"name": "a"}\n{"na'
+        yield b'me": "b"}\n\nnot json\n'
+        yield b'{"name": "c"}'
+
+    rows = [row async for row in parse_ndjson(chunks())]
+
+    assert rows == [
+        (1, {"name": "a"}),
+        (2, {"name": "b"}),
+        (3, None),
+        (4, {"name": "c"}),
+    ]
+
+
+async def test_parse_json_array_rejects_objects():
+    with pytest.raises(InvalidItemImportError):
+        [row async for row in parse_json_array(b'{"name": "a"}')]
@@ -0,0 +1,47 @@
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+
+from be_task_ca.item.repository import ItemRepo
+from be_task_ca.item.schema import Item
+from be_task_ca.item.usecases import MAX_PAGE_SIZE, MAX_SEARCH_OFFSET, search
+
+
+@pytest.fixture
+def item_repo():
+    return MagicMock(spec=ItemRepo)
+
+
+@pytest.fixture
+def items():
+    return [Item(id=uuid4(), name=f"lamp-{i}", price=1.0, quantity=1) for i in range(3)]
+
+
+async def test_search_returns_next_offset_when_more_items_match(item_repo, items):
+    item_repo.search_items.return_value = items
+
+    page, next_offset = await search(item_repo, "lamp", limit=2, offset=4)
+
+    item_repo.search_items.assert_awaited_once_with("lamp", 3, 4)
+    assert page == items[:2]
+    assert next_offset == 6
+
+
+async def test_search_on_last_page(item_repo, items):
+    item_repo.search_items.return_value = items
+
+    page, next_offset = await search(item_repo, "lamp", limit=3)
+
+    assert page == items
+    assert next_offset is None
+
+
+async def test_search_clamps_limit_and_offset(item_repo):
+    item_repo.search_items.return_value = []
+
+    await search(item_repo, "lamp", limit=10_000, offset=10**9)
+
+    item_repo.search_items.assert_awaited_once_with(
+        "lamp", MAX_PAGE_SIZE + 1, MAX_SEARCH_OFFSET
+    )
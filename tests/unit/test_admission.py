@@ -0,0 +1,166 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from be_task_ca.admission import AdmissionLimiter, AdmissionMiddleware
+from be_task_ca.app import create_app
+from be_task_ca.database import Base
+from be_task_ca.dependencies import get_db
+
+DB_DELAY = 0.5
+
+
+@pytest.fixture
+async def pooled_engine(tmp_path):
+    # admitted requests run at once, each on a connection of its own
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'slow.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    try:
+        yield engine
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture
+async def slow_api_client(pooled_engine, monkeypatch):
+    """
+    Client of an app admitting two reads at once, whose database takes half
+    a second to hand out each session.
+    """
+    monkeypatch.setenv("ADMISSION_READ_MAX_IN_FLIGHT", "2")
+    monkeypatch.setenv("ADMISSION_READ_MAX_QUEUED", "2")
+    monkeypatch.setenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "0.1")
+    monkeypatch.setenv("ADMISSION_RETRY_AFTER_SECONDS", "3")
+    SessionLocal = async_sessionmaker(bind=pooled_engine, expire_on_commit=False)
+
+    async def get_slow_db():
+        await asyncio.sleep(DB_DELAY)
+        async with SessionLocal() as db:
+            yield db
+
+    app = create_app()
+    app.dependency_overrides[get_db] = get_slow_db
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
+async def timed_get(client, url):
+    started = time.perf_counter()
+    response = await client.get(url)
+    return response, time.perf_counter() - started
+
+
+async def test_excess_requests_are_shed_fast_when_the_database_is_slow(
+    slow_api_client,
+):
+    results = await asyncio.gather(
+        *(timed_get(slow_api_client, "/items/") for _ in range(10))
+    )
+
+    admitted = [elapsed for response, elapsed in results if response.status_code == 200]
+    shed = [
+        (response, elapsed)
+        for response, elapsed in results
+        if response.status_code == 503
+    ]
+    assert len(admitted) == 2
+    assert len(shed) == 8
+    assert all(response.headers["retry-after"] == "3" for response, _ in shed)
+    # turned away without waiting for the database
+    assert all(elapsed < DB_DELAY for _, elapsed in shed)
+    assert all(elapsed < 2 * DB_DELAY for elapsed in admitted)
+
+
+async def test_writes_are_not_held_up_by_a_backlog_of_reads(slow_api_client):
+    reads = [asyncio.create_task(slow_api_client.get("/items/")) for _ in range(10)]
+    await asyncio.sleep(0.05)
+
+    write = await slow_api_client.post(
+        "/items/", json={"name": "lamp", "price": 12.5, "quantity": 3}
+    )
+    await asyncio.gather(*reads)
+
+    assert write.status_code == 200
+
+
+async def test_released_slots_go_to_the_longest_waiting_request():
+    limiter = AdmissionLimiter(max_in_flight=1, max_queued=2, queue_timeout=1.0)
+    assert await limiter.acquire()
+
+    first = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    second = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    # the queue is full
+    assert not await limiter.acquire()
+
+    limiter.release()
+    assert await first
+    assert not second.done()
+    assert limiter.stats() == {"in_flight": 1, "queued": 1, "shed": 1}
+
+    limiter.release()
+    limiter.release()
+    assert await second
+    assert limiter.in_flight == 0
+
+
+async def test_waiting_requests_give_up_at_their_deadline():
+    limiter = AdmissionLimiter(max_in_flight=1, max_queued=5, queue_timeout=0.05)
+    assert await limiter.acquire()
+
+    assert not await limiter.acquire()
+    assert limiter.queued == 0
+
+    limiter.release()
+    assert limiter.in_flight == 0
+    assert await limiter.acquire()
+
+
+async def test_cancelled_requests_give_back_the_slot_they_were_handed():
+    limiter = AdmissionLimiter(max_in_flight=1, max_queued=1, queue_timeout=1.0)
+    assert await limiter.acquire()
+    waiting = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    limiter.release()
+    # the client disconnects before the request gets to run
+    waiting.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert limiter.in_flight == 0
+    assert limiter.queued == 0
+
+
+async def test_cancelled_requests_hold_their_slot_until_they_are_done():
+    limiter = AdmissionLimiter(max_in_flight=1, max_queued=5, queue_timeout=1.0)
+    running = most_running = 0
+
+    async def app(scope, receive, send):
+        nonlocal running, most_running
+        running += 1
+        most_running = max(most_running, running)
+        await asyncio.sleep(0.1)
+        running -= 1
+
+    middleware = AdmissionMiddleware(app, {"read": limiter}, retry_after=1)
+    scope = {"type": "http", "method": "GET", "path": "/items/"}
+    first = asyncio.create_task(middleware(scope, None, None))
+    await asyncio.sleep(0.01)
+    # the client disconnects mid-request
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    await asyncio.gather(*(middleware(scope, None, None) for _ in range(3)))
+
+    assert most_running == 1
+    assert limiter.in_flight == 0
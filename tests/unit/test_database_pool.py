@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from be_task_ca import database
+from be_task_ca.config import DatabaseSettings
+from be_task_ca.database import _pool_options, get_pool_stats, warm_up_pool
+
+
+@pytest.fixture
+async def file_database(tmp_path, monkeypatch):
+    monkeypatch.setenv(
+        "DATABASE_CONNECTION_STRING", f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}"
+    )
+    monkeypatch.setenv("DATABASE_POOL_SIZE", "4")
+    monkeypatch.setattr(database, "engine", None)
+    monkeypatch.setattr(database, "SessionLocal", None)
+
+    yield
+
+    await database.get_db_engine().dispose()
+
+
+def test_pool_options_from_settings():
+    settings = DatabaseSettings(
+        CONNECTION_STRING="postgresql+asyncpg://localhost/shop",
+        POOL_SIZE=20,
+        POOL_MAX_OVERFLOW=5,
+        POOL_TIMEOUT_SECONDS=2.5,
+        POOL_RECYCLE_SECONDS=600,
+        POOL_PRE_PING=True,
+    )
+
+    assert _pool_options(settings) == {
+        "pool_pre_ping": True,
+        "pool_size": 20,
+        "max_overflow": 5,
+        "pool_timeout": 2.5,
+        "pool_recycle": 600,
+    }
+
+
+def test_pool_options_for_in_memory_sqlite():
+    settings = DatabaseSettings(CONNECTION_STRING="sqlite+aiosqlite:///:memory:")
+
+    assert _pool_options(settings) == {"pool_pre_ping": False}
+
+
+async def test_warm_up_pool_opens_connections(file_database):
+    await warm_up_pool(3)
+
+    stats = get_pool_stats()
+    assert stats.size == 4
+    assert (stats.checked_in, stats.checked_out) == (3, 0)
+
+
+async def test_sessions_record_the_wait_for_a_connection(file_database):
+    before = get_pool_stats().acquisitions
+
+    async with database.db_session_scope():
+        assert get_pool_stats().checked_out == 1
+
+    stats = get_pool_stats()
+    assert stats.acquisitions == before + 1
+    assert stats.acquire_seconds_max >= 0
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+async def test_forked_process_opens_its_own_engine(file_database):
+    await warm_up_pool(2)
+    parent_engine = database.get_db_engine()
+
+    pid = os.fork()
+    if pid == 0:
+        forgotten = database.engine is None and database.SessionLocal is None
+        fresh = database.get_db_engine() is not parent_engine
+        os._exit(0 if forgotten and fresh else 1)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    # the parent's connections were left open
+    assert database.engine is parent_engine
+    assert get_pool_stats().checked_in == 2
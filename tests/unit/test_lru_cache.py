@@ -0,0 +1,59 @@
+import pytest
+
+from be_task_ca.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return LRUCache(max_size=2, ttl=10, clock=clock)
+
+
+async def test_get_many_counts_hits_and_misses(cache):
+    await cache.set_many({"a": 1})
+
+    assert await cache.get_many(["a", "b"]) == {"a": 1}
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 1, 1)
+
+
+async def test_least_recently_used_entry_is_evicted(cache):
+    await cache.set_many({"a": 1, "b": 2})
+    await cache.get_many(["a"])
+
+    await cache.set_many({"c": 3})
+
+    assert await cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+    assert cache.stats().evictions == 1
+
+
+async def test_entries_expire(cache, clock):
+    await cache.set_many({"a": 1})
+
+    clock.now = 10
+
+    assert await cache.get_many(["a"]) == {}
+    stats = cache.stats()
+    assert (stats.expirations, stats.misses, stats.size) == (1, 1, 0)
+
+
+async def test_delete_many_and_clear(cache):
+    await cache.set_many({"a": 1, "b": 2})
+
+    await cache.delete_many(["a"])
+    assert await cache.get_many(["a", "b"]) == {"b": 2}
+
+    await cache.clear()
+    assert await cache.get_many(["b"]) == {}
@@ -0,0 +1,47 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from be_task_ca.app import create_app
+from be_task_ca.dependencies import get_memory_store, get_repository_settings
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("REPOSITORY_BACKEND", "memory")
+    get_repository_settings.cache_clear()
+    get_memory_store.cache_clear()
+    try:
+        yield TestClient(create_app())
+    finally:
+        get_repository_settings.cache_clear()
+        get_memory_store.cache_clear()
+
+
+def test_api_runs_without_a_database(client):
+    user = client.post(
+        "/users/",
+        json={
+            "email": "jane@example.com",
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "password": "secret",
+        },
+    ).json()
+    item = client.post(
+        "/items/", json={"name": "lamp", "price": 12.5, "quantity": 3}
+    ).json()
+
+    added = client.post(
+        f"/users/{user['id']}/cart", json={"item_id": item["id"], "quantity": 2}
+    )
+    oversold = client.post(
+        f"/users/{user['id']}/cart/batch",
+        json=[{"item_id": item["id"], "quantity": 2}],
+    )
+
+    assert added.status_code == 200
+    assert oversold.status_code == 200
+    assert client.get(f"/users/{user['id']}/cart").json() == {
+        "items": [{"item_id": item["id"], "quantity": 2}]
+    }
+    assert client.get("/items/").json()["items"][0]["quantity"] == 1
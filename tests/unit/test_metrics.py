@@ -0,0 +1,75 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from be_task_ca.metrics import (
+    Histogram,
+    MetricsMiddleware,
+    instrument_sqlalchemy,
+    render_request_metrics,
+    request_statements,
+)
+
+
+@pytest.fixture
+def client():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_sqlalchemy()
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, server_timing=True)
+
+    @app.get("/things/{thing_id}")
+    async def get_thing(thing_id: int):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await conn.execute(text("SELECT 2"))
+        return {"id": thing_id}
+
+    return TestClient(app)
+
+
+def test_statements_are_counted_per_route(client):
+    labels = (("method", "GET"), ("route", "/things/{thing_id}"))
+    before = request_statements._series.get(labels, [0] * 11)[-2]
+
+    response = client.get("/things/1")
+    client.get("/things/2")
+
+    assert response.status_code == 200
+    assert request_statements._series[labels][-2] - before == 4
+    assert "db;dur=" in response.headers["server-timing"]
+    assert 'desc="2 queries"' in response.headers["server-timing"]
+
+    rendered = "\n".join(render_request_metrics())
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/things/{thing_id}",status="200"}'
+    ) in rendered
+
+
+def test_unmatched_routes_share_one_label(client):
+    client.get("/nowhere/1")
+    client.get("/nowhere/2")
+
+    rendered = "\n".join(render_request_metrics())
+    assert 'route="unmatched",status="404"' in rendered
+    assert "/nowhere" not in rendered
+
+
+def test_histogram_render():
+    histogram = Histogram("latency_seconds", "Latency.", (0.1, 1.0))
+
+    histogram.observe((("route", 'a"b'),), 0.5)
+
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="a\\"b",le="0.1"} 0',
+        'latency_seconds_bucket{route="a\\"b",le="1.0"} 1',
+        'latency_seconds_bucket{route="a\\"b",le="+Inf"} 1',
+        'latency_seconds_sum{route="a\\"b"} 0.5',
+        'latency_seconds_count{route="a\\"b"} 1',
+    ]
@@ -0,0 +1,117 @@
+import pytest
+from sqlalchemy import event
+
+# transaction control is not a query against the data
+TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+# the most queries each endpoint may run, raise only with a reason: writes
+# to the catalog or a cart bump its revision, writes to items append them to
+# the outbox, and GETs answering with an ETag read one
+BUDGETS = {
+    "POST /users/": 2,
+    "POST /items/": 4,
+    "POST /items/bulk": 4,
+    "GET /items/": 2,
+    "GET /items/export": 1,
+    # the SQLite backend checks its in-process index against the catalog
+    # revision, and the first search loads it
+    "GET /items/search": 3,
+    "POST /users/{user_id}/cart": 5,
+    "POST /users/{user_id}/cart/batch": 8,
+    "GET /users/{user_id}/cart": 2,
+    "GET /users/{user_id}/cart/view": 1,
+    "POST /users/{user_id}/checkout": 4,
+}
+
+
+@pytest.fixture
+def queries(engine):
+    executed = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(TRANSACTION_CONTROL):
+            executed.append(statement)
+
+    return executed
+
+
+@pytest.fixture
+def within_budget(api_client, queries):
+    async def request(method, route, json=None, params=None, **path_params):
+        queries.clear()
+        response = await api_client.request(
+            method, route.format(**path_params), json=json, params=params
+        )
+        assert response.status_code == 200, response.text
+
+        budget = BUDGETS[f"{method} {route}"]
+        assert len(queries) <= budget, (
+            f"{method} {route} ran {len(queries)} queries, over its budget of "
+            f"{budget}:\n" + "\n".join(queries)
+        )
+        return response
+
+    return request
+
+
+async def test_endpoints_stay_within_their_query_budget(within_budget):
+    user = await within_budget(
+        "POST",
+        "/users/",
+        {
+            "email": "jane@example.com",
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "password": "secret",
+        },
+    )
+    user = user.json()
+    lamp = await within_budget(
+        "POST", "/items/", {"name": "lamp", "price": 12.5, "quantity": 5}
+    )
+    lamp = lamp.json()
+    await within_budget(
+        "POST",
+        "/items/bulk",
+        [{"name": f"item-{i}", "price": 1.0, "quantity": 3} for i in range(20)],
+    )
+    items = (await within_budget("GET", "/items/")).json()["items"]
+    await within_budget("GET", "/items/export")
+    found = await within_budget("GET", "/items/search", params={"q": "item 1"})
+    assert found.json()["items"][0]["name"] == "item-1"
+
+    await within_budget(
+        "POST",
+        "/users/{user_id}/cart",
+        {"item_id": lamp["id"], "quantity": 1},
+        user_id=user["id"],
+    )
+    await within_budget(
+        "POST",
+        "/users/{user_id}/cart/batch",
+        [{"item_id": item["id"], "quantity": 1} for item in items[:10]],
+        user_id=user["id"],
+    )
+    cart = await within_budget("GET", "/users/{user_id}/cart", user_id=user["id"])
+
+    view = await within_budget("GET", "/users/{user_id}/cart/view", user_id=user["id"])
+
+    assert len(cart.json()["items"]) == 11
+    assert len(view.json()["items"]) == 11
+    assert view.json()["total"] == 12.5 + 10 * 1.0
+
+    order = await within_budget("POST", "/users/{user_id}/checkout", user_id=user["id"])
+    assert order.json()["total"] == view.json()["total"]
+
+
+async def test_revalidating_reads_only_the_revision(api_client, queries):
+    lamp = {"name": "lamp", "price": 12.5, "quantity": 5}
+    assert (await api_client.post("/items/", json=lamp)).status_code == 200
+    etag = (await api_client.get("/items/")).headers["etag"]
+
+    queries.clear()
+    response = await api_client.get("/items/", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert len(queries) == 1
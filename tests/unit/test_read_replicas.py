@@ -0,0 +1,89 @@
+import time
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from be_task_ca import database
+from be_task_ca.app import create_app
+from be_task_ca.database import Base
+from be_task_ca.dependencies import get_database_settings
+from be_task_ca.read_your_writes import LAST_WRITE_COOKIE
+
+
+@pytest.fixture
+async def replicated_database(tmp_path, monkeypatch):
+    """
+    A primary and a replica that never catches up with it, so that reads
+    show which of the two they ran on.
+    """
+    primary = f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}"
+    replica = f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}"
+    for url in (primary, replica):
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+
+    monkeypatch.setenv("DATABASE_CONNECTION_STRING", primary)
+    monkeypatch.setenv("DATABASE_REPLICA_CONNECTION_STRINGS", f'["{replica}"]')
+    monkeypatch.setenv("DATABASE_READ_YOUR_WRITES_SECONDS", "60")
+    monkeypatch.setattr(database, "engine", None)
+    monkeypatch.setattr(database, "SessionLocal", None)
+    monkeypatch.setattr(database, "ReplicaSessions", None)
+    get_database_settings.cache_clear()
+
+    yield
+
+    get_database_settings.cache_clear()
+    await database.get_db_engine().dispose()
+    for sessionmaker in database.get_replica_sessionmakers():
+        await sessionmaker.kw["bind"].dispose()
+
+
+@pytest.fixture
+def app():
+    return create_app()
+
+
+def client_of(app):
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    )
+
+
+async def item_names(client):
+    response = await client.get("/items/")
+    assert response.status_code == 200
+    return [item["name"] for item in response.json()["items"]]
+
+
+async def test_reads_run_on_the_replica_unless_the_client_just_wrote(
+    replicated_database, app
+):
+    async with client_of(app) as writer, client_of(app) as reader:
+        response = await writer.post(
+            "/items/", json={"name": "lamp", "price": 12.5, "quantity": 5}
+        )
+        assert response.status_code == 200
+        assert LAST_WRITE_COOKIE in response.cookies
+
+        assert await item_names(writer) == ["lamp"]
+        assert await item_names(reader) == []
+
+        # once the replicas have had time to catch up, reads go back to them
+        writer.cookies.set(LAST_WRITE_COOKIE, str(time.time() - 120))
+        assert await item_names(writer) == []
+
+
+async def test_failed_writes_do_not_stick_to_the_primary(replicated_database, app):
+    async with client_of(app) as client:
+        lamp = {"name": "lamp", "price": 12.5, "quantity": 5}
+        await client.post("/items/", json=lamp)
+        client.cookies.clear()
+
+        response = await client.post("/items/", json=lamp)
+
+        assert response.status_code == 409
+        assert LAST_WRITE_COOKIE not in response.cookies
+        assert await item_names(client) == []
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from uuid import uuid4
+
+from be_task_ca.item.usecases import get_catalog_version
+from be_task_ca.memory import MemoryStore
+from be_task_ca.revisions import (
+    CATALOG,
+    RevisionRepoMemory,
+    RevisionRepoSA,
+    cart_revision,
+    record_change,
+)
+from be_task_ca.unit_of_work import UnitOfWorkSA
+
+
+async def test_committing_bumps_the_changed_revisions(db):
+    revision_repo = RevisionRepoSA(db)
+    uow = UnitOfWorkSA(db)
+    cart = cart_revision(uuid4())
+
+    assert await revision_repo.get_version(CATALOG) == "0"
+
+    record_change(db, CATALOG, cart)
+    await uow.commit()
+    record_change(db, CATALOG)
+    await uow.commit()
+
+    assert await revision_repo.get_version(CATALOG) == "2"
+    assert await revision_repo.get_version(cart) == "1"
+
+
+async def test_rolling_back_forgets_the_changes(db):
+    uow = UnitOfWorkSA(db)
+
+    record_change(db, CATALOG)
+    await uow.rollback()
+    await uow.commit()
+
+    assert await RevisionRepoSA(db).get_version(CATALOG) == "0"
+
+
+async def test_memory_versions_restart_in_a_new_epoch():
+    store = MemoryStore()
+    revision_repo = RevisionRepoMemory(store)
+    initial = await revision_repo.get_version(CATALOG)
+
+    store.bump(CATALOG)
+    bumped = await revision_repo.get_version(CATALOG)
+    store.clear()
+
+    assert bumped != initial
+    assert await revision_repo.get_version(CATALOG) not in (initial, bumped)
+
+
+async def test_cart_etag_changes_with_the_cart(api_client):
+    user = await api_client.post(
+        "/users/",
+        json={
+            "email": "jane@example.com",
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "password": "secret",
+        },
+    )
+    item = await api_client.post(
+        "/items/", json={"name": "lamp", "price": 12.5, "quantity": 5}
+    )
+    path = f"/users/{user.json()['id']}/cart"
+
+    empty = await api_client.get(path)
+    unchanged = await api_client.get(
+        path, headers={"If-None-Match": empty.headers["etag"]}
+    )
+    await api_client.post(path, json={"item_id": item.json()["id"], "quantity": 1})
+    changed = await api_client.get(
+        path, headers={"If-None-Match": empty.headers["etag"]}
+    )
+
+    assert unchanged.status_code == 304
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != empty.headers["etag"]
+    assert len(changed.json()["items"]) == 1
+
+
+async def test_catalog_etag_ignores_stock_changes(api_client, db):
+    user = await api_client.post(
+        "/users/",
+        json={
+            "email": "jane@example.com",
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "password": "secret",
+        },
+    )
+    item = await api_client.post(
+        "/items/", json={"name": "lamp", "price": 12.5, "quantity": 5}
+    )
+    with mock.patch("be_task_ca.item.usecases.datetime") as datetime_mock:
+        # within a single stock staleness window
+        datetime_mock.now.return_value = datetime.now(timezone.utc)
+        before = (await api_client.get("/items/")).headers["etag"]
+
+        await api_client.post(
+            f"/users/{user.json()['id']}/cart",
+            json={"item_id": item.json()["id"], "quantity": 2},
+        )
+        response = await api_client.get("/items/", headers={"If-None-Match": before})
+
+    assert response.status_code == 304
+    assert await RevisionRepoSA(db).get_version(CATALOG) == "1"
+
+
+async def test_catalog_version_changes_with_the_stock_staleness_window():
+    revision_repo = RevisionRepoMemory(MemoryStore())
+    at = datetime(2024, 1, 1, 0, 0, 20, tzinfo=timezone.utc)
+
+    version = await get_catalog_version(revision_repo, 10, at)
+
+    assert await get_catalog_version(revision_repo, 10, at + timedelta(seconds=9)) == (
+        version
+    )
+    assert await get_catalog_version(revision_repo, 10, at + timedelta(seconds=10)) != (
+        version
+    )
@@ -0,0 +1,48 @@
+import pytest
+
+from be_task_ca import server
+from be_task_ca.config import ServerSettings
+from be_task_ca.server import check_workers, uvicorn_options
+
+
+def test_uvicorn_options_from_settings(monkeypatch):
+    monkeypatch.setattr(server, "_installed", lambda module: True)
+    settings = ServerSettings(
+        PORT=9000, WORKERS=8, BACKLOG=4096, GRACEFUL_SHUTDOWN_SECONDS=10
+    )
+
+    options = uvicorn_options(settings)
+
+    assert options["workers"] == 8
+    assert options["port"] == 9000
+    assert options["backlog"] == 4096
+    assert options["timeout_graceful_shutdown"] == 10
+    assert (options["loop"], options["http"]) == ("uvloop", "httptools")
+
+
+def test_uvicorn_options_fall_back_to_the_standard_loop(monkeypatch):
+    monkeypatch.setattr(server, "_installed", lambda module: False)
+
+    options = uvicorn_options(ServerSettings())
+
+    assert (options["loop"], options["http"]) == ("asyncio", "h11")
+
+
+@pytest.mark.parametrize(
+    "variable, backend",
+    [("REPOSITORY_BACKEND", "memory"), ("CART_STORE_BACKEND", "write_behind")],
+)
+def test_single_process_backends_refuse_several_workers(monkeypatch, variable, backend):
+    monkeypatch.setenv(variable, backend)
+
+    check_workers(1)
+    with pytest.raises(SystemExit):
+        check_workers(4)
+
+
+def test_several_workers_warn_about_the_item_cache(monkeypatch, caplog):
+    monkeypatch.setenv("ITEM_CACHE_TTL_SECONDS", "5")
+
+    check_workers(4)
+
+    assert "ITEM_CACHE_TTL_SECONDS=5.0" in caplog.text
@@ -0,0 +1,107 @@
+import pytest
+from sqlalchemy import event, select
+
+from be_task_ca.item.model import Item
+from be_task_ca.item.repository import ItemRepoSA
+from be_task_ca.item.schema import ItemBase
+from be_task_ca.unit_of_work import UnitOfWorkSA
+
+
+@pytest.fixture
+def commits(engine):
+    counted = []
+    event.listen(engine.sync_engine, "commit", counted.append)
+    return counted
+
+
+async def test_savepoint_rolls_back_only_its_own_writes(db):
+    uow = UnitOfWorkSA(db)
+
+    db.add(Item(name="kept", price=1.0, quantity=1))
+    with pytest.raises(RuntimeError):
+        async with uow.savepoint():
+            db.add(Item(name="undone", price=1.0, quantity=1))
+            await db.flush()
+            raise RuntimeError()
+    await uow.commit()
+
+    names = await db.scalars(select(Item.name))
+    assert list(names) == ["kept"]
+
+
+async def test_one_commit_per_write_endpoint(api_client, commits):
+    async def commits_for(method, path, **kwargs):
+        before = len(commits)
+        response = await api_client.request(method, path, **kwargs)
+        assert response.status_code == 200, response.text
+        return response.json(), len(commits) - before
+
+    user, user_commits = await commits_for(
+        "POST",
+        "/users/",
+        json={
+            "email": "jane@example.com",
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "password": "secret",
+        },
+    )
+    item, item_commits = await commits_for(
+        "POST", "/items/", json={"name": "lamp", "price": 12.5, "quantity": 5}
+    )
+    _, bulk_commits = await commits_for(
+        "POST", "/items/bulk", json=[{"name": "desk", "price": 99.0, "quantity": 1}]
+    )
+    cart_item = {"item_id": item["id"], "quantity": 1}
+    _, cart_commits = await commits_for(
+        "POST", f"/users/{user['id']}/cart", json=cart_item
+    )
+    _, batch_commits = await commits_for(
+        "POST", f"/users/{user['id']}/cart/batch", json=[cart_item]
+    )
+
+    assert (user_commits, item_commits, bulk_commits) == (1, 1, 1)
+    assert (cart_commits, batch_commits) == (1, 1)
+
+
+async def test_no_commit_for_reads(api_client, commits, engine):
+    async with engine.begin() as conn:
+        await conn.execute(
+            Item.__table__.insert().values(name="lamp", price=1.0, quantity=1)
+        )
+    before = len(commits)
+
+    await api_client.get("/items/")
+    await api_client.get("/items/export")
+
+    assert len(commits) == before
+
+
+async def test_failed_usecase_commits_nothing(api_client, commits):
+    before = len(commits)
+
+    response = await api_client.post(
+        "/users/00000000-0000-0000-0000-000000000000/cart",
+        json={"item_id": "00000000-0000-0000-0000-000000000000", "quantity": 1},
+    )
+
+    assert response.status_code == 404
+    assert len(commits) == before
+
+
+async def test_revisions_are_bumped_right_before_committing(db, engine):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(" ".join(statement.split()[:3]))
+
+    await ItemRepoSA(db).save_item(ItemBase(name="lamp", price=1.0, quantity=1))
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    event.listen(engine.sync_engine, "commit", lambda conn: statements.append("COMMIT"))
+
+    await UnitOfWorkSA(db).commit()
+
+    # after the outbox, the revision rows stay locked only until the commit
+    assert statements[0].startswith("INSERT INTO item_outbox")
+    assert statements[-2] == "INSERT INTO revisions"
+    assert statements[-1] == "COMMIT"
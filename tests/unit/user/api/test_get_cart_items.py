@@ -6,8 +6,9 @@ import pytest
 from fastapi.testclient import TestClient
 
 from be_task_ca.app import app
-from be_task_ca.dependencies import get_user_repo
+from be_task_ca.dependencies import get_revision_repo, get_user_repo
 from be_task_ca.exceptions import UserDoesNotExistError
+from be_task_ca.revisions import RevisionRepo, cart_revision
 from be_task_ca.user.repository import UserRepo
 from be_task_ca.user.schema import AddToCartResponse, ItemQuantity
 
@@ -19,6 +20,14 @@ def user_repo():
     return MagicMock(spec=UserRepo)
 
 
+@pytest.fixture
+def revision_repo():
+    revision_repo = MagicMock(spec=RevisionRepo)
+    revision_repo.get_version.return_value = "3"
+    app.dependency_overrides[get_revision_repo] = lambda: revision_repo
+    return revision_repo
+
+
 @pytest.fixture
 def user_id():
     return uuid4()
@@ -33,29 +42,47 @@ def cart_items():
 
 
 @mock.patch("be_task_ca.user.api.list_items_in_cart")
-def test_get_users_cart(usecase_mock, user_repo, user_id, cart_items):
+def test_get_users_cart(usecase_mock, user_repo, revision_repo, user_id, cart_items):
     usecase_mock.return_value = cart_items
     app.dependency_overrides[get_user_repo] = lambda: user_repo
 
     response = client.get(f"/users/{user_id}/cart")
 
-    usecase_mock.assert_called_once_with(user_repo, user_id)
+    usecase_mock.assert_awaited_once_with(user_repo, user_id)
     assert response.status_code == 200
     assert response.json() == AddToCartResponse(items=cart_items).model_dump(
         mode='json'
     )
+    assert response.headers["etag"] == '"cart-3"'
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    app.dependency_overrides = {}
+
+
+@mock.patch("be_task_ca.user.api.list_items_in_cart")
+def test_get_unchanged_users_cart(usecase_mock, user_repo, revision_repo, user_id):
+    app.dependency_overrides[get_user_repo] = lambda: user_repo
+
+    response = client.get(
+        f"/users/{user_id}/cart", headers={"If-None-Match": '"cart-2", "cart-3"'}
+    )
+
+    revision_repo.get_version.assert_awaited_once_with(cart_revision(user_id))
+    usecase_mock.assert_not_called()
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"cart-3"'
 
     app.dependency_overrides = {}
 
 
 @mock.patch("be_task_ca.user.api.list_items_in_cart")
-def test_get_unknown_users_cart(usecase_mock, user_repo, user_id):
+def test_get_unknown_users_cart(usecase_mock, user_repo, revision_repo, user_id):
     usecase_mock.side_effect = UserDoesNotExistError("User does not exist")
     app.dependency_overrides[get_user_repo] = lambda: user_repo
 
     response = client.get(f"/users/{user_id}/cart")
 
-    usecase_mock.assert_called_once_with(user_repo, user_id)
+    usecase_mock.assert_awaited_once_with(user_repo, user_id)
     assert response.status_code == 404
     assert response.json() == {"detail": "User does not exist"}
 
@@ -0,0 +1,53 @@
+from unittest import mock
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from be_task_ca.app import app
+from be_task_ca.dependencies import get_item_repo, get_unit_of_work, get_user_repo
+from be_task_ca.item.repository import ItemRepo
+from be_task_ca.unit_of_work import UnitOfWork
+from be_task_ca.user.repository import UserRepo
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def overrides():
+    app.dependency_overrides[get_unit_of_work] = lambda: MagicMock(spec=UnitOfWork)
+    app.dependency_overrides[get_user_repo] = lambda: MagicMock(spec=UserRepo)
+    app.dependency_overrides[get_item_repo] = lambda: MagicMock(spec=ItemRepo)
+    yield
+    app.dependency_overrides = {}
+
+
+@pytest.mark.parametrize("quantity", [0, -1000])
+@mock.patch("be_task_ca.user.api.add_item_to_cart")
+def test_post_cart_refuses_quantities_that_are_not_positive(
+    usecase_mock, overrides, quantity
+):
+    response = client.post(
+        f"/users/{uuid4()}/cart", json={"item_id": str(uuid4()), "quantity": quantity}
+    )
+
+    assert response.status_code == 422
+    usecase_mock.assert_not_called()
+
+
+@pytest.mark.parametrize("quantity", [0, -1000])
+@mock.patch("be_task_ca.user.api.add_items_to_cart")
+def test_post_cart_batch_refuses_quantities_that_are_not_positive(
+    usecase_mock, overrides, quantity
+):
+    response = client.post(
+        f"/users/{uuid4()}/cart/batch",
+        json=[
+            {"item_id": str(uuid4()), "quantity": 1},
+            {"item_id": str(uuid4()), "quantity": quantity},
+        ],
+    )
+
+    assert response.status_code == 422
+    usecase_mock.assert_not_called()
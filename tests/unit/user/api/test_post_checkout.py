@@ -0,0 +1,61 @@
+from datetime import datetime, timezone
+from unittest import mock
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from be_task_ca.app import app
+from be_task_ca.dependencies import get_unit_of_work, get_user_repo
+from be_task_ca.exceptions import CartEmptyError, UserDoesNotExistError
+from be_task_ca.unit_of_work import UnitOfWork
+from be_task_ca.user.repository import UserRepo
+from be_task_ca.user.schema import CartLine, Order
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def overrides():
+    app.dependency_overrides[get_unit_of_work] = lambda: MagicMock(spec=UnitOfWork)
+    app.dependency_overrides[get_user_repo] = lambda: MagicMock(spec=UserRepo)
+    yield
+    app.dependency_overrides = {}
+
+
+@mock.patch("be_task_ca.user.api.checkout")
+def test_post_checkout(usecase_mock, overrides):
+    order = Order(
+        id=uuid4(),
+        created_at=datetime.now(timezone.utc),
+        items=[
+            CartLine(
+                item_id=uuid4(), quantity=2, name="lamp", price=12.5, line_total=25.0
+            )
+        ],
+        total=25.0,
+    )
+    usecase_mock.return_value = order
+
+    response = client.post(f"/users/{uuid4()}/checkout")
+
+    assert response.status_code == 200
+    assert response.json() == order.model_dump(mode="json")
+
+
+@pytest.mark.parametrize(
+    "error, status_code",
+    [
+        (UserDoesNotExistError("User does not exist"), 404),
+        (CartEmptyError("Cart is empty"), 409),
+    ],
+)
+@mock.patch("be_task_ca.user.api.checkout")
+def test_post_checkout_rejections(usecase_mock, overrides, error, status_code):
+    usecase_mock.side_effect = error
+
+    response = client.post(f"/users/{uuid4()}/checkout")
+
+    assert response.status_code == status_code
+    assert response.json() == {"detail": str(error)}
@@ -0,0 +1,47 @@
+from unittest import mock
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from be_task_ca.app import app
+from be_task_ca.dependencies import (
+    get_password_hasher,
+    get_unit_of_work,
+    get_user_repo,
+)
+from be_task_ca.exceptions import PasswordHasherBusyError
+from be_task_ca.user.passwords import PasswordHasher
+from be_task_ca.unit_of_work import UnitOfWork
+from be_task_ca.user.repository import UserRepo
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def overrides():
+    app.dependency_overrides[get_unit_of_work] = lambda: MagicMock(spec=UnitOfWork)
+    app.dependency_overrides[get_user_repo] = lambda: MagicMock(spec=UserRepo)
+    app.dependency_overrides[get_password_hasher] = lambda: MagicMock(
+        spec=PasswordHasher
+    )
+    yield
+    app.dependency_overrides = {}
+
+
+@mock.patch("be_task_ca.user.api.create_user")
+def test_post_customer_when_hashing_is_saturated(usecase_mock, overrides):
+    usecase_mock.side_effect = PasswordHasherBusyError("busy")
+
+    response = client.post(
+        "/users/",
+        json={
+            "email": "jane@example.com",
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "password": "pw",
+        },
+    )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
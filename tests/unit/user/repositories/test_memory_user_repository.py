@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+
+from be_task_ca.exceptions import UserAlreadyExistsError
+from be_task_ca.item.repository import ItemRepoMemory
+from be_task_ca.item.schema import ItemBase
+from be_task_ca.memory import MemoryStore
+from be_task_ca.user.repository import UserRepoMemory
+from be_task_ca.user.schema import (
+    AddToCartResult,
+    CartItemDetails,
+    CartLine,
+    CartLoading,
+    CartView,
+    ItemQuantity,
+    UserBase,
+)
+
+
+def in_an_hour():
+    return datetime.now(timezone.utc) + timedelta(hours=1)
+
+
+@pytest.fixture(scope="function")
+def store():
+    return MemoryStore()
+
+
+@pytest.fixture(scope="function")
+def user_repo(store):
+    return UserRepoMemory(store)
+
+
+@pytest.fixture(scope="function")
+async def user_and_item(store, user_repo):
+    user = await user_repo.save_user(
+        UserBase(email="jane@example.com", first_name="Jane", last_name="Doe"),
+        "hashed",
+    )
+    item = await ItemRepoMemory(store).save_item(
+        ItemBase(name="lamp", price=12.5, quantity=3)
+    )
+    return user.id, item.id
+
+
+async def test_save_user(user_repo, store, user_and_item):
+    user_id, _ = user_and_item
+
+    user = await user_repo.find_user_by_email("jane@example.com")
+
+    assert user.id == user_id
+    assert user.cart_items == []
+    assert store.hashed_passwords[user_id] == "hashed"
+    with pytest.raises(UserAlreadyExistsError):
+        await user_repo.save_user(
+            UserBase(email="jane@example.com", first_name="J", last_name="D"), "x"
+        )
+
+
+async def test_add_item_to_cart(user_repo, user_and_item):
+    user_id, item_id = user_and_item
+    cart_item = ItemQuantity(item_id=item_id, quantity=2)
+
+    assert (
+        await user_repo.add_item_to_cart(user_id, cart_item, in_an_hour())
+        == AddToCartResult.ADDED
+    )
+    assert (
+        await user_repo.add_item_to_cart(user_id, cart_item, in_an_hour())
+        == AddToCartResult.ALREADY_IN_CART
+    )
+    assert (
+        await user_repo.add_item_to_cart(uuid4(), cart_item, in_an_hour())
+        == AddToCartResult.USER_NOT_FOUND
+    )
+    assert (
+        await user_repo.add_item_to_cart(
+            user_id, ItemQuantity(item_id=uuid4(), quantity=1), in_an_hour()
+        )
+        == AddToCartResult.ITEM_NOT_FOUND
+    )
+    assert (await user_repo.find_user_by_id(user_id)).cart_items == []
+    assert (
+        await user_repo.find_user_by_id(user_id, CartLoading.SELECT)
+    ).cart_items == [cart_item]
+    assert (
+        await user_repo.find_user_by_id(user_id, CartLoading.JOINED)
+    ).cart_items == [
+        CartItemDetails(item_id=item_id, quantity=2, name="lamp", price=12.5)
+    ]
+
+
+async def test_add_items_to_cart(user_repo, user_and_item):
+    user_id, item_id = user_and_item
+
+    added = await user_repo.add_items_to_cart(
+        user_id,
+        [
+            ItemQuantity(item_id=item_id, quantity=1),
+            ItemQuantity(item_id=uuid4(), quantity=1),
+        ],
+        in_an_hour(),
+    )
+
+    assert added == {item_id}
+    assert await user_repo.list_items_in_cart(user_id) == [
+        ItemQuantity(item_id=item_id, quantity=1)
+    ]
+
+
+async def test_remove_expired_cart_items(user_repo, user_and_item):
+    user_id, item_id = user_and_item
+    cart_item = ItemQuantity(item_id=item_id, quantity=2)
+    await user_repo.add_item_to_cart(user_id, cart_item, in_an_hour())
+
+    assert await user_repo.remove_expired_cart_items(datetime.now(timezone.utc)) == []
+    assert await user_repo.remove_expired_cart_items(
+        in_an_hour() + timedelta(minutes=1)
+    ) == [cart_item]
+    assert await user_repo.list_items_in_cart(user_id) == []
+
+
+async def test_view_cart(user_repo, store, user_and_item):
+    user_id, lamp_id = user_and_item
+    desk = await ItemRepoMemory(store).save_item(
+        ItemBase(name="desk", price=80.0, quantity=1)
+    )
+
+    assert await user_repo.view_cart(user_id) == CartView(items=[], total=0)
+    assert await user_repo.view_cart(uuid4()) is None
+
+    await user_repo.add_items_to_cart(
+        user_id,
+        [
+            ItemQuantity(item_id=lamp_id, quantity=2),
+            ItemQuantity(item_id=desk.id, quantity=1),
+        ],
+        in_an_hour(),
+    )
+
+    assert await user_repo.view_cart(user_id) == CartView(
+        items=[
+            CartLine(
+                item_id=desk.id, quantity=1, name="desk", price=80.0, line_total=80.0
+            ),
+            CartLine(
+                item_id=lamp_id, quantity=2, name="lamp", price=12.5, line_total=25.0
+            ),
+        ],
+        total=105.0,
+    )
+
+
+async def test_take_cart_and_save_order(user_repo, store, user_and_item):
+    user_id, lamp_id = user_and_item
+    cart_item = ItemQuantity(item_id=lamp_id, quantity=2)
+    await user_repo.add_item_to_cart(user_id, cart_item, in_an_hour())
+
+    assert await user_repo.take_cart(uuid4()) is None
+    assert await user_repo.take_cart(user_id) == [cart_item]
+    assert await user_repo.take_cart(user_id) == []
+
+    order = await user_repo.save_order(user_id, [cart_item], datetime.now(timezone.utc))
+
+    assert order.items == [
+        CartLine(item_id=lamp_id, quantity=2, name="lamp", price=12.5, line_total=25.0)
+    ]
+    assert order.total == 25.0
+    assert store.orders[user_id] == [order]
@@ -1,27 +1,29 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import func, select
 
-from be_task_ca.database import Base
-from be_task_ca.item.model import Item  # noqa
-from be_task_ca.user.model import CartItem, User  # noqa
+from be_task_ca.item.model import Item
+from be_task_ca.user.model import CartItem, OrderLine, User
 from be_task_ca.user.repository import UserRepoSA
-from be_task_ca.user.schema import UserPrivate
+from be_task_ca.user.schema import (
+    AddToCartResult,
+    CartItemDetails,
+    CartLine,
+    CartLoading,
+    CartView,
+    ItemQuantity,
+    UserPrivate,
+)
 
 
-@pytest.fixture(scope="function")
-def db():
-    engine = create_engine("sqlite:///:memory:")
-    Base.metadata.create_all(bind=engine)
+def in_an_hour():
+    return datetime.now(timezone.utc) + timedelta(hours=1)
 
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    db = SessionLocal()
 
-    try:
-        yield db
-    finally:
-        db.close()
-        Base.metadata.drop_all(bind=engine)
+async def count_users(db):
+    return await db.scalar(select(func.count()).select_from(User))
 
 
 @pytest.fixture(scope="function")
@@ -29,7 +31,7 @@ def user_repo(db):
     return UserRepoSA(db)
 
 
-def test_save_user(user_repo, db):
+async def test_save_user(user_repo, db):
     user_private = UserPrivate(
         first_name="John",
         last_name="Doe",
@@ -38,18 +40,18 @@ def test_save_user(user_repo, db):
         shipping_address="123 Main St"
     )
 
-    assert db.query(User).count() == 0
+    assert await count_users(db) == 0
 
-    user_schema = user_repo.save_user(user_private)
+    user_schema = await user_repo.save_user(user_private, "hashed")
 
     assert user_schema.email == "john.doe@example.com"
     assert user_schema.first_name == "John"
     assert user_schema.last_name == "Doe"
 
-    assert db.query(User).count() == 1
+    assert await count_users(db) == 1
 
 
-def test_find_user_by_email(user_repo, db):
+async def test_find_user_by_email(user_repo, db):
     email = "john.doe@example.com"
     db.add(
         User(
@@ -60,16 +62,16 @@ def test_find_user_by_email(user_repo, db):
             shipping_address="123 Main St"
         )
     )
-    db.commit()
+    await db.commit()
 
-    user_schema = user_repo.find_user_by_email(email)
+    user_schema = await user_repo.find_user_by_email(email)
 
     assert user_schema is not None
     assert user_schema.email == email
     assert user_schema.first_name == "John"
 
 
-def test_find_user_by_id(user_repo, db):
+async def test_find_user_by_id(user_repo, db):
     user = User(
         first_name="John",
         last_name="Doe",
@@ -78,10 +80,226 @@ def test_find_user_by_id(user_repo, db):
         shipping_address=""
     )
     db.add(user)
-    db.commit()
+    await db.commit()
 
-    user_schema = user_repo.find_user_by_id(user.id)
+    user_schema = await user_repo.find_user_by_id(user.id)
 
     assert user_schema is not None
     assert user_schema.id == user.id
     assert user_schema.first_name == "John"
+
+
+async def test_find_user_by_id_loads_cart_items(user_repo, db):
+    item = Item(name="item", price=1.0, quantity=3)
+    user = User(
+        first_name="John",
+        last_name="Doe",
+        email="",
+        hashed_password="",
+        shipping_address=""
+    )
+    db.add_all([item, user])
+    await db.commit()
+    db.add(
+        CartItem(
+            user_id=user.id,
+            item_id=item.id,
+            quantity=2,
+            reserved_until=in_an_hour(),
+        )
+    )
+    await db.commit()
+    db.expunge_all()
+
+    without_cart = await user_repo.find_user_by_id(user.id)
+    with_cart = await user_repo.find_user_by_id(user.id, CartLoading.SELECT)
+    joined = await user_repo.find_user_by_id(user.id, CartLoading.JOINED)
+
+    assert without_cart.cart_items == []
+    assert [(c.item_id, c.quantity) for c in with_cart.cart_items] == [(item.id, 2)]
+    assert joined.cart_items == [
+        CartItemDetails(item_id=item.id, quantity=2, name="item", price=1.0)
+    ]
+
+
+async def test_find_user_by_id_joined_with_an_empty_cart(user_repo, db):
+    user = User(first_name="John", last_name="Doe", email="", hashed_password="")
+    db.add(user)
+    await db.commit()
+
+    user_schema = await user_repo.find_user_by_id(user.id, CartLoading.JOINED)
+
+    assert user_schema.id == user.id
+    assert user_schema.cart_items == []
+    assert await user_repo.find_user_by_id(uuid4(), CartLoading.JOINED) is None
+
+
+@pytest.fixture
+async def user_and_item(db):
+    item = Item(name="item", price=1.0, quantity=3)
+    user = User(
+        first_name="John",
+        last_name="Doe",
+        email="",
+        hashed_password="",
+        shipping_address=""
+    )
+    db.add_all([item, user])
+    await db.commit()
+    return user.id, item.id
+
+
+async def test_add_item_to_cart(user_repo, db, user_and_item):
+    user_id, item_id = user_and_item
+
+    result = await user_repo.add_item_to_cart(
+        user_id, ItemQuantity(item_id=item_id, quantity=3), in_an_hour()
+    )
+
+    assert result == AddToCartResult.ADDED
+    assert [
+        (c.item_id, c.quantity) for c in await user_repo.list_items_in_cart(user_id)
+    ] == [(item_id, 3)]
+
+
+@pytest.mark.parametrize(
+    "unknown_user, unknown_item, expected",
+    [
+        (True, False, AddToCartResult.USER_NOT_FOUND),
+        (False, True, AddToCartResult.ITEM_NOT_FOUND),
+    ],
+)
+async def test_add_item_to_cart_rejections(
+    user_repo, db, user_and_item, unknown_user, unknown_item, expected
+):
+    user_id, item_id = user_and_item
+
+    result = await user_repo.add_item_to_cart(
+        uuid4() if unknown_user else user_id,
+        ItemQuantity(item_id=uuid4() if unknown_item else item_id, quantity=1),
+        in_an_hour(),
+    )
+
+    assert result == expected
+    assert await user_repo.list_items_in_cart(user_id) == []
+
+
+async def test_add_item_to_cart_twice(user_repo, db, user_and_item):
+    user_id, item_id = user_and_item
+    cart_item = ItemQuantity(item_id=item_id, quantity=1)
+
+    await user_repo.add_item_to_cart(user_id, cart_item, in_an_hour())
+    result = await user_repo.add_item_to_cart(user_id, cart_item, in_an_hour())
+
+    assert result == AddToCartResult.ALREADY_IN_CART
+
+
+async def test_remove_expired_cart_items(user_repo, db, user_and_item):
+    user_id, item_id = user_and_item
+    other_item = Item(name="other", price=1.0, quantity=3)
+    db.add(other_item)
+    await db.commit()
+    now = datetime.now(timezone.utc)
+
+    await user_repo.add_item_to_cart(
+        user_id, ItemQuantity(item_id=item_id, quantity=2), now - timedelta(seconds=1)
+    )
+    await user_repo.add_item_to_cart(
+        user_id, ItemQuantity(item_id=other_item.id, quantity=1), in_an_hour()
+    )
+
+    removed = await user_repo.remove_expired_cart_items(now)
+
+    assert removed == [ItemQuantity(item_id=item_id, quantity=2)]
+    assert [c.item_id for c in await user_repo.list_items_in_cart(user_id)] == [
+        other_item.id
+    ]
+
+
+async def test_add_items_to_cart(user_repo, db, user_and_item):
+    user_id, item_id = user_and_item
+    other_item = Item(name="other", price=1.0, quantity=3)
+    db.add(other_item)
+    await db.commit()
+    await user_repo.add_item_to_cart(
+        user_id, ItemQuantity(item_id=item_id, quantity=1), in_an_hour()
+    )
+
+    added = await user_repo.add_items_to_cart(
+        user_id,
+        [
+            ItemQuantity(item_id=item_id, quantity=2),
+            ItemQuantity(item_id=other_item.id, quantity=2),
+        ],
+        in_an_hour(),
+    )
+
+    assert added == {other_item.id}
+    assert sorted(
+        (c.item_id, c.quantity) for c in await user_repo.list_items_in_cart(user_id)
+    ) == sorted([(item_id, 1), (other_item.id, 2)])
+
+
+async def test_view_cart(user_repo, db, user_and_item):
+    user_id, item_id = user_and_item
+    desk = Item(name="desk", price=80.0, quantity=1)
+    db.add(desk)
+    await db.commit()
+
+    assert await user_repo.view_cart(user_id) == CartView(items=[], total=0)
+    assert await user_repo.view_cart(uuid4()) is None
+
+    await user_repo.add_items_to_cart(
+        user_id,
+        [
+            ItemQuantity(item_id=item_id, quantity=2),
+            ItemQuantity(item_id=desk.id, quantity=1),
+        ],
+        in_an_hour(),
+    )
+
+    assert await user_repo.view_cart(user_id) == CartView(
+        items=[
+            CartLine(
+                item_id=desk.id, quantity=1, name="desk", price=80.0, line_total=80.0
+            ),
+            CartLine(
+                item_id=item_id, quantity=2, name="item", price=1.0, line_total=2.0
+            ),
+        ],
+        total=82.0,
+    )
+
+
+async def test_take_cart_and_save_order(user_repo, db, user_and_item):
+    user_id, item_id = user_and_item
+    desk = Item(name="desk", price=80.0, quantity=1)
+    db.add(desk)
+    await db.commit()
+    await user_repo.add_items_to_cart(
+        user_id,
+        [
+            ItemQuantity(item_id=item_id, quantity=2),
+            ItemQuantity(item_id=desk.id, quantity=1),
+        ],
+        in_an_hour(),
+    )
+
+    assert await user_repo.take_cart(uuid4()) is None
+    cart_items = await user_repo.take_cart(user_id)
+    assert sorted((c.item_id, c.quantity) for c in cart_items) == sorted(
+        [(item_id, 2), (desk.id, 1)]
+    )
+    assert await user_repo.take_cart(user_id) == []
+
+    created_at = datetime.now(timezone.utc)
+    order = await user_repo.save_order(user_id, cart_items, created_at)
+
+    assert order.created_at == created_at
+    assert order.items == [
+        CartLine(item_id=desk.id, quantity=1, name="desk", price=80.0, line_total=80.0),
+        CartLine(item_id=item_id, quantity=2, name="item", price=1.0, line_total=2.0),
+    ]
+    assert order.total == 82.0
+    lines = select(func.count()).where(OrderLine.order_id == order.id)
+    assert await db.scalar(lines) == 2
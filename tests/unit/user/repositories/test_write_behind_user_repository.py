@@ -0,0 +1,196 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from be_task_ca.database import Base
+from be_task_ca.item.model import Item
+from be_task_ca.user import tasks
+from be_task_ca.user.cart_store import CartStoreMemory
+from be_task_ca.user.model import CartItem, User
+from be_task_ca.user.repository import UserRepoSA, UserRepoWriteBehind
+from be_task_ca.user.schema import (
+    AddToCartResult,
+    CartItemDetails,
+    CartLoading,
+    ItemQuantity,
+)
+from be_task_ca.unit_of_work import UnitOfWorkSA
+
+
+def in_an_hour():
+    return datetime.now(timezone.utc) + timedelta(hours=1)
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    # the flusher writes on a connection of its own, which needs a real file
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'shop.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def sessions(engine, monkeypatch):
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def session_scope():
+        async with SessionLocal() as db:
+            yield db
+
+    monkeypatch.setattr(tasks, "db_session_scope", session_scope)
+    return session_scope
+
+
+async def saved_cart(sessions, user_id):
+    async with sessions() as db:
+        return await UserRepoSA(db).list_items_in_cart(user_id)
+
+
+async def count_cart_items(sessions):
+    async with sessions() as db:
+        return await db.scalar(select(func.count()).select_from(CartItem))
+
+
+@pytest.fixture
+def store():
+    return CartStoreMemory()
+
+
+@pytest.fixture
+def user_repo(db, store):
+    return UserRepoWriteBehind(UserRepoSA(db), store)
+
+
+@pytest.fixture
+async def user_and_item(db):
+    item = Item(name="lamp", price=12.5, quantity=3)
+    user = User(first_name="Jane", last_name="Doe", email="", hashed_password="")
+    db.add_all([item, user])
+    await db.commit()
+    return user.id, item.id
+
+
+async def test_cart_writes_reach_the_database_when_flushed(
+    user_repo, db, store, sessions, user_and_item
+):
+    user_id, item_id = user_and_item
+    cart_item = ItemQuantity(item_id=item_id, quantity=2)
+
+    result = await user_repo.add_item_to_cart(user_id, cart_item, in_an_hour())
+    await UnitOfWorkSA(db).commit()
+
+    assert result == AddToCartResult.ADDED
+    assert await user_repo.list_items_in_cart(user_id) == [cart_item]
+    assert await count_cart_items(sessions) == 0
+
+    assert await tasks.flush_carts(store, batch_size=10) == 1
+    assert await count_cart_items(sessions) == 1
+    assert await saved_cart(sessions, user_id) == [cart_item]
+
+
+async def test_rolled_back_cart_writes_are_undone(user_repo, db, store, user_and_item):
+    user_id, item_id = user_and_item
+    cart_item = ItemQuantity(item_id=item_id, quantity=2)
+
+    await user_repo.add_item_to_cart(user_id, cart_item, in_an_hour())
+    await UnitOfWorkSA(db).rollback()
+
+    assert await user_repo.list_items_in_cart(user_id) == []
+    assert await store.take_dirty(10) == {user_id: []}
+
+
+async def test_add_item_to_cart_rejections(user_repo, db, user_and_item):
+    user_id, item_id = user_and_item
+    cart_item = ItemQuantity(item_id=item_id, quantity=1)
+
+    await user_repo.add_item_to_cart(user_id, cart_item, in_an_hour())
+
+    assert (
+        await user_repo.add_item_to_cart(user_id, cart_item, in_an_hour())
+        == AddToCartResult.ALREADY_IN_CART
+    )
+    assert (
+        await user_repo.add_item_to_cart(uuid4(), cart_item, in_an_hour())
+        == AddToCartResult.USER_NOT_FOUND
+    )
+
+
+async def test_expired_items_come_back_when_rolled_back(
+    user_repo, db, store, user_and_item
+):
+    user_id, item_id = user_and_item
+    cart_item = ItemQuantity(item_id=item_id, quantity=2)
+    await user_repo.add_item_to_cart(user_id, cart_item, in_an_hour())
+    await UnitOfWorkSA(db).commit()
+
+    later = in_an_hour() + timedelta(minutes=1)
+    assert await user_repo.remove_expired_cart_items(later) == [cart_item]
+    await UnitOfWorkSA(db).rollback()
+
+    assert await user_repo.list_items_in_cart(user_id) == [cart_item]
+    assert await user_repo.remove_expired_cart_items(later) == [cart_item]
+
+
+async def test_find_user_loads_the_cart_from_the_store(user_repo, db, user_and_item):
+    user_id, item_id = user_and_item
+    await user_repo.add_item_to_cart(
+        user_id, ItemQuantity(item_id=item_id, quantity=2), in_an_hour()
+    )
+
+    joined = await user_repo.find_user_by_id(user_id, CartLoading.JOINED)
+    view = await user_repo.view_cart(user_id)
+
+    assert joined.cart_items == [
+        CartItemDetails(item_id=item_id, quantity=2, name="lamp", price=12.5)
+    ]
+    assert view.total == 25.0
+    assert await user_repo.view_cart(uuid4()) is None
+
+
+async def test_carts_survive_a_crash_before_being_flushed(
+    db, sessions, user_and_item, tmp_path
+):
+    journal_path = str(tmp_path / "carts.journal")
+    user_id, item_id = user_and_item
+    cart_item = ItemQuantity(item_id=item_id, quantity=2)
+
+    store = CartStoreMemory(journal_path, fsync="always")
+    await UserRepoWriteBehind(UserRepoSA(db), store).add_item_to_cart(
+        user_id, cart_item, in_an_hour()
+    )
+    await UnitOfWorkSA(db).commit()
+    # the process dies here: the store is never flushed nor closed
+    del store
+
+    restarted = CartStoreMemory(journal_path, fsync="always")
+    await tasks.load_carts(restarted)
+    assert await count_cart_items(sessions) == 0
+
+    assert await tasks.flush_carts(restarted, batch_size=10) == 1
+    assert await saved_cart(sessions, user_id) == [cart_item]
+
+    # once flushed, the journal has nothing left to recover
+    assert await CartStoreMemory(journal_path).take_dirty(10) == {}
+
+
+async def test_taken_cart_comes_back_when_rolled_back(
+    user_repo, db, store, user_and_item
+):
+    user_id, item_id = user_and_item
+    cart_item = ItemQuantity(item_id=item_id, quantity=2)
+    await user_repo.add_item_to_cart(user_id, cart_item, in_an_hour())
+    await UnitOfWorkSA(db).commit()
+
+    assert await user_repo.take_cart(uuid4()) is None
+    assert await user_repo.take_cart(user_id) == [cart_item]
+    assert await user_repo.list_items_in_cart(user_id) == []
+    await UnitOfWorkSA(db).rollback()
+
+    assert await user_repo.list_items_in_cart(user_id) == [cart_item]
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+
+from be_task_ca.memory import CartEntry
+from be_task_ca.user.cart_store import CartStoreMemory
+from be_task_ca.user.schema import ItemQuantity
+
+
+AN_HOUR = timedelta(hours=1)
+
+
+def entry(quantity=1, expires_in=AN_HOUR):
+    return CartEntry(
+        ItemQuantity(item_id=uuid4(), quantity=quantity),
+        datetime.now(timezone.utc) + expires_in,
+    )
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "carts.journal")
+
+
+async def test_pending_entries_are_visible_but_not_written_out():
+    store = CartStoreMemory()
+    user_id, lamp, desk = uuid4(), entry(), entry()
+
+    assert await store.add(user_id, [lamp, desk]) == {
+        lamp.cart_item.item_id,
+        desk.cart_item.item_id,
+    }
+    assert await store.add(user_id, [lamp]) == set()
+    assert await store.get_cart(user_id) == [lamp, desk]
+    assert await store.take_dirty(10) == {}
+
+    await store.confirm(user_id, [lamp.cart_item.item_id])
+
+    assert await store.take_dirty(10) == {user_id: [lamp]}
+    assert await store.take_dirty(10) == {}
+
+
+async def test_remove_expired_skips_pending_entries():
+    store = CartStoreMemory()
+    user_id = uuid4()
+    expired, pending = entry(expires_in=-timedelta(1)), entry(expires_in=-timedelta(1))
+    await store.add(user_id, [expired])
+    await store.confirm(user_id, [expired.cart_item.item_id])
+    await store.add(user_id, [pending])
+
+    removed = await store.remove_expired(datetime.now(timezone.utc))
+
+    assert removed == {user_id: [expired]}
+    assert await store.get_cart(user_id) == [pending]
+
+
+async def test_loading_keeps_the_carts_already_in_the_store():
+    store = CartStoreMemory()
+    user_id, other_user_id, kept, loaded = uuid4(), uuid4(), entry(), entry()
+    await store.add(user_id, [kept])
+    await store.confirm(user_id, [kept.cart_item.item_id])
+    await store.take_dirty(10)
+
+    await store.load({user_id: [loaded], other_user_id: [loaded]})
+
+    assert await store.get_cart(user_id) == [kept]
+    assert await store.get_cart(other_user_id) == [loaded]
+    assert await store.take_dirty(10) == {}
+
+
+async def test_unwritten_carts_are_recovered_from_the_journal(journal_path):
+    store = CartStoreMemory(journal_path, fsync="always")
+    user_id, confirmed, pending = uuid4(), entry(quantity=2), entry()
+    await store.add(user_id, [confirmed])
+    await store.confirm(user_id, [confirmed.cart_item.item_id])
+    await store.add(user_id, [pending])
+    # the process dies here, with the journal only written so far
+    with open(journal_path, "a") as journal:
+        journal.write('{"user_id": "torn')
+
+    recovered = CartStoreMemory(journal_path)
+
+    assert await recovered.get_cart(user_id) == [confirmed]
+    assert await recovered.take_dirty(10) == {user_id: [confirmed]}
+
+
+async def test_confirmations_are_synced_to_disk_by_default(journal_path):
+    store = CartStoreMemory(journal_path)
+    user_id, added = uuid4(), entry()
+    await store.add(user_id, [added])
+
+    with mock.patch("be_task_ca.user.cart_store.os.fsync") as fsync:
+        await store.confirm(user_id, [added.cart_item.item_id])
+
+    # the stock is reserved once confirming, losing the entry would leak it
+    fsync.assert_called_once()
+
+
+async def test_concurrent_changes_share_a_sync(journal_path):
+    store = CartStoreMemory(journal_path)
+    carts = {uuid4(): entry() for _ in range(20)}
+    for user_id, added in carts.items():
+        await store.add(user_id, [added])
+    fsync = os.fsync
+
+    def slow_fsync(fd):
+        time.sleep(0.05)
+        fsync(fd)
+
+    with mock.patch(
+        "be_task_ca.user.cart_store.os.fsync", side_effect=slow_fsync
+    ) as fsync_mock:
+        await asyncio.gather(
+            *(
+                store.confirm(user_id, [added.cart_item.item_id])
+                for user_id, added in carts.items()
+            )
+        )
+
+    # synced off the event loop, the changes made meanwhile together
+    assert fsync_mock.call_count < len(carts)
+    recovered = CartStoreMemory(journal_path)
+    assert await recovered.take_dirty(100) == {
+        user_id: [added] for user_id, added in carts.items()
+    }
+
+
+async def test_checkpoint_keeps_only_carts_still_to_be_written_out(journal_path):
+    store = CartStoreMemory(journal_path)
+    written, unwritten = uuid4(), uuid4()
+    for user_id in (written, unwritten):
+        added = await store.add(user_id, [entry()])
+        await store.confirm(user_id, added)
+    await store.take_dirty(10)
+    # writing out the second cart failed
+    await store.mark_dirty([unwritten])
+
+    await store.checkpoint()
+    store.close()
+
+    recovered = CartStoreMemory(journal_path)
+    assert list(await recovered.take_dirty(10)) == [unwritten]
+
+
+async def test_take_leaves_pending_entries():
+    store = CartStoreMemory()
+    user_id, permanent, pending = uuid4(), entry(), entry()
+    await store.add(user_id, [permanent])
+    await store.confirm(user_id, [permanent.cart_item.item_id])
+    await store.add(user_id, [pending])
+
+    assert await store.take(user_id) == [permanent]
+    assert await store.take(user_id) == []
+    assert await store.get_cart(user_id) == [pending]
+    assert await store.take_dirty(10) == {user_id: []}
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from be_task_ca.exceptions import PasswordHasherBusyError
+from be_task_ca.user import passwords
+from be_task_ca.user.passwords import PasswordHasher, hash_password
+
+
+@pytest.fixture
+def password_hasher():
+    password_hasher = PasswordHasher(workers=2, max_pending=2, queue_timeout=0.05)
+    yield password_hasher
+    password_hasher.shutdown()
+
+
+@pytest.fixture
+def slow_hash(monkeypatch):
+    release = threading.Event()
+
+    def blocking_hash(password):
+        release.wait(5)
+        return hash_password(password)
+
+    monkeypatch.setattr(passwords, "hash_password", blocking_hash)
+    yield release
+    release.set()
+
+
+async def test_hash(password_hasher):
+    assert await password_hasher.hash("secret") == hash_password("secret")
+    assert hash_password("secret") != hash_password("other")
+
+
+async def test_hashing_does_not_block_the_event_loop(password_hasher, slow_hash):
+    hashing = asyncio.create_task(password_hasher.hash("secret"))
+
+    started = time.perf_counter()
+    await asyncio.sleep(0.01)
+
+    assert time.perf_counter() - started < 0.5
+    assert not hashing.done()
+    slow_hash.set()
+    assert await hashing == hash_password("secret")
+
+
+async def test_excess_hashes_are_rejected(password_hasher, slow_hash):
+    running = [asyncio.create_task(password_hasher.hash(str(i))) for i in range(2)]
+    await asyncio.sleep(0)
+
+    with pytest.raises(PasswordHasherBusyError):
+        await password_hasher.hash("one too many")
+
+    slow_hash.set()
+    assert await asyncio.gather(*running) == [hash_password("0"), hash_password("1")]
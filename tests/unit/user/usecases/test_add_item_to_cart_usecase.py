@@ -1,5 +1,6 @@
-from unittest.mock import MagicMock
-from uuid import UUID, uuid4
+from datetime import datetime, timedelta, timezone
+from unittest.mock import ANY, MagicMock
+from uuid import uuid4
 
 import pytest
 
@@ -10,9 +11,8 @@ from be_task_ca.exceptions import (
     UserDoesNotExistError,
 )
 from be_task_ca.item.repository import ItemRepo
-from be_task_ca.item.schema import Item
 from be_task_ca.user.repository import UserRepo
-from be_task_ca.user.schema import ItemQuantity, User
+from be_task_ca.user.schema import AddToCartResult, ItemQuantity
 from be_task_ca.user.usecases import add_item_to_cart
 
 
@@ -23,101 +23,95 @@ def user_repo():
 
 @pytest.fixture
 def item_repo():
-    return MagicMock(spec=ItemRepo)
+    item_repo = MagicMock(spec=ItemRepo)
+    item_repo.reserve_stock.return_value = True
+    return item_repo
 
 
 @pytest.fixture
-def user(item_in_cart):
-    return User(
-        id=uuid4(),
-        email="",
-        first_name="",
-        last_name="",
-        shipping_address="",
-        cart_items=[
-            ItemQuantity(item_id=item_in_cart.id, quantity=1),
-        ],
-    )
-
-
-@pytest.fixture
-def item():
-    return Item(
-        id=UUID("72b53c6d-62d1-4225-91f8-9d993058996d"),
-        name="test-item",
-        price=10.0,
-        quantity=5,
-    )
-
-
-@pytest.fixture
-def item_in_cart():
-    return Item(
-        id=UUID("4861774c-9d73-4584-9994-caf5963c9c34"),
-        name="test-item-in-cart",
-        price=10.0,
-        quantity=5,
-    )
+def user_id():
+    return uuid4()
 
 
 @pytest.fixture
-def new_cart_item(item):
-    return ItemQuantity(item_id=item.id, quantity=item.quantity - 1)
+def new_cart_item():
+    return ItemQuantity(item_id=uuid4(), quantity=4)
 
 
-@pytest.fixture
-def existing_cart_item(item_in_cart):
-    return ItemQuantity(item_id=item_in_cart.id, quantity=item_in_cart.quantity - 2)
-
-
-def test_add_item_to_cart_when_the_user_does_not_exist(
-    user_repo, item_repo, user, new_cart_item
+async def test_add_item_to_cart_when_the_user_does_not_exist(
+    uow, user_repo, item_repo, user_id, new_cart_item
 ):
-    user_repo.find_user_by_id.return_value = None
+    user_repo.add_item_to_cart.return_value = AddToCartResult.USER_NOT_FOUND
 
     with pytest.raises(UserDoesNotExistError):
-        add_item_to_cart(user_repo, item_repo, user.id, new_cart_item)
+        await add_item_to_cart(uow, user_repo, item_repo, user_id, new_cart_item)
+
+    item_repo.release_stock.assert_awaited_once_with(
+        {new_cart_item.item_id: new_cart_item.quantity}
+    )
 
 
-def test_add_item_to_cart_when_the_item_does_not_exist(
-    user_repo, item_repo, user, new_cart_item
+async def test_add_item_to_cart_when_the_item_does_not_exist(
+    uow, user_repo, item_repo, user_id, new_cart_item
 ):
-    user_repo.find_user_by_id.return_value = MagicMock()
+    item_repo.reserve_stock.return_value = False
     item_repo.find_item_by_id.return_value = None
 
     with pytest.raises(ItemDoesNotExistError):
-        add_item_to_cart(user_repo, item_repo, user.id, new_cart_item)
+        await add_item_to_cart(uow, user_repo, item_repo, user_id, new_cart_item)
 
 
-def test_add_item_to_cart_when_not_enough_items_in_stock(
-    user_repo, item_repo, user, new_cart_item
+async def test_add_item_to_cart_when_not_enough_items_in_stock(
+    uow, user_repo, item_repo, user_id, new_cart_item
 ):
-    user_repo.find_user_by_id.return_value = user
-    item_repo.find_item_by_id.return_value = new_cart_item
-
-    item_to_add = ItemQuantity(
-        item_id=new_cart_item.item_id, quantity=new_cart_item.quantity + 10
-    )
+    item_repo.reserve_stock.return_value = False
 
     with pytest.raises(ItemQuantityError):
-        add_item_to_cart(user_repo, item_repo, user.id, item_to_add)
+        await add_item_to_cart(uow, user_repo, item_repo, user_id, new_cart_item)
+
+    item_repo.release_stock.assert_not_awaited()
+    user_repo.add_item_to_cart.assert_not_awaited()
+
+
+async def test_add_item_to_cart_when_the_user_does_not_exist_and_no_stock(
+    uow, user_repo, item_repo, user_id, new_cart_item
+):
+    item_repo.reserve_stock.return_value = False
+    user_repo.find_user_by_id.return_value = None
+
+    with pytest.raises(UserDoesNotExistError):
+        await add_item_to_cart(uow, user_repo, item_repo, user_id, new_cart_item)
 
 
-def test_add_item_to_cart_when_item_already_in_cart(
-    user_repo, item_repo, user, existing_cart_item
+async def test_add_item_to_cart_when_item_already_in_cart(
+    uow, user_repo, item_repo, user_id, new_cart_item
 ):
-    user_repo.find_user_by_id.return_value = user
-    item_repo.find_item_by_id.return_value = existing_cart_item
+    user_repo.add_item_to_cart.return_value = AddToCartResult.ALREADY_IN_CART
 
     with pytest.raises(ItemAlreadyInCartError):
-        add_item_to_cart(user_repo, item_repo, user.id, existing_cart_item)
+        await add_item_to_cart(uow, user_repo, item_repo, user_id, new_cart_item)
 
+    item_repo.release_stock.assert_awaited_once_with(
+        {new_cart_item.item_id: new_cart_item.quantity}
+    )
+    uow.commit.assert_not_awaited()
 
-def test_add_item_to_cart(user_repo, item_repo, user, new_cart_item):
-    user_repo.find_user_by_id.return_value = user
-    item_repo.find_item_by_id.return_value = new_cart_item
 
-    result = add_item_to_cart(user_repo, item_repo, user.id, new_cart_item)
+async def test_add_item_to_cart(uow, user_repo, item_repo, user_id, new_cart_item):
+    user_repo.add_item_to_cart.return_value = AddToCartResult.ADDED
+    before = datetime.now(timezone.utc)
 
-    user_repo.update_user_cart_items.assert_called_once_with(user.id, new_cart_item)
+    result = await add_item_to_cart(
+        uow, user_repo, item_repo, user_id, new_cart_item, timedelta(minutes=5)
+    )
+
+    item_repo.reserve_stock.assert_awaited_once_with(
+        new_cart_item.item_id, new_cart_item.quantity
+    )
+    user_repo.add_item_to_cart.assert_awaited_once_with(user_id, new_cart_item, ANY)
+    reserved_until = user_repo.add_item_to_cart.await_args.args[2]
+    assert reserved_until - before >= timedelta(minutes=5)
+    item_repo.release_stock.assert_not_awaited()
+    uow.commit.assert_awaited_once()
+    user_repo.list_items_in_cart.assert_awaited_once_with(user_id)
     assert result == user_repo.list_items_in_cart.return_value
@@ -0,0 +1,121 @@
+from unittest.mock import ANY, MagicMock
+from uuid import uuid4
+
+import pytest
+
+from be_task_ca.exceptions import UserDoesNotExistError
+from be_task_ca.item.repository import ItemRepo
+from be_task_ca.item.schema import Item
+from be_task_ca.user.repository import UserRepo
+from be_task_ca.user.schema import CartItemStatus, ItemQuantity, User
+from be_task_ca.user.usecases import add_items_to_cart
+
+
+@pytest.fixture
+def items():
+    return [Item(id=uuid4(), name=f"item-{i}", price=1.0, quantity=3) for i in range(4)]
+
+
+@pytest.fixture
+def user(items):
+    return User(
+        id=uuid4(),
+        email="",
+        first_name="",
+        last_name="",
+        cart_items=[ItemQuantity(item_id=items[0].id, quantity=1)],
+    )
+
+
+@pytest.fixture
+def user_repo(user):
+    user_repo = MagicMock(spec=UserRepo)
+    user_repo.find_user_by_id.return_value = user
+    user_repo.add_items_to_cart.side_effect = lambda user_id, cart_items, until: {
+        cart_item.item_id for cart_item in cart_items
+    }
+    return user_repo
+
+
+@pytest.fixture
+def item_repo(items):
+    item_repo = MagicMock(spec=ItemRepo)
+    item_repo.find_items_by_ids.return_value = items
+    item_repo.reserve_stock_batch.side_effect = lambda quantities: set(quantities)
+    return item_repo
+
+
+async def test_add_items_to_cart(uow, user_repo, item_repo, user, items):
+    cart_items = [
+        ItemQuantity(item_id=items[0].id, quantity=1),
+        ItemQuantity(item_id=items[1].id, quantity=1),
+        ItemQuantity(item_id=uuid4(), quantity=1),
+        ItemQuantity(item_id=items[2].id, quantity=5),
+        ItemQuantity(item_id=items[3].id, quantity=2),
+        ItemQuantity(item_id=items[3].id, quantity=1),
+    ]
+
+    results, cart = await add_items_to_cart(
+        uow, user_repo, item_repo, user.id, cart_items
+    )
+
+    assert [result.status for result in results] == [
+        CartItemStatus.ALREADY_IN_CART,
+        CartItemStatus.ADDED,
+        CartItemStatus.ITEM_NOT_FOUND,
+        CartItemStatus.NOT_ENOUGH_STOCK,
+        CartItemStatus.ADDED,
+        CartItemStatus.ALREADY_IN_CART,
+    ]
+    item_repo.find_items_by_ids.assert_awaited_once()
+    item_repo.reserve_stock_batch.assert_awaited_once_with(
+        {items[1].id: 1, items[3].id: 2}
+    )
+    user_repo.add_items_to_cart.assert_awaited_once_with(
+        user.id, [cart_items[1], cart_items[4]], ANY
+    )
+    assert cart == user.cart_items + [cart_items[1], cart_items[4]]
+
+
+async def test_add_items_to_cart_when_stock_runs_out(
+    uow, user_repo, item_repo, user, items
+):
+    item_repo.reserve_stock_batch.side_effect = lambda quantities: set()
+
+    results, cart = await add_items_to_cart(
+        uow,
+        user_repo,
+        item_repo,
+        user.id,
+        [ItemQuantity(item_id=items[1].id, quantity=1)],
+    )
+
+    assert results[0].status == CartItemStatus.NOT_ENOUGH_STOCK
+    user_repo.add_items_to_cart.assert_awaited_once_with(user.id, [], ANY)
+    assert cart == user.cart_items
+
+
+async def test_add_items_to_cart_when_an_item_is_added_concurrently(
+    uow, user_repo, item_repo, user, items
+):
+    user_repo.add_items_to_cart.side_effect = lambda user_id, cart_items, until: set()
+
+    results, _ = await add_items_to_cart(
+        uow,
+        user_repo,
+        item_repo,
+        user.id,
+        [ItemQuantity(item_id=items[1].id, quantity=2)],
+    )
+
+    assert results[0].status == CartItemStatus.ALREADY_IN_CART
+    item_repo.release_stock.assert_awaited_once_with({items[1].id: 2})
+
+
+async def test_add_items_to_cart_when_the_user_does_not_exist(
+    uow, user_repo, item_repo
+):
+    user_repo.find_user_by_id.return_value = None
+
+    with pytest.raises(UserDoesNotExistError):
+        await add_items_to_cart(uow, user_repo, item_repo, uuid4(), [])
@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+
+from be_task_ca.exceptions import CartEmptyError, UserDoesNotExistError
+from be_task_ca.user.repository import UserRepo
+from be_task_ca.user.schema import ItemQuantity, Order
+from be_task_ca.user.usecases import checkout
+
+
+@pytest.fixture
+def user_repo():
+    return MagicMock(spec=UserRepo)
+
+
+async def test_checkout(uow, user_repo):
+    now = datetime.now(timezone.utc)
+    user_id = uuid4()
+    cart_items = [ItemQuantity(item_id=uuid4(), quantity=2)]
+    order = Order(id=uuid4(), created_at=now, items=[], total=0)
+    user_repo.take_cart.return_value = cart_items
+    user_repo.save_order.return_value = order
+
+    assert await checkout(uow, user_repo, user_id, now) == order
+
+    user_repo.take_cart.assert_awaited_once_with(user_id)
+    user_repo.save_order.assert_awaited_once_with(user_id, cart_items, now)
+    uow.commit.assert_awaited_once()
+
+
+@pytest.mark.parametrize(
+    "cart_items, error",
+    [(None, UserDoesNotExistError), ([], CartEmptyError)],
+)
+async def test_checkout_rejections(uow, user_repo, cart_items, error):
+    user_repo.take_cart.return_value = cart_items
+
+    with pytest.raises(error):
+        await checkout(uow, user_repo, uuid4())
+
+    user_repo.save_order.assert_not_awaited()
+    uow.commit.assert_not_awaited()
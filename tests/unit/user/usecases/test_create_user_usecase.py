@@ -0,0 +1,53 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from be_task_ca.exceptions import UserAlreadyExistsError
+from be_task_ca.user.passwords import PasswordHasher
+from be_task_ca.user.repository import UserRepo
+from be_task_ca.user.schema import UserPrivate
+from be_task_ca.user.usecases import create_user
+
+
+@pytest.fixture
+def user_repo():
+    user_repo = MagicMock(spec=UserRepo)
+    user_repo.find_user_by_email.return_value = None
+    return user_repo
+
+
+@pytest.fixture
+def password_hasher():
+    password_hasher = MagicMock(spec=PasswordHasher)
+    password_hasher.hash.return_value = "hashed"
+    return password_hasher
+
+
+@pytest.fixture
+def new_user():
+    return UserPrivate(
+        email="jane@example.com", first_name="Jane", last_name="Doe", password="pw"
+    )
+
+
+async def test_create_user_saves_the_hashed_password(
+    uow, user_repo, password_hasher, new_user
+):
+    await create_user(uow, user_repo, password_hasher, new_user)
+
+    password_hasher.hash.assert_awaited_once_with("pw")
+    user_repo.save_user.assert_awaited_once_with(new_user, "hashed")
+    uow.commit.assert_awaited_once()
+
+
+async def test_create_existing_user_skips_hashing(
+    uow, user_repo, password_hasher, new_user
+):
+    user_repo.find_user_by_email.return_value = MagicMock()
+
+    with pytest.raises(UserAlreadyExistsError):
+        await create_user(uow, user_repo, password_hasher, new_user)
+
+    password_hasher.hash.assert_not_awaited()
+    user_repo.save_user.assert_not_awaited()
+    uow.commit.assert_not_awaited()
@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+
+from be_task_ca.item.repository import ItemRepo
+from be_task_ca.user.repository import UserRepo
+from be_task_ca.user.schema import ItemQuantity
+from be_task_ca.user.usecases import release_expired_reservations
+
+
+@pytest.fixture
+def user_repo():
+    return MagicMock(spec=UserRepo)
+
+
+@pytest.fixture
+def item_repo():
+    return MagicMock(spec=ItemRepo)
+
+
+async def test_release_expired_reservations(uow, user_repo, item_repo):
+    now = datetime.now(timezone.utc)
+    hot_item, other_item = uuid4(), uuid4()
+    user_repo.remove_expired_cart_items.return_value = [
+        ItemQuantity(item_id=hot_item, quantity=2),
+        ItemQuantity(item_id=other_item, quantity=1),
+        ItemQuantity(item_id=hot_item, quantity=3),
+    ]
+
+    released = await release_expired_reservations(uow, user_repo, item_repo, now)
+
+    assert released == 3
+    user_repo.remove_expired_cart_items.assert_awaited_once_with(now)
+    item_repo.release_stock.assert_awaited_once_with({hot_item: 5, other_item: 1})
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from be_task_ca.database import Base
+from be_task_ca.exceptions import ItemQuantityError
+from be_task_ca.item.model import Item
+from be_task_ca.item.repository import ItemRepoSA
+from be_task_ca.user.model import User
+from be_task_ca.user.repository import UserRepoSA
+from be_task_ca.user.schema import ItemQuantity
+from be_task_ca.user.usecases import add_item_to_cart
+from be_task_ca.unit_of_work import UnitOfWorkSA
+
+CLIENTS = 40
+STOCK = 15
+
+
+@pytest.fixture
+async def sessionmaker(tmp_path):
+    # concurrent transactions need a real file, not a per-connection :memory:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'shop.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    await engine.dispose()
+
+
+async def test_concurrent_reservations_never_oversell(sessionmaker):
+    async with sessionmaker() as db:
+        item = Item(name="hot-item", price=1.0, quantity=STOCK)
+        users = [
+            User(email=str(i), first_name="", last_name="", hashed_password="")
+            for i in range(CLIENTS)
+        ]
+        db.add_all([item, *users])
+        await db.commit()
+
+    async def reserve(user_id):
+        async with sessionmaker() as db:
+            try:
+                await add_item_to_cart(
+                    UnitOfWorkSA(db),
+                    UserRepoSA(db),
+                    ItemRepoSA(db),
+                    user_id,
+                    ItemQuantity(item_id=item.id, quantity=1),
+                )
+                return True
+            except ItemQuantityError:
+                return False
+
+    results = await asyncio.gather(*(reserve(user.id) for user in users))
+
+    async with sessionmaker() as db:
+        remaining = (await ItemRepoSA(db).find_item_by_id(item.id)).quantity
+
+    assert sum(results) == STOCK
+    assert remaining == 0